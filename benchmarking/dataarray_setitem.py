@@ -0,0 +1,87 @@
+# benchmark storing single points in a DataArray, as DataSet.store does
+# inside a loop, against the old general-purpose __setitem__
+# run with: python dataarray_setitem.py [<points>] [<repetitions>]
+# points: approximate number of points in each array (default 100000)
+# repetitions: how many times to fill each array (default 3)
+#
+# We report points/second for 1D, 2D and 3D arrays, and check that both
+# versions end with the same data and modified_range.
+
+import collections
+import itertools
+import sys
+import time
+
+import numpy as np
+
+from qcodes.data.data_array import DataArray
+
+
+timer = time.perf_counter
+
+
+class LegacyDataArray(DataArray):
+    """DataArray with the original __setitem__, with no fast path."""
+
+    def __setitem__(self, loop_indices, value):
+        if isinstance(loop_indices, collections.Iterable):
+            min_indices = list(loop_indices)
+            max_indices = list(loop_indices)
+        else:
+            min_indices = [loop_indices]
+            max_indices = [loop_indices]
+
+        for i, index in enumerate(min_indices):
+            if isinstance(index, slice):
+                start, stop, step = index.indices(self.shape[i])
+                min_indices[i] = start
+                max_indices[i] = start + (
+                    ((stop - start - 1)//step) * step)
+
+        min_li = self.flat_index(min_indices, self._min_indices)
+        max_li = self.flat_index(max_indices, self._max_indices)
+        self._update_modified_range(min_li, max_li)
+
+        self.ndarray.__setitem__(loop_indices, value)
+
+
+def time_fill(array_class, shape, reps):
+    array = array_class(shape=shape)
+    array.init_data()
+    all_indices = list(itertools.product(*[range(n) for n in shape]))
+
+    best = None
+    for _ in range(reps):
+        array.modified_range = None
+        t0 = timer()
+        for value, indices in enumerate(all_indices):
+            array[indices] = value
+        dt = timer() - t0
+        best = dt if best is None else min(best, dt)
+    return best, array
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    points = int(args[0]) if len(args) > 0 else 100000
+    reps = int(args[1]) if len(args) > 1 else 3
+
+    shapes = [
+        (points,),
+        (int(points ** 0.5),) * 2,
+        (int(round(points ** (1 / 3))),) * 3
+    ]
+
+    print('{:>20} {:>16} {:>16} {:>8}'.format(
+        'shape', 'legacy pts/s', 'fast pts/s', 'speedup'))
+    for shape in shapes:
+        npoints = int(np.prod(shape))
+        t_old, old = time_fill(LegacyDataArray, shape, reps)
+        t_new, new = time_fill(DataArray, shape, reps)
+
+        if (old.tolist() != new.tolist() or
+                old.modified_range != new.modified_range):
+            raise RuntimeError('results differ for shape {}'.format(shape))
+
+        print('{:>20} {:>16.0f} {:>16.0f} {:>8.1f}'.format(
+            str(shape), npoints / t_old, npoints / t_new, t_old / t_new))
@@ -0,0 +1,90 @@
+# benchmark syncing new data from a DataServer to a live DataSet,
+# using DataArray.get_changes and apply_changes, against the old
+# element-by-element versions
+# run with: python dataarray_sync.py [<points>] [<repetitions>]
+# points: size of each delta (default 100000)
+# repetitions: how many times to sync each delta (default 3)
+#
+# Each sync is get_changes on the server copy, a pickle round trip
+# (which is what the DataManager queue does with it) and apply_changes on
+# the live copy. We report the best time for 1D, 2D and 3D arrays.
+
+import pickle
+import sys
+import time
+
+import numpy as np
+
+from qcodes.data.data_array import DataArray
+
+
+timer = time.perf_counter
+
+
+class LegacyDataArray(DataArray):
+    """DataArray with the original get_changes and apply_changes."""
+
+    def get_changes(self, synced_index):
+        latest_index = self.last_saved_index
+        if latest_index is None:
+            latest_index = -1
+        if self.modified_range:
+            latest_index = max(latest_index, self.modified_range[1])
+
+        vals = [
+            self.ndarray[np.unravel_index(i, self.ndarray.shape)]
+            for i in range(synced_index + 1, latest_index + 1)
+        ]
+
+        if vals:
+            return {
+                'start': synced_index + 1,
+                'stop': latest_index,
+                'vals': vals
+            }
+
+    def apply_changes(self, start, stop, vals):
+        for i, val in enumerate(vals):
+            index = np.unravel_index(i + start, self.ndarray.shape)
+            self.ndarray[index] = val
+        self.synced_index = stop
+
+
+def time_sync(array_class, shape, reps):
+    source = array_class(preset_data=np.random.rand(*shape))
+    dest = array_class(shape=shape)
+    dest.init_data()
+
+    best = None
+    for _ in range(reps):
+        t0 = timer()
+        changes = source.get_changes(-1)
+        changes = pickle.loads(pickle.dumps(changes))
+        dest.apply_changes(**changes)
+        dt = timer() - t0
+        best = dt if best is None else min(best, dt)
+
+    if dest.tolist() != source.tolist():
+        raise RuntimeError('sync failed for shape {}'.format(shape))
+    return best
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    points = int(args[0]) if len(args) > 0 else 100000
+    reps = int(args[1]) if len(args) > 1 else 3
+
+    shapes = [
+        (points,),
+        (int(points ** 0.5),) * 2,
+        (int(round(points ** (1 / 3))),) * 3
+    ]
+
+    print('{:>20} {:>14} {:>14} {:>8}'.format(
+        'shape', 'legacy ms', 'sliced ms', 'speedup'))
+    for shape in shapes:
+        t_old = time_sync(LegacyDataArray, shape, reps)
+        t_new = time_sync(DataArray, shape, reps)
+
+        print('{:>20} {:>14.2f} {:>14.2f} {:>8.0f}'.format(
+            str(shape), t_old * 1e3, t_new * 1e3, t_old / t_new))
@@ -0,0 +1,122 @@
+# benchmark GNUPlotFormat.write against the old point-by-point writer
+# run with: python gnuplot_write.py [<points>] [<repetitions>]
+# points: approximate number of points in each group (default 100000)
+# repetitions: how many times to write each group (default 3)
+#
+# The files written by both writers are compared byte for byte, and we
+# report points/second for 1D, 2D and 3D groups.
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from qcodes.data.data_array import DataArray
+from qcodes.data.data_set import new_data
+from qcodes.data.gnuplot_format import GNUPlotFormat
+from qcodes.data.io import DiskIO
+
+
+timer = time.perf_counter
+
+
+class LegacyGNUPlotFormat(GNUPlotFormat):
+    """GNUPlotFormat with the original one-point-at-a-time writer."""
+
+    def _write_data(self, f, group, save_range):
+        shape = group.set_arrays[-1].shape
+        for i in range(save_range[0], save_range[1] + 1):
+            indices = np.unravel_index(i, shape)
+
+            for j, index in enumerate(reversed(indices)):
+                if index != 0:
+                    if j:
+                        f.write(self.terminator * j)
+                    break
+
+            one_point = self._data_point(group, indices)
+            f.write(self.separator.join(one_point) + self.terminator)
+
+    def _data_point(self, group, indices):
+        for array in group.set_arrays:
+            yield self.number_format.format(array[indices[:array.ndim]])
+
+        for array in group.data:
+            yield self.number_format.format(array[indices])
+
+
+def make_data(shape, io):
+    set_arrays = ()
+    arrays = []
+    for i, size in enumerate(shape):
+        sp = np.empty(shape[:i + 1])
+        sp[...] = np.linspace(0, 1, size)
+        set_array = DataArray(name='x{}'.format(i), is_setpoint=True,
+                              set_arrays=set_arrays, preset_data=sp)
+        set_arrays = set_arrays + (set_array,)
+        arrays.append(set_array)
+
+    for name in ('y', 'z'):
+        arrays.append(DataArray(name=name, set_arrays=set_arrays,
+                                preset_data=np.random.rand(*shape)))
+
+    return new_data(arrays=arrays, io=io, location=False)
+
+
+def time_write(formatter, data, io, location, reps):
+    best = None
+    for _ in range(reps):
+        for array in data.arrays.values():
+            array.clear_save()
+        t0 = timer()
+        formatter.write(data, io, location, write_metadata=False)
+        dt = timer() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def read_all(io, location):
+    out = {}
+    for fn in io.list(location):
+        with io.open(fn, 'r') as f:
+            out[os.path.basename(fn)] = f.read()
+    return out
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    points = int(args[0]) if len(args) > 0 else 100000
+    reps = int(args[1]) if len(args) > 1 else 3
+
+    shapes = [
+        (points,),
+        (int(points ** 0.5),) * 2,
+        (int(round(points ** (1 / 3))),) * 3
+    ]
+
+    base = tempfile.mkdtemp()
+    io = DiskIO(base)
+
+    try:
+        print('{:>20} {:>16} {:>16} {:>8}'.format(
+            'shape', 'legacy pts/s', 'chunked pts/s', 'speedup'))
+        for shape in shapes:
+            data = make_data(shape, io)
+            npoints = int(np.prod(shape))
+
+            t_old = time_write(LegacyGNUPlotFormat(), data, io, 'old', reps)
+            t_new = time_write(GNUPlotFormat(), data, io, 'new', reps)
+
+            if read_all(io, 'old') != read_all(io, 'new'):
+                raise RuntimeError('files differ for shape {}'.format(shape))
+
+            print('{:>20} {:>16.0f} {:>16.0f} {:>8.1f}'.format(
+                str(shape), npoints / t_old, npoints / t_new, t_old / t_new))
+
+            io.remove_all('old')
+            io.remove_all('new')
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
@@ -0,0 +1,137 @@
+# benchmark the time a Loop spends on each point, beyond the sets, gets and
+# stores themselves, using ActiveLoop execution plans against the old loop
+# that worked everything out again every time it was entered
+# run with: python loop_overhead.py [<points>] [<repetitions>]
+# points: about how many points to measure at each nesting level
+#     (default 20000)
+# repetitions: how many times to run each loop (default 3)
+#
+# The loops sweep ManualParameters with no delay and measure one
+# ManualParameter, into a temporary DataSet, nested 1 to 4 levels deep with
+# the same total number of points. We report the best time per point.
+
+import sys
+import time
+
+from qcodes.actions import _QcodesBreak
+from qcodes.instrument.parameter import ManualParameter
+from qcodes.loops import ActiveLoop, Loop
+from qcodes.utils.helpers import tprint
+from qcodes.utils.validators import Numbers
+
+
+timer = time.perf_counter
+
+
+class LegacyActiveLoop(ActiveLoop):
+    """ActiveLoop with the original point by point loop."""
+
+    def _run_loop(self, first_delay=0, action_indices=(),
+                  loop_indices=(), current_values=(),
+                  **ignore_kwargs):
+        delay = max(self.delay, first_delay)
+
+        self._pending_stores = []
+        self._measured = {}
+        callables = self._compile_actions(self.actions, action_indices)
+
+        t0 = time.time()
+        imax = len(self.sweep_values)
+        self._buffered_actions(action_indices)
+        self._feedback_ids(action_indices)
+
+        for i, value in enumerate(self.sweep_values):
+            if self.progress_interval is not None:
+                tprint('loop %s: %d/%d (%.1f [s])' % (
+                    self.sweep_values.name, i, imax, time.time() - t0),
+                    dt=self.progress_interval, tag='outerloop')
+
+            set_val = self.sweep_values.set(value)
+
+            new_indices = loop_indices + (i,)
+            new_values = current_values + (value,)
+            self._legacy_store_setpoint(value, set_val, new_indices,
+                                        action_indices)
+
+            if not self._nest_first:
+                self._wait(delay)
+
+            try:
+                for f in callables:
+                    f(first_delay=delay,
+                      loop_indices=new_indices,
+                      current_values=new_values)
+                    delay = 0
+            except _QcodesBreak:
+                break
+            finally:
+                self._store_pending()
+
+            delay = self.delay
+
+        for f in self._compile_actions(self.then_actions, ()):
+            f()
+
+    def _legacy_store_setpoint(self, value, set_val, loop_indices,
+                               action_indices):
+        data_to_store = {}
+        if hasattr(self.sweep_values, "parameters"):
+            raise NotImplementedError
+        else:
+            set_name = self.data_set.action_id_map[action_indices]
+            data_to_store[set_name] = value
+        self.data_set.store(loop_indices, data_to_store)
+
+    def _wait(self, delay):
+        if delay:
+            super()._wait(delay)
+        else:
+            self._check_signal()
+
+
+def make_loop(params, meter, levels, npts):
+    loop = Loop(params[0][0:npts:1])
+    for param in params[1:levels]:
+        loop = loop.loop(param[0:npts:1])
+    return loop.each(meter)
+
+
+def as_legacy(active_loop):
+    active_loop.__class__ = LegacyActiveLoop
+    for action in active_loop.actions:
+        if isinstance(action, ActiveLoop):
+            as_legacy(action)
+    return active_loop
+
+
+def time_loop(active_loop, reps):
+    best = None
+    for _ in range(reps):
+        t0 = timer()
+        active_loop.run_temp()
+        dt = timer() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    points = int(args[0]) if len(args) > 0 else 20000
+    reps = int(args[1]) if len(args) > 1 else 3
+
+    params = [ManualParameter('p{}'.format(i), initial_value=0,
+                              vals=Numbers()) for i in range(4)]
+    meter = ManualParameter('meter', initial_value=1)
+
+    print('{:>8} {:>10} {:>14} {:>14} {:>8}'.format(
+        'levels', 'points', 'legacy us/pt', 'plan us/pt', 'speedup'))
+    for levels in range(1, 5):
+        npts = int(round(points ** (1 / levels)))
+        total = npts ** levels
+        t_old = time_loop(as_legacy(make_loop(params, meter, levels, npts)),
+                          reps)
+        t_new = time_loop(make_loop(params, meter, levels, npts), reps)
+
+        print('{:>8} {:>10} {:>14.1f} {:>14.1f} {:>8.1f}'.format(
+            levels, total, t_old / total * 1e6, t_new / total * 1e6,
+            t_old / t_new))
@@ -0,0 +1,71 @@
+# benchmark storing data through the DataServer in PUSH_TO_SERVER mode,
+# batching calls to store, against the old one message per point
+# run with: python store_batch.py [<points>] [<batch_size>]
+# points: how many points to store (default 20000)
+# batch_size: DataSet.push_batch_size for the batched version
+#     (default 1000)
+#
+# Shared memory with the DataServer is turned off, so every point goes
+# through the DataManager's query queue. We time storing every point plus
+# finalize, which waits for the DataServer to catch up, and check that the
+# server ends up with all the data.
+
+import sys
+import time
+
+import numpy as np
+
+from qcodes.data.data_array import DataArray
+from qcodes.data.data_set import DataSet, DataMode
+from qcodes.data.manager import DataServer, get_data_manager
+
+
+timer = time.perf_counter
+
+
+class LegacyDataSet(DataSet):
+    """DataSet that pushes each call to store on its own."""
+
+    def store(self, loop_indices, ids_values):
+        if self.mode == DataMode.PUSH_TO_SERVER and self._shared is None:
+            self.data_manager.write('store_data', loop_indices, ids_values)
+        else:
+            super().store(loop_indices, ids_values)
+
+
+def time_store(data_set_class, points):
+    x = DataArray(name='x', preset_data=np.arange(points, dtype=float),
+                  is_setpoint=True)
+    y = DataArray(name='y', set_arrays=(x,), shape=(points,))
+    data = data_set_class(location=False, arrays=(x, y), data_manager=True,
+                          mode=DataMode.PUSH_TO_SERVER)
+
+    t0 = timer()
+    for i in range(points):
+        data.store((i,), {'y': i})
+    data.finalize()
+    dt = timer() - t0
+
+    stored = data.data_manager.ask('get_data', 'arrays')['y'].ndarray
+    if stored.tolist() != list(range(points)):
+        raise RuntimeError('{} lost data'.format(data_set_class.__name__))
+    return dt
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    points = int(args[0]) if len(args) > 0 else 20000
+    DataSet.push_batch_size = int(args[1]) if len(args) > 1 else 1000
+
+    DataServer.use_shared_memory = False
+    dm = get_data_manager()
+    try:
+        t_old = time_store(LegacyDataSet, points)
+        t_new = time_store(DataSet, points)
+    finally:
+        dm.close()
+
+    print('{:>10} {:>16} {:>16} {:>8}'.format(
+        'points', 'legacy pts/s', 'batched pts/s', 'speedup'))
+    print('{:>10} {:>16.0f} {:>16.0f} {:>8.1f}'.format(
+        points, points / t_old, points / t_new, t_old / t_new))
@@ -40,7 +40,10 @@ if config['gui']['notebook'] and config['core']['legacy_mp']:
     from qcodes.widgets.widgets import show_subprocess_widget
 
 from qcodes.station import Station
-from qcodes.loops import get_bg, halt_bg, Loop
+from qcodes.monitor import Monitor
+from qcodes.loops import get_bg, halt_bg, Loop, hilbert_order
+from qcodes.utils.profiling import LoopProfiler
+from qcodes.async_loop import AsyncLoop
 from qcodes.measure import Measure
 from qcodes.actions import Task, Wait, BreakIf
 
@@ -51,6 +54,7 @@ from qcodes.data.data_array import DataArray
 from qcodes.data.format import Formatter
 from qcodes.data.gnuplot_format import GNUPlotFormat
 from qcodes.data.hdf5_format import HDF5Format
+from qcodes.data.memmap_format import MemmapFormat
 from qcodes.data.io import DiskIO
 
 from qcodes.instrument.base import Instrument
@@ -67,7 +71,8 @@ from qcodes.instrument.parameter import (
     ManualParameter,
     combine,
     CombinedParameter)
-from qcodes.instrument.sweep_values import SweepFixedValues, SweepValues
+from qcodes.instrument.sweep_values import (SweepFixedValues, SweepValues,
+                                           AdaptiveSweep)
 
 from qcodes.utils import validators
 
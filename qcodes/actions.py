@@ -1,8 +1,10 @@
 """Actions, mainly to be executed in measurement Loops."""
+from functools import partial
 import time
 
+from qcodes.instrument.remote import RemoteParameter
 from qcodes.utils.deferred_operations import is_function
-from qcodes.utils.threading import thread_map
+from qcodes.utils.threading import thread_map, instrument_lock
 
 
 _NO_SNAPSHOT = {'type': None, 'description': 'Action without snapshot'}
@@ -97,24 +99,109 @@ class Wait:
         return {'type': 'Wait', 'delay': self.delay}
 
 
+def _instrument_groups(params):
+    """
+    Group parameters by the instrument they talk to.
+
+    Returns:
+        List[tuple]: ``(lock, positions)`` for each instrument, with its
+            ``instrument_lock`` and the positions of its parameters in
+            ``params``, in the order the instruments first appear.
+    """
+    groups = {}
+    for i, param in enumerate(params):
+        lock = instrument_lock(param)
+        groups.setdefault(id(lock), (lock, []))[1].append(i)
+    return sorted(groups.values(), key=lambda group: group[1][0])
+
+
+def _batch_getters(params, getters, profiler=None):
+    """
+    Combine the gets of consecutive parameters of one RemoteInstrument.
+
+    Each get of a RemoteParameter is a round trip to its server, so
+    consecutive ones on the same instrument are sent together with
+    ``RemoteInstrument._get_many``.
+
+    Args:
+        params (Sequence[Parameter]): the parameters to get, in order.
+        getters (Sequence[callable]): the getter of each parameter.
+        profiler (Optional[LoopProfiler]): time each batch with this.
+
+    Returns:
+        List[callable]: each returns a list of the values of one or more
+            consecutive ``params``, so together they get all ``params``
+            in order.
+    """
+    batches = []
+    i = 0
+    while i < len(params):
+        j = i + 1
+        if isinstance(params[i], RemoteParameter):
+            instrument = params[i]._instrument
+            while (j < len(params) and
+                   isinstance(params[j], RemoteParameter) and
+                   params[j]._instrument is instrument):
+                j += 1
+
+        if j - i > 1:
+            batch = partial(instrument._get_many,
+                            [param.name for param in params[i:j]])
+            if profiler is not None:
+                batch = profiler.timed('get ' + ', '.join(
+                    getattr(param, 'full_name', None) or param.name
+                    for param in params[i:j]), batch)
+        else:
+            batch = partial(_get_one, getters[i])
+        batches.append(batch)
+        i = j
+    return batches
+
+
+def _get_one(getter):
+    return [getter()]
+
+
 class _Measure:
     """
     A callable collection of parameters to measure.
 
     This should not be constructed manually, only by an ActiveLoop.
+
+    Args:
+        params_indices (List[tuple]): ``(parameter, action_indices)`` of each
+            parameter to measure.
+        data_set (DataSet): where the measurements go.
+        use_threads (bool): get the parameters of each instrument in order
+            in one thread, holding the instrument's lock, and different
+            instruments in parallel.
+        store (Optional[callable]): use this instead of ``data_set.store``.
+        executor (Optional[concurrent.futures.Executor]): the threads to use
+            with ``use_threads``. By default a new thread is started for
+            each instrument on every call.
+        profiler (Optional[LoopProfiler]): time each ``get`` with this.
+
+    Consecutive parameters of one RemoteInstrument are read together, in one
+    round trip to their server.
     """
-    def __init__(self, params_indices, data_set, use_threads):
-        self.use_threads = use_threads and len(params_indices) > 1
+    def __init__(self, params_indices, data_set, use_threads, store=None,
+                 executor=None, profiler=None):
         # the applicable DataSet.store function
-        self.store = data_set.store
+        self.store = store or data_set.store
+        self.executor = executor
 
         # for performance, pre-calculate which params return data for
         # multiple arrays, and the name mappings
         self.getters = []
         self.param_ids = []
         self.composite = []
+        params = [param for param, _ in params_indices]
         for param, action_indices in params_indices:
-            self.getters.append(param.get)
+            getter = param.get
+            if profiler is not None:
+                name = getattr(param, 'full_name', None) or param.name
+                getter = profiler.timed('get ' + name, getter)
+            self.getters.append(getter)
 
             if hasattr(param, 'names'):
                 part_ids = []
@@ -128,10 +215,33 @@ class _Measure:
                 self.param_ids.append(param_id)
                 self.composite.append(False)
 
+        self.instrument_groups = []
+        if use_threads and len(params_indices) > 1:
+            self.instrument_groups = _instrument_groups(params)
+        self.use_threads = len(self.instrument_groups) > 1
+
+        # only if any gets can be combined, to keep the plain case fast
+        self.batches = None
+        self.group_batches = None
+        if self.use_threads:
+            self.group_batches = [
+                _batch_getters([params[i] for i in positions],
+                               [self.getters[i] for i in positions],
+                               profiler)
+                for _, positions in self.instrument_groups]
+        else:
+            batches = _batch_getters(params, self.getters, profiler)
+            if len(batches) < len(params):
+                self.batches = batches
+
     def __call__(self, loop_indices, **ignore_kwargs):
         out_dict = {}
         if self.use_threads:
-            out = thread_map(self.getters)
+            out = self._get_by_instrument()
+        elif self.batches:
+            out = []
+            for batch in self.batches:
+                out.extend(batch())
         else:
             out = [g() for g in self.getters]
 
@@ -145,6 +255,27 @@ class _Measure:
 
         self.store(loop_indices, out_dict)
 
+    def _get_group(self, lock, batches):
+        out = []
+        with lock:
+            for batch in batches:
+                out.extend(batch())
+        return out
+
+    def _get_by_instrument(self):
+        groups = self.instrument_groups
+        group_outs = thread_map(
+            [self._get_group] * len(groups),
+            args=[(lock, batches) for (lock, _), batches in
+                  zip(groups, self.group_batches)],
+            executor=self.executor)
+
+        out = [None] * len(self.getters)
+        for (_, positions), group_out in zip(groups, group_outs):
+            for i, val in zip(positions, group_out):
+                out[i] = val
+        return out
+
 
 class _Nest:
 
@@ -0,0 +1,305 @@
+"""
+Run measurement loops in an asyncio event loop.
+
+An ``AsyncLoop`` runs the same sweeps and actions as an ``ActiveLoop``, into
+a normal ``DataSet``, but from one event loop: at each point the parameters
+of every instrument are measured concurrently, so many instruments (for
+example a rack of ``IPInstrument`` instances) can be queried at once
+without a thread for each.
+
+Parameters whose ``get`` or ``set`` is a coroutine function are awaited.
+Blocking ``get`` and ``set`` calls run in an executor, so they don't hold up
+the event loop. Either way, the parameters of one instrument are measured
+in order, one at a time.
+
+>>> data = AsyncLoop(Loop(sv, delay).each(param4, param5)).run()
+
+or, inside a coroutine:
+
+>>> data = await AsyncLoop(loop).async_run()
+
+Buffered sweeps and ``pipelined`` are not used here: the event loop already
+overlaps what it can.
+"""
+
+import asyncio
+from datetime import datetime
+from functools import partial
+import time
+
+from qcodes.actions import Wait, _QcodesBreak, _instrument_groups
+from qcodes.data.data_set import DataMode
+from qcodes.loops import ActiveLoop, _QuietInterrupt
+from qcodes.station import Station
+from qcodes.utils.deferred_operations import is_function
+from qcodes.utils.helpers import wait_secs, tprint
+from qcodes.utils.metadata import Metadatable
+
+
+class AsyncLoop(Metadatable):
+    """
+    Run a measurement loop in an asyncio event loop.
+
+    Args:
+        loop (Union[ActiveLoop, Loop]): the loop to run. A ``Loop`` with no
+            actions uses the default measurement set of the ``Station``.
+
+        executor (Optional[concurrent.futures.Executor]): where to run
+            blocking ``get`` and ``set`` calls. Defaults to the event loop's
+            default executor.
+    """
+    def __init__(self, loop, executor=None):
+        super().__init__()
+        if not isinstance(loop, ActiveLoop):
+            loop = loop.each(*Station.default.default_measurement)
+        self.loop = loop
+        self.executor = executor
+
+    def snapshot_base(self, update=False):
+        return self.loop.snapshot_base(update=update)
+
+    def run_temp(self, **kwargs):
+        """
+        Run this loop as a temporary data set, waiting for it to finish.
+        """
+        return self.run(quiet=True, data_manager=False, location=False,
+                        **kwargs)
+
+    def run(self, **kwargs):
+        """
+        Run this loop in a new event loop, waiting for it to finish.
+
+        Takes the same arguments as ``async_run``. From code that is already
+        running in an event loop, ``await async_run`` instead.
+
+        Returns:
+            DataSet: the data from the loop.
+        """
+        event_loop = asyncio.new_event_loop()
+        try:
+            return event_loop.run_until_complete(self.async_run(**kwargs))
+        finally:
+            event_loop.close()
+
+    async def async_run(self, quiet=False, data_manager=False, station=None,
+                        **kwargs):
+        """
+        Execute this loop.
+
+        Args:
+            quiet: (default False): set True to not print anything except
+                errors
+            data_manager: set to True to use a DataManager. Default False.
+            station: a Station instance for snapshots (omit to use a
+                previously provided Station, or the default Station)
+
+        kwargs are passed along to data_set.new_data, as in
+        ``ActiveLoop.run``.
+
+        Returns:
+            DataSet: the data from the loop.
+        """
+        loop = self.loop
+        data_set = loop.get_data_set(data_manager, **kwargs)
+        loop.set_common_attrs(data_set=data_set, use_threads=False,
+                              signal_queue=loop.signal_queue)
+        loop._save_run_metadata(data_set, station, {
+            'background': False,
+            'use_threads': False,
+            'pipelined': False,
+            'use_async': True,
+            'use_data_manager': (data_manager is not False)
+        })
+
+        try:
+            try:
+                await self._run_loop(loop)
+            except _QuietInterrupt:
+                pass
+            finally:
+                ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                data_set.add_metadata({'loop': {'ts_end': ts}})
+                data_set.finalize()
+
+            if data_set.mode != DataMode.LOCAL:
+                data_set.sync()
+
+        finally:
+            if not quiet:
+                print(repr(data_set))
+                print(datetime.now().strftime('started at %Y-%m-%d %H:%M:%S'))
+
+            # clear the data_set so the loop can run again
+            loop.data_set = None
+
+        return data_set
+
+    async def _call(self, func, *args):
+        """Await a coroutine function, or run a blocking one elsewhere."""
+        if is_function(func, len(args), coroutine=True):
+            return await func(*args)
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, partial(func, *args))
+
+    async def _wait(self, loop, delay):
+        if delay:
+            finish_clock = time.perf_counter() + delay
+            while True:
+                loop._check_signal()
+                t = wait_secs(finish_clock)
+                await asyncio.sleep(min(t, loop.signal_period))
+                if t <= loop.signal_period:
+                    break
+        else:
+            loop._check_signal()
+
+    def _compile_actions(self, loop, action_indices):
+        """
+        Make a coroutine function for each action of ``loop``, taking the
+        same keyword arguments as ``ActiveLoop`` actions.
+        """
+        callables = []
+        measurement_group = []
+        for i, action in enumerate(loop.actions):
+            new_action_indices = action_indices + (i,)
+            if hasattr(action, 'get'):
+                measurement_group.append((action, new_action_indices))
+                continue
+            elif measurement_group:
+                callables.append(self._measure(loop, measurement_group))
+                measurement_group = []
+
+            if isinstance(action, Wait):
+                callables.append(partial(self._wait_action, loop,
+                                         action.delay))
+            elif isinstance(action, ActiveLoop):
+                callables.append(partial(self._run_loop, action,
+                                         action_indices=new_action_indices))
+            else:
+                callables.append(partial(self._call_action, action))
+
+        if measurement_group:
+            callables.append(self._measure(loop, measurement_group))
+
+        return callables
+
+    async def _wait_action(self, loop, delay, **ignore_kwargs):
+        await self._wait(loop, delay)
+
+    async def _call_action(self, action, **kwargs):
+        # Tasks and BreakIfs are quick, so they can block
+        action(**kwargs)
+
+    def _measure(self, loop, params_indices):
+        id_map = loop.data_set.action_id_map
+        params = [param for param, _ in params_indices]
+        groups = [positions for _, positions in _instrument_groups(params)]
+
+        async def get_group(positions):
+            out = []
+            for i in positions:
+                out.append(await self._call(params[i].get))
+            return out
+
+        async def measure(loop_indices, **ignore_kwargs):
+            group_outs = await asyncio.gather(
+                *[get_group(positions) for positions in groups])
+
+            out_dict = {}
+            for positions, group_out in zip(groups, group_outs):
+                for i, param_out in zip(positions, group_out):
+                    param, action_indices = params_indices[i]
+                    if hasattr(param, 'names'):
+                        for j, val in enumerate(param_out):
+                            out_dict[id_map[action_indices + (j,)]] = val
+                    else:
+                        out_dict[id_map[action_indices]] = param_out
+
+            # keep what was measured at this point for feedback
+            loop._measured.update(out_dict)
+            loop.data_set.store(loop_indices, out_dict)
+
+        return measure
+
+    async def _run_loop(self, loop, first_delay=0, action_indices=(),
+                        loop_indices=(), current_values=(), indices=None,
+                        **ignore_kwargs):
+        """The async version of ``ActiveLoop._run_loop``."""
+        delay = max(loop.delay, first_delay)
+        loop._measured = {}
+        callables = self._compile_actions(loop, action_indices)
+        # the array_ids to store to; its callables are for ActiveLoop
+        plan = loop._get_plan(action_indices)
+        feedback_ids = plan.feedback_ids
+
+        t0 = time.time()
+        last_task = t0
+        last_task_failed = False
+        imax = len(loop.sweep_values)
+        n = -1
+        steps = loop._steps(plan, action_indices, indices)
+        for n, (i, value, inner) in enumerate(steps):
+            if loop.progress_interval is not None:
+                tprint('loop %s: %d/%d (%.1f [s])' % (
+                    loop.sweep_values.name, n, imax, time.time() - t0),
+                    dt=loop.progress_interval, tag='outerloop')
+
+            set_val = await self._call(loop.sweep_values.set, value)
+
+            new_indices = loop_indices + (i,)
+            new_values = current_values + (value,)
+            if plan.parameter_ids is None:
+                plan.store(new_indices, {plan.set_id: value})
+            else:
+                loop._store_setpoint(plan, value, set_val, new_indices)
+
+            if not loop._nest_first:
+                # only wait the delay time if an inner loop will not
+                # inherit it
+                await self._wait(loop, delay)
+
+            try:
+                for f in callables:
+                    await f(first_delay=delay,
+                            loop_indices=new_indices,
+                            current_values=new_values,
+                            indices=inner)
+
+                    # after the first action, no delay is inherited
+                    delay = 0
+            except _QcodesBreak:
+                break
+
+            if feedback_ids is not None:
+                loop._feedback(set_val, feedback_ids)
+
+            # after the first setpoint, delay reverts to the loop delay
+            delay = loop.delay
+
+            # the background task, as in ActiveLoop
+            if loop.bg_task is not None:
+                t = time.time()
+                if t - last_task >= loop.bg_min_delay:
+                    try:
+                        loop.bg_task()
+                        last_task_failed = False
+                    except Exception:
+                        if last_task_failed:
+                            loop.bg_task = None
+                        last_task_failed = True
+                    last_task = t
+
+        if loop.progress_interval is not None:
+            # final progress note: set dt=-1 so it *always* prints
+            tprint('loop %s DONE: %d/%d (%.1f [s])' % (
+                   loop.sweep_values.name, n + 1, imax, time.time() - t0),
+                   dt=-1, tag='outerloop')
+
+        if loop.bg_task is not None:
+            loop.bg_task()
+
+        for f in plan.then_callables:
+            f()
+
+        if loop.bg_final_task is not None:
+            loop.bg_final_task()
@@ -0,0 +1,162 @@
+"""Write a DataSet to storage from a separate thread."""
+
+from copy import copy
+import queue
+import threading
+
+import numpy as np
+
+
+class BackgroundWriter(threading.Thread):
+    """
+    A thread that writes the changes to a DataSet using its Formatter.
+
+    The thread that stores the data (normally a measurement loop) only has
+    to copy the ``modified_range`` of each array, with ``submit``. The
+    writer applies these changes to its own copy of the arrays and writes
+    them, so the formatter never sees arrays that are being changed, and
+    the measurement never waits for storage.
+
+    Errors in the writer are raised from the next call to ``submit``,
+    ``wait`` or ``stop``.
+
+    Args:
+        data_set (DataSet): the DataSet to write. Its ``formatter``, ``io``
+            and ``location`` are used for every write.
+    """
+    def __init__(self, data_set):
+        super().__init__(name='DataSet writer', daemon=True)
+        self.data_set = data_set
+        self.view = _WriterView(data_set)
+        # the view belongs to the writer thread, so keep our own record
+        # of which arrays it has
+        self._array_ids = set()
+        self._queue = queue.Queue()
+        self._exception = None
+
+    def submit(self):
+        """
+        Copy all changes in the DataSet and queue them to be written.
+
+        The arrays in the DataSet are marked as saved once they are queued.
+        """
+        self._raise()
+
+        new_arrays = []
+        changes = {}
+        for array_id, array in self.data_set.arrays.items():
+            if array_id not in self._array_ids:
+                # new to the writer, copied whole
+                new_arrays.append(self.view.copy_array(array))
+                self._array_ids.add(array_id)
+            elif array.modified_range is not None:
+                low, high = array.modified_range
+                vals = None
+                if not isinstance(array.ndarray, np.memmap):
+                    vals = array.ndarray.reshape(-1)[low:high + 1].copy()
+                changes[array_id] = (low, high, vals)
+                array.mark_saved(high)
+
+        if new_arrays or changes:
+            self._queue.put((new_arrays, changes))
+
+    def wait(self):
+        """Block until everything queued so far is written."""
+        self._queue.join()
+        self._raise()
+
+    def stop(self):
+        """Write everything that is queued, then end the thread."""
+        self._queue.put(None)
+        self.join()
+        self._raise()
+
+    def _raise(self):
+        if self._exception is not None:
+            e, self._exception = self._exception, None
+            raise e
+
+    def run(self):
+        running = True
+        while running:
+            # write every change that has piled up at once
+            batches = [self._queue.get()]
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            running = None not in batches
+            try:
+                for batch in batches:
+                    if batch is not None:
+                        self.view.apply(*batch)
+                self.view.write()
+            except Exception as e:
+                # anything not written stays modified in the view, and we
+                # try again with the next batch
+                self._exception = e
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+
+class _WriterView:
+    """
+    What the Formatter sees of a DataSet that is written in the background.
+
+    Holds copies of the DataSet's arrays, which only the writer thread
+    changes. Every other attribute is passed through to the DataSet, so any
+    state the Formatter keeps there (such as an open file) is shared.
+
+    Arrays that are memory-mapped files already hold their data in storage,
+    so these are shared rather than copied, and writing them only flushes
+    them.
+    """
+    def __init__(self, data_set):
+        object.__setattr__(self, '_data_set', data_set)
+        object.__setattr__(self, 'arrays', {})
+
+    def __getattr__(self, key):
+        return getattr(self._data_set, key)
+
+    def __setattr__(self, key, value):
+        setattr(self._data_set, key, value)
+
+    def __delattr__(self, key):
+        delattr(self._data_set, key)
+
+    def copy_array(self, array):
+        """
+        Copy an array of the DataSet, including its data and saved state.
+
+        Anything in its ``modified_range`` will be written with the copy,
+        so it is marked as saved in the original.
+        """
+        array_copy = copy(array)
+        if not isinstance(array.ndarray, np.memmap):
+            array_copy.ndarray = np.array(array.ndarray)
+        if array.modified_range is not None:
+            array.mark_saved(array.modified_range[1])
+        return array_copy
+
+    def apply(self, new_arrays, changes):
+        """Insert arrays and values copied from the DataSet."""
+        for array in new_arrays:
+            self.arrays[array.array_id] = array
+        if new_arrays:
+            # point all set_arrays at the copies
+            for array in self.arrays.values():
+                array.set_arrays = tuple(self.arrays.get(sa.array_id, sa)
+                                         for sa in array.set_arrays)
+
+        for array_id, (low, high, vals) in changes.items():
+            array = self.arrays[array_id]
+            if vals is not None:
+                array.ndarray.reshape(-1)[low:high + 1] = vals
+            array._update_modified_range(low, high)
+
+    def write(self):
+        self.formatter.write(self, self.io, self.location,
+                             write_metadata=False)
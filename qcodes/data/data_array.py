@@ -135,6 +135,10 @@ class DataArray(DelegateAttributes):
         self.last_saved_index = None
         self.modified_range = None
 
+        # flat index strides for single points, see __setitem__
+        self._strides_shape = None
+        self._flat_strides = ()
+
         self.ndarray = None
         if snapshot is None:
             snapshot = {}
@@ -291,6 +295,9 @@ class DataArray(DelegateAttributes):
             if self.ndarray.shape != self.shape:
                 raise ValueError('data has already been initialized, '
                                  'but its shape doesn\'t match self.shape')
+            # ndarray may have been provided from outside, such as by a
+            # Formatter that stores data in place
+            self._set_index_bounds()
             return
         else:
             self.ndarray = np.ndarray(self.shape)
@@ -310,6 +317,17 @@ class DataArray(DelegateAttributes):
             self.ndarray = self.ndarray.astype(float)
         self.ndarray.fill(float('nan'))
 
+    def load(self):
+        """
+        Read all the data into memory, if it was opened lazily.
+
+        Arrays loaded with ``load_data(..., lazy=True)`` only read the parts
+        of the data that are indexed, and cannot be changed. After ``load``
+        this is a regular in-memory array again.
+        """
+        if hasattr(self.ndarray, 'load'):
+            self.ndarray = self.ndarray.load()
+
     def __setitem__(self, loop_indices, value):
         """
         Set data values.
@@ -320,6 +338,36 @@ class DataArray(DelegateAttributes):
         Also update the record of modifications to the array. If you don't
         want this overhead, you can access ``self.ndarray`` directly.
         """
+        # Fast path for single points (a tuple of ints, one per dimension),
+        # which is what DataSet.store gives us from inside a loop
+        if type(loop_indices) is tuple or type(loop_indices) is int:
+            shape = self.shape
+            if shape is not self._strides_shape:
+                self._strides_shape = shape
+                self._flat_strides = tuple(
+                    int(np.prod(shape[i + 1:])) for i in range(len(shape)))
+
+            indices = (loop_indices if type(loop_indices) is tuple
+                       else (loop_indices,))
+            if len(indices) == len(shape):
+                flat_index = 0
+                for index, size, stride in zip(indices, shape,
+                                               self._flat_strides):
+                    if type(index) is not int or not 0 <= index < size:
+                        break
+                    flat_index += index * stride
+                else:
+                    self.ndarray[loop_indices] = value
+
+                    modified_range = self.modified_range
+                    if modified_range is None:
+                        self.modified_range = (flat_index, flat_index)
+                    elif flat_index > modified_range[1]:
+                        self.modified_range = (modified_range[0], flat_index)
+                    elif flat_index < modified_range[0]:
+                        self.modified_range = (flat_index, modified_range[1])
+                    return
+
         if isinstance(loop_indices, collections.Iterable):
             min_indices = list(loop_indices)
             max_indices = list(loop_indices)
@@ -446,7 +494,9 @@ class DataArray(DelegateAttributes):
                 returns a dict with keys:
                     start (int): the flat index of the first returned value.
                     stop (int): the flat index of the last returned value.
-                    vals (List[float]): the new values
+                    vals (numpy.ndarray): the new values, as a 1D slice of
+                        the flattened array. Normally a view rather than a
+                        copy, so it is only valid until the array changes.
         """
         latest_index = self.last_saved_index
         if latest_index is None:
@@ -454,16 +504,12 @@ class DataArray(DelegateAttributes):
         if self.modified_range:
             latest_index = max(latest_index, self.modified_range[1])
 
-        vals = [
-            self.ndarray[np.unravel_index(i, self.ndarray.shape)]
-            for i in range(synced_index + 1, latest_index + 1)
-        ]
-
-        if vals:
+        if latest_index > synced_index:
             return {
                 'start': synced_index + 1,
                 'stop': latest_index,
-                'vals': vals
+                'vals': self.ndarray.ravel()[synced_index + 1:
+                                             latest_index + 1]
             }
 
     def apply_changes(self, start, stop, vals):
@@ -478,11 +524,9 @@ class DataArray(DelegateAttributes):
         Args:
             start (int): the flat index of the first new value.
             stop (int): the flat index of the last new value.
-            vals (List[float]): the new values
+            vals (Union[numpy.ndarray, List[float]]): the new values
         """
-        for i, val in enumerate(vals):
-            index = np.unravel_index(i + start, self.ndarray.shape)
-            self.ndarray[index] = val
+        self.ndarray.flat[start:stop + 1] = vals
         self.synced_index = stop
 
     def __repr__(self):
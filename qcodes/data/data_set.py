@@ -7,6 +7,7 @@ from traceback import format_exc
 from copy import deepcopy
 from collections import OrderedDict
 
+from .background_writer import BackgroundWriter
 from .manager import get_data_manager, NoData
 from .gnuplot_format import GNUPlotFormat
 from .io import DiskIO
@@ -91,6 +92,12 @@ def new_data(location=None, loc_record=None, name=None, overwrite=False,
             this and generally writes more often. Use None to disable writing
             from calls to ``self.store``. Default 5.
 
+        write_in_background (bool, optional): Only if ``mode=LOCAL``, do the
+            periodic writes from ``self.store`` in a separate thread, so
+            ``store`` only has to copy the new data. ``self.write`` and
+            ``self.finalize`` wait for the writer to finish, and raise any
+            error it encountered. Default False.
+
     Returns:
         A new ``DataSet`` object ready for storing new data in.
     """
@@ -121,7 +128,8 @@ def new_data(location=None, loc_record=None, name=None, overwrite=False,
                    mode=mode, **kwargs)
 
 
-def load_data(location=None, data_manager=None, formatter=None, io=None):
+def load_data(location=None, data_manager=None, formatter=None, io=None,
+              lazy=False):
     """
     Load an existing DataSet.
 
@@ -151,6 +159,11 @@ def load_data(location=None, data_manager=None, formatter=None, io=None):
             says the root data directory is the current working directory, ie
             where you started the python session.
 
+        lazy (bool, optional): open the arrays without reading their data,
+            which is only read from storage as you index into them. Only
+            supported by some formatters, such as ``HDF5Format``. Live data
+            is never lazy. Default False.
+
     Returns:
         A new ``DataSet`` object loaded with pre-existing data.
     """
@@ -176,7 +189,7 @@ def load_data(location=None, data_manager=None, formatter=None, io=None):
         data = DataSet(location=location, formatter=formatter, io=io,
                        mode=DataMode.LOCAL)
         data.read_metadata()
-        data.read()
+        data.read(lazy=lazy)
         return data
 
 
@@ -242,6 +255,12 @@ class DataSet(DelegateAttributes):
             this and generally writes more often. Use None to disable writing
             from calls to ``self.store``. Default 5.
 
+        write_in_background (bool, optional): Only if ``mode=LOCAL``, do the
+            periodic writes from ``self.store`` in a separate thread, so
+            ``store`` only has to copy the new data. ``self.write`` and
+            ``self.finalize`` wait for the writer to finish, and raise any
+            error it encountered. Default False.
+
     Attributes:
         background_functions (OrderedDict[callable]): Class attribute,
             ``{key: fn}``: ``fn`` is a callable accepting no arguments, and
@@ -254,6 +273,20 @@ class DataSet(DelegateAttributes):
             Note that because this is a class attribute, the functions will
             apply to every DataSet. If you want specific functions for one
             DataSet you can override this with an instance attribute.
+
+        push_batch_size (int): Class attribute, in ``PUSH_TO_SERVER`` mode
+            (when the ``DataServer`` does not share memory with us) calls to
+            ``store`` are collected and sent to the ``DataServer`` together,
+            once there are this many of them. Default 1000.
+
+        push_batch_period (float): Class attribute, seconds after which we
+            send the collected calls to ``store`` anyway, on the next
+            ``store`` or before a Loop delay that would outlast it.
+            Everything is sent before ``finalize``. Default 0.1.
+
+        profiler (Optional[LoopProfiler]): if set, every ``write`` is timed
+            as a ``'write'`` step of it. A profiled Loop sets this for the
+            duration of its run. Default None.
     """
 
     # ie data_set.arrays['vsd'] === data_set.vsd
@@ -265,8 +298,12 @@ class DataSet(DelegateAttributes):
 
     background_functions = OrderedDict()
 
+    push_batch_size = 1000
+    push_batch_period = 0.1
+
     def __init__(self, location=None, mode=DataMode.LOCAL, arrays=None,
-                 data_manager=False, formatter=None, io=None, write_period=5):
+                 data_manager=False, formatter=None, io=None, write_period=5,
+                 write_in_background=False):
         if location is False or isinstance(location, str):
             self.location = location
         else:
@@ -278,6 +315,14 @@ class DataSet(DelegateAttributes):
         self.io = io or self.default_io
 
         self.write_period = write_period
+        self.write_in_background = write_in_background
+        self._writer = None
+        self.profiler = None
+        # shared memory with the DataServer, if it provides that
+        self._shared = None
+        # calls to store waiting to be pushed to the DataServer
+        self._store_batch = []
+        self._store_batch_start = None
         self.last_write = 0
         self.last_store = -1
 
@@ -305,6 +350,11 @@ class DataSet(DelegateAttributes):
         self.mode = DataMode.LOCAL
 
         if self.arrays:
+            # Formatters that keep the data in storage provide the arrays
+            if (self.location is not False and
+                    hasattr(self.formatter, 'init_arrays')):
+                self.formatter.init_arrays(self)
+
             for array in self.arrays.values():
                 array.init_data()
 
@@ -322,15 +372,21 @@ class DataSet(DelegateAttributes):
         # using:
         #     data_manager.restart()
         try:
-            data_manager.ask('new_data', self)
+            shared = data_manager.ask('new_data', self)
         except AttributeError:
             data_manager.restart()
-            data_manager.ask('new_data', self)
+            shared = data_manager.ask('new_data', self)
 
         # need to set data_manager *after* sending to data_manager because
         # we can't (and shouldn't) send data_manager itself through a queue
         self.data_manager = data_manager
 
+        if shared is not None:
+            # the DataServer keeps the arrays in shared memory, so we can
+            # store straight into them
+            shared.attach(self)
+            self._shared = shared
+
     def init_on_server(self):
         """
         Configure this DataSet as the DataServer copy.
@@ -349,6 +405,10 @@ class DataSet(DelegateAttributes):
             if self.is_on_server:
                 live_obj = data_manager.ask('get_data')
                 self.arrays = live_obj.arrays
+                shared = getattr(live_obj, '_shared', None)
+                if shared is not None:
+                    shared.attach(self, mode='r')
+                    self._shared = shared
             else:
                 self._init_local()
 
@@ -400,15 +460,20 @@ class DataSet(DelegateAttributes):
 
         with self.data_manager.query_lock:
             if self.is_on_server:
-                synced_indices = {
-                    array_id: array.get_synced_index()
-                    for array_id, array in self.arrays.items()
-                }
+                if self._shared is not None:
+                    # the new data is already in our arrays
+                    self._shared.mark_synced(self)
+                else:
+                    synced_indices = {
+                        array_id: array.get_synced_index()
+                        for array_id, array in self.arrays.items()
+                    }
 
-                changes = self.data_manager.ask('get_changes', synced_indices)
+                    changes = self.data_manager.ask('get_changes',
+                                                    synced_indices)
 
-                for array_id, array_changes in changes.items():
-                    self.arrays[array_id].apply_changes(**array_changes)
+                    for array_id, array_changes in changes.items():
+                        self.arrays[array_id].apply_changes(**array_changes)
 
                 measuring = self.data_manager.ask('get_measuring')
                 if not measuring:
@@ -416,15 +481,22 @@ class DataSet(DelegateAttributes):
                     # but the DataSet is still on the server,
                     # so we got the data, and don't need to read.
                     self.mode = DataMode.LOCAL
+                    self._detach_shared()
                     return False
                 return True
             else:
                 # this DataSet *thought* it was on the server, but it wasn't,
                 # so we haven't synced yet and need to read from storage
                 self.mode = DataMode.LOCAL
+                self._detach_shared()
                 self.read()
                 return False
 
+    def _detach_shared(self):
+        if self._shared is not None:
+            self._shared.detach(self)
+            self._shared = None
+
     def fraction_complete(self):
         """
         Get the fraction of this DataSet which has data in it.
@@ -595,9 +667,20 @@ class DataSet(DelegateAttributes):
                 to insert into that array.
          """
         if self.mode == DataMode.PUSH_TO_SERVER:
-            # Defers to the copy on the dataserver to call this identical
-            # function
-            self.data_manager.write('store_data', loop_indices, ids_values)
+            if self._shared is not None:
+                # straight into the DataServer's arrays
+                self._shared.store(self, loop_indices, ids_values)
+            else:
+                # Defers to the copy on the dataserver to call this
+                # identical function, a batch at a time
+                now = time.time()
+                if not self._store_batch:
+                    self._store_batch_start = now
+                self._store_batch.append((loop_indices, ids_values))
+                if (len(self._store_batch) >= self.push_batch_size or
+                        now - self._store_batch_start >=
+                        self.push_batch_period):
+                    self.push_store_batch()
         elif self.mode == DataMode.LOCAL:
             # You will always end up in this block, either in the copy
             # on the server (if you hit the if statement above) or else here
@@ -606,12 +689,35 @@ class DataSet(DelegateAttributes):
             self.last_store = time.time()
             if (self.write_period is not None and
                     time.time() > self.last_write + self.write_period):
-                self.write()
+                if self.write_in_background:
+                    self._background_writer().submit()
+                else:
+                    self.write()
                 self.last_write = time.time()
         else:  # in PULL_FROM_SERVER mode; store() isn't legal
             raise RuntimeError('This object is pulling from a DataServer, '
                                'so data insertion is not allowed.')
 
+    def push_store_batch(self, due_in=None):
+        """
+        Send the calls to ``store`` collected so far to the DataServer.
+
+        A Loop calls this before each delay, so data measured before a long
+        wait doesn't sit here until the next ``store``.
+
+        Args:
+            due_in (Optional[float]): only send them if they will be
+                ``push_batch_period`` old within this many seconds. Default
+                None, send them now anyway.
+        """
+        if not self._store_batch:
+            return
+        if (due_in is not None and time.time() + due_in -
+                self._store_batch_start < self.push_batch_period):
+            return
+        self.data_manager.write('store_batch', self._store_batch)
+        self._store_batch = []
+
     def default_parameter_name(self, paramname='amplitude'):
         """ Return name of default parameter for plotting
 
@@ -671,11 +777,24 @@ class DataSet(DelegateAttributes):
         paramname = self.default_parameter_name(paramname=paramname)
         return getattr(self, paramname, None)
 
-    def read(self):
-        """Read the whole DataSet from storage, overwriting the local data."""
+    def read(self, lazy=False):
+        """
+        Read the whole DataSet from storage, overwriting the local data.
+
+        Args:
+            lazy (bool): only open the arrays, and read their data as it is
+                indexed. Requires a formatter with a ``read_lazy`` method.
+                Default False.
+        """
         if self.location is False:
             return
-        self.formatter.read(self)
+        if lazy:
+            if not hasattr(self.formatter, 'read_lazy'):
+                raise ValueError('{} does not support lazy reading'.format(
+                    self.formatter.__class__.__name__))
+            self.formatter.read_lazy(self)
+        else:
+            self.formatter.read(self)
 
     def read_metadata(self):
         """Read the metadata from storage, overwriting the local data."""
@@ -692,6 +811,11 @@ class DataSet(DelegateAttributes):
         Args:
             write_metadata (bool): write the metadata to disk
         """
+        if self.profiler is not None:
+            return self.profiler.timed('write', self._write)(write_metadata)
+        self._write(write_metadata)
+
+    def _write(self, write_metadata):
         if self.mode != DataMode.LOCAL:
             raise RuntimeError('This object is connected to a DataServer, '
                                'which handles writing automatically.')
@@ -699,11 +823,25 @@ class DataSet(DelegateAttributes):
         if self.location is False:
             return
 
+        if self.write_in_background:
+            writer = self._background_writer()
+            writer.submit()
+            writer.wait()
+            if write_metadata:
+                self.formatter.write_metadata(self, self.io, self.location)
+            return
+
         self.formatter.write(self,
                              self.io,
                              self.location,
                              write_metadata=write_metadata)
 
+    def _background_writer(self):
+        if self._writer is None:
+            self._writer = BackgroundWriter(self)
+            self._writer.start()
+        return self._writer
+
     def write_copy(self, path=None, io_manager=None, location=None):
         """
         Write a new complete copy of this DataSet to storage.
@@ -786,14 +924,22 @@ class DataSet(DelegateAttributes):
         if self.mode == DataMode.PUSH_TO_SERVER:
             # Just like .store, if this DataSet is on the DataServer,
             # we defer to the copy there and execute this same method.
+            self.push_store_batch()
             self.data_manager.ask('finalize_data')
         elif self.mode == DataMode.LOCAL:
             # You will always end up in this block, either in the copy
             # on the server (if you hit the if statement above) or else here
-            self.write()
-
-            if hasattr(self.formatter, 'close_file'):
-                self.formatter.close_file(self)
+            # even if writing fails, stop the writer and close the file
+            try:
+                self.write()
+            finally:
+                try:
+                    if self._writer is not None:
+                        writer, self._writer = self._writer, None
+                        writer.stop()
+                finally:
+                    if hasattr(self.formatter, 'close_file'):
+                        self.formatter.close_file(self)
         else:
             raise RuntimeError('This mode does not allow finalizing',
                                self.mode)
@@ -21,6 +21,12 @@ class Formatter:
     - ``close_file``: to perform any final cleanup and release the
       file and any other resources.
 
+    Formatters that keep the data itself in storage, rather than writing
+    copies of it, may also implement:
+
+    - ``init_arrays``: to provide the ndarrays for a new ``DataSet``,
+      before its ``DataArray``\s would otherwise allocate them.
+
     and reading methods:
 
     - ``read`` or ``read_one_file`` to reconstruct the ``DataArray``\s, either
@@ -31,6 +37,12 @@ class Formatter:
       ``read``, this method should call ``read_metadata``, but keep it also
       as a separate method because it occasionally gets called independently.
 
+    Formatters that can open the ``DataArray``\s without reading all the
+    data may also implement:
+
+    - ``read_lazy``: like ``read``, but leave the data in storage until it
+      is indexed (used by ``load_data(..., lazy=True)``).
+
     All of these methods accept a ``data_set`` argument, which should be a
     ``DataSet`` object. Even if you are loading a new data set from disk, this
     object should already have attributes:
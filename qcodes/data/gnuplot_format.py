@@ -2,6 +2,7 @@ import numpy as np
 import re
 import math
 import json
+from itertools import chain, compress, islice
 
 from qcodes.utils.helpers import deep_update, NumpyJSONEncoder
 from .data_array import DataArray
@@ -33,6 +34,13 @@ class GNUPlotFormat(Formatter):
         always_nest (default True): whether to always make a folder for files
             or just make a single data file if all data has the same setpoints
 
+        write_chunk_size (default 10000): maximum number of rows to format
+            in one block while writing. Larger blocks are faster but use
+            more memory during the write.
+
+        read_chunk_size (default 100000): number of lines to parse in one
+            block while reading.
+
     These files are basically tab-separated values, but any quantity of
     any whitespace characters is accepted.
 
@@ -67,7 +75,8 @@ class GNUPlotFormat(Formatter):
     """
 
     def __init__(self, extension='dat', terminator='\n', separator='\t',
-                 comment='# ', number_format='g', metadata_file=None):
+                 comment='# ', number_format='g', metadata_file=None,
+                 write_chunk_size=10000, read_chunk_size=100000):
         self.metadata_file = metadata_file or 'snapshot.json'
         # file extension: accept either with or without leading dot
         self.extension = '.' + extension.lstrip('.')
@@ -94,6 +103,14 @@ class GNUPlotFormat(Formatter):
         # number format (only used for writing; will read any number)
         self.number_format = '{:' + number_format + '}'
 
+        if write_chunk_size < 1:
+            raise ValueError('write_chunk_size must be at least 1')
+        self.write_chunk_size = write_chunk_size
+
+        if read_chunk_size < 1:
+            raise ValueError('read_chunk_size must be at least 1')
+        self.read_chunk_size = read_chunk_size
+
     def read_one_file(self, data_set, f, ids_read):
         """
         Called by Formatter.read to bring one data file into
@@ -166,10 +183,33 @@ class GNUPlotFormat(Formatter):
             data_arrays.append(data_array)
             ids_read.add(array_id)
 
-        indices = [0] * ndim
-        first_point = True
-        resetting = 0
-        for line in f:
+        # position of the next point, and the blank lines seen since the
+        # last one. Carried from one block of lines to the next.
+        state = {'indices': [0] * ndim, 'first_point': True, 'resetting': 0}
+        while True:
+            lines = list(islice(f, self.read_chunk_size))
+            if not lines:
+                break
+            if not self._read_block(lines, set_arrays, data_arrays, state):
+                # something irregular in this block: fall back on reading
+                # it line by line, to get the same result (or error) as
+                # we always have.
+                self._read_lines(lines, set_arrays, data_arrays, state)
+
+        indices = state['indices']
+
+        # Since we skipped __setitem__, back up to the last read point and
+        # mark it as saved that far.
+        # Using mark_saved is better than directly setting last_saved_index
+        # because it also ensures modified_range is set correctly.
+        indices[-1] -= 1
+        for array in set_arrays + tuple(data_arrays):
+            array.mark_saved(array.flat_index(indices[:array.ndim]))
+
+    def _read_lines(self, lines, set_arrays, data_arrays, state):
+        indices = state['indices']
+        ndim = len(indices)
+        for line in lines:
             if self._is_comment(line):
                 continue
 
@@ -182,16 +222,17 @@ class GNUPlotFormat(Formatter):
                 # of setpoints that change, as there could be weird cases, like
                 # bidirectional sweeps, or highly diagonal sweeps, where this
                 # is incorrect. Anyway this really only matters for >2D sweeps.
-                if not first_point:
-                    resetting += 1
+                if not state['first_point']:
+                    state['resetting'] += 1
                 continue
 
             values = tuple(map(float, line.split()))
 
+            resetting = state['resetting']
             if resetting:
                 indices[-resetting - 1] += 1
                 indices[-resetting:] = [0] * resetting
-                resetting = 0
+                state['resetting'] = 0
 
             for value, set_array in zip(values[:ndim], set_arrays):
                 nparray = set_array.ndarray
@@ -210,15 +251,162 @@ class GNUPlotFormat(Formatter):
                 data_array.ndarray[tuple(indices)] = value
 
             indices[-1] += 1
-            first_point = False
+            state['first_point'] = False
 
-        # Since we skipped __setitem__, back up to the last read point and
-        # mark it as saved that far.
-        # Using mark_saved is better than directly setting last_saved_index
-        # because it also ensures modified_range is set correctly.
-        indices[-1] -= 1
-        for array in set_arrays + tuple(data_arrays):
-            array.mark_saved(array.flat_index(indices[:array.ndim]))
+    def _read_block(self, lines, set_arrays, data_arrays, state):
+        """
+        Read a block of lines with array operations.
+
+        Gives the same result as ``_read_lines`` for regular data. If the
+        block has anything we can't handle this way (unparseable numbers,
+        too many blank lines, points outside the array shape, inconsistent
+        setpoints) returns False *before* touching any array, so the block
+        can be reread by ``_read_lines``.
+
+        Returns:
+            bool: whether the block was read.
+        """
+        indices = state['indices']
+        ndim = len(indices)
+        ncols = ndim + len(data_arrays)
+
+        text = ''.join(lines)
+        if self.comment_chars in text:
+            lines = [line for line in lines if not self._is_comment(line)]
+            text = ''.join(lines)
+
+        # find the data rows, and the number of blank lines before each
+        is_data = ~np.fromiter(map(str.isspace, lines), bool, len(lines))
+        data_positions = np.flatnonzero(is_data)
+        npoints = len(data_positions)
+        if not npoints:
+            if not state['first_point']:
+                state['resetting'] += len(lines)
+            return True
+
+        resets = np.empty(npoints, dtype=int)
+        resets[1:] = np.diff(data_positions) - 1
+        if state['first_point']:
+            # blank lines before the first point don't reset anything
+            resets[0] = 0
+        else:
+            resets[0] = state['resetting'] + data_positions[0]
+        resetting = len(lines) - 1 - data_positions[-1]
+
+        rows = list(compress(lines, is_data))
+        row_lengths = np.fromiter(map(len, map(str.split, rows)), int,
+                                  npoints)
+        try:
+            # blank lines add nothing to the split, so use the whole text
+            flat_values = np.fromiter(map(float, text.split()),
+                                      float, int(row_lengths.sum()))
+        except ValueError:
+            return False
+
+        if (row_lengths == ncols).all():
+            values = flat_values.reshape(npoints, ncols)
+            present = None
+        else:
+            # partial (or overlong) rows: missing values stay NaN
+            columns = np.arange(ncols)
+            present = columns < row_lengths[:, np.newaxis]
+            row_starts = np.cumsum(row_lengths) - row_lengths
+            values = np.full((npoints, ncols), np.nan)
+            values[present] = flat_values[
+                (row_starts[:, np.newaxis] + columns)[present]]
+
+        # Reconstruct the loop indices. Relative to the previous point,
+        # a point after r blank lines increments index ndim - 1 - r and
+        # zeroes all the indices inside that.
+        steps = ndim - 1 - resets
+        if (steps < 0).any():
+            return False
+        previous = list(indices)
+        previous[-1] -= 1
+        point_indices = np.empty((npoints, ndim), dtype=int)
+        positions = np.arange(npoints)
+        for dim in range(ndim):
+            counts = np.cumsum(steps == dim)
+            last_reset = np.maximum.accumulate(
+                np.where(steps < dim, positions, -1))
+            offsets = np.where(last_reset >= 0, -counts[last_reset],
+                               previous[dim])
+            point_indices[:, dim] = counts + offsets
+        if (point_indices >= set_arrays[-1].shape).any():
+            return False
+
+        # validate all the setpoints before we store anything
+        set_updates = []
+        for i, set_array in enumerate(set_arrays):
+            if present is None:
+                set_rows = slice(None)
+            else:
+                set_rows = present[:, i]
+            update = self._merge_setpoints(set_array.ndarray,
+                                           point_indices[set_rows, :i + 1],
+                                           values[set_rows, i])
+            if update is False:
+                return False
+            set_updates.append(update)
+
+        for set_array, update in zip(set_arrays, set_updates):
+            if update is not None:
+                set_array.ndarray[update[0]] = update[1]
+
+        index_tuple = tuple(point_indices.T)
+        for i, data_array in enumerate(data_arrays):
+            data_array.ndarray[index_tuple] = values[:, ndim + i]
+
+        state['indices'] = point_indices[-1].tolist()
+        state['indices'][-1] += 1
+        state['first_point'] = False
+        state['resetting'] = resetting
+        return True
+
+    @staticmethod
+    def _merge_setpoints(nparray, set_indices, set_values):
+        """
+        Check new setpoint values against each other and what's stored.
+
+        Every run of points with the same setpoint index must match the
+        first non-NaN value at that index (whether already stored, or the
+        first non-NaN value read).
+
+        Returns:
+            False if the values are inconsistent, None if there is nothing
+            to store, or a tuple (index_tuple, values) to store.
+        """
+        npoints = len(set_values)
+        if not npoints:
+            return None
+
+        # points come in order, so repeated setpoint indices are contiguous
+        keys = np.ravel_multi_index(tuple(set_indices.T), nparray.shape)
+        run_start = np.empty(npoints, dtype=bool)
+        run_start[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=run_start[1:])
+        starts = np.flatnonzero(run_start)
+        run_ids = np.cumsum(run_start) - 1
+        run_indices = tuple(set_indices[starts].T)
+
+        stored = nparray[run_indices]
+        has_stored = ~np.isnan(stored)
+
+        positions = np.arange(npoints)
+        first_valid = np.minimum.reduceat(
+            np.where(np.isnan(set_values), npoints, positions), starts)
+        has_valid = first_valid < npoints
+        anchors = np.where(
+            has_stored, stored,
+            np.where(has_valid, set_values[np.minimum(first_valid,
+                                                      npoints - 1)], np.nan))
+
+        must_match = has_stored[run_ids] | (positions >
+                                            first_valid[run_ids])
+        if (set_values[must_match] != anchors[run_ids][must_match]).any():
+            return False
+
+        return run_indices, anchors
 
     def _is_comment(self, line):
         return line[:self.comment_len] == self.comment_chars
@@ -271,26 +459,12 @@ class GNUPlotFormat(Formatter):
 
             overwrite = save_range[0] == 0 or force_write
             open_mode = 'w' if overwrite else 'a'
-            shape = group.set_arrays[-1].shape
 
             with io_manager.open(fn, open_mode) as f:
                 if overwrite:
                     f.write(self._make_header(group))
 
-                for i in range(save_range[0], save_range[1] + 1):
-                    indices = np.unravel_index(i, shape)
-
-                    # insert a blank line for each loop that reset (to index 0)
-                    # note that if *all* indices are zero (the first point)
-                    # we won't put any blanks
-                    for j, index in enumerate(reversed(indices)):
-                        if index != 0:
-                            if j:
-                                f.write(self.terminator * j)
-                            break
-
-                    one_point = self._data_point(group, indices)
-                    f.write(self.separator.join(one_point) + self.terminator)
+                self._write_data(f, group, save_range)
 
             # now that we've saved the data, mark it as such in the data.
             # we mark the data arrays and the inner setpoint array. Outer
@@ -367,9 +541,63 @@ class GNUPlotFormat(Formatter):
     def _comment_line(self, items):
         return self.comment + self.separator.join(items) + self.terminator
 
-    def _data_point(self, group, indices):
+    def _write_data(self, f, group, save_range):
+        """
+        Write the rows ``save_range[0]`` to ``save_range[1]`` (inclusive
+        raveled indices) of one array group.
+
+        Rather than formatting one point at a time, each block of up to
+        ``write_chunk_size`` rows is formatted with a single call: the
+        columns are taken as flat slices of the underlying ndarrays and
+        the blank lines between loops are spliced into the row template
+        wherever the raveled index crosses a loop boundary.
+        """
+        shape = group.set_arrays[-1].shape
+        # number of points in the innermost 1, 2, ... ndim - 1 loops.
+        # A point that starts a block of k of these loops is preceded
+        # by k blank lines.
+        loop_sizes = [int(n) for n in np.cumprod(shape[::-1])[:-1]]
+
+        # (flat array, number of points per element) for each column
+        columns = []
         for array in group.set_arrays:
-            yield self.number_format.format(array[indices[:array.ndim]])
-
+            repeat = int(np.prod(shape[array.ndim:], dtype=int))
+            columns.append((np.ravel(array.ndarray), repeat))
         for array in group.data:
-            yield self.number_format.format(array[indices])
+            columns.append((np.ravel(array.ndarray), 1))
+
+        row_template = (self.separator.join([self.number_format] *
+                                            len(columns)) + self.terminator)
+
+        start, stop = save_range[0], save_range[1] + 1
+        while start < stop:
+            end = min(stop, start + self.write_chunk_size)
+            f.write(self._format_rows(columns, row_template, loop_sizes,
+                                      start, end))
+            start = end
+
+    def _format_rows(self, columns, row_template, loop_sizes, start, end):
+        templates = [row_template] * (end - start)
+
+        if loop_sizes:
+            inner_size = loop_sizes[0]
+            # first loop boundary in this block (we never put blank lines
+            # before the very first point)
+            first = -(-max(start, 1) // inner_size) * inner_size
+            for i in range(first, end, inner_size):
+                blanks = sum(1 for size in loop_sizes if i % size == 0)
+                templates[i - start] = (self.terminator * blanks +
+                                        row_template)
+
+        column_values = []
+        for flat_array, repeat in columns:
+            if repeat == 1:
+                values = flat_array[start:end]
+            else:
+                values = flat_array[np.arange(start, end) // repeat]
+            # tolist gives python scalars of the array's own type, so the
+            # text is identical to formatting each element individually
+            column_values.append(values.tolist())
+
+        return ''.join(templates).format(
+            *chain.from_iterable(zip(*column_values)))
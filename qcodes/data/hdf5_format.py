@@ -2,6 +2,9 @@ import numpy as np
 import logging
 import h5py
 import os
+from collections import OrderedDict
+from itertools import count
+from numbers import Integral
 
 from .data_array import DataArray
 from .format import Formatter
@@ -12,8 +15,40 @@ class HDF5Format(Formatter):
     HDF5 formatter for saving qcodes datasets.
 
     Capable of storing (write) and recovering (read) qcodes datasets.
+
+    Each DataArray is stored as an hdf5 dataset with the same shape as the
+    array, chunked along the inner loop so that each write only touches the
+    chunks holding the ``modified_range`` of the array. Points that have not
+    been written read back as NaN.
+
+    Files written by older versions, which stored every array as a single
+    ``(N, 1)`` column, can still be read.
+
+    Args:
+        compression (Optional[str]): compression filter for the data, such
+            as ``'gzip'`` or ``'lzf'``. Default None (no compression).
+
+        compression_opts (Optional[int]): options for the compression
+            filter, such as the gzip compression level (0-9).
+
+        chunk_size (int): target number of points per chunk. Chunks hold
+            whole inner loops where possible, so they may be smaller (if
+            the inner loop doesn't divide this) or larger (if one inner loop
+            is not enough). Default 8192.
+
+        cache_size (int): memory cap, in bytes, for data read from arrays
+            that were loaded lazily (``load_data(..., lazy=True)``). The
+            cache is shared by all DataSets read with this formatter, and
+            drops the least recently used data first. Default 256 MB.
     """
 
+    def __init__(self, compression=None, compression_opts=None,
+                 chunk_size=8192, cache_size=2**28):
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.chunk_size = chunk_size
+        self.cache = ChunkCache(cache_size)
+
     def close_file(self, data_set):
         """
         Closes the hdf5 file open in the dataset.
@@ -44,7 +79,18 @@ class HDF5Format(Formatter):
                                                 io_manager=data_set.io)
         data_set._h5_base_group = h5py.File(filepath, 'r+')
 
-    def read(self, data_set, location=None):
+    def read_lazy(self, data_set, location=None):
+        """
+        Open an hdf5 file without reading the data.
+
+        Like ``read``, but each DataArray is backed by a ``LazyHDF5Array``,
+        which only reads (and caches) the parts of the data you index into.
+        The file stays open until ``close_file``, after which the data that
+        was not loaded yet can no longer be read.
+        """
+        return self.read(data_set, location, lazy=True)
+
+    def read(self, data_set, location=None, lazy=False):
         """
         Reads an hdf5 file specified by location into a data_set object.
         If no data_set is provided will creata an empty data_set to read into.
@@ -75,15 +121,24 @@ class HDF5Format(Formatter):
             set_arrays = [s.decode() for s in set_arrays]
             # else:
             #     set_arrays = ()
-            vals = dat_arr.value[:, 0]
-            if 'shape' in dat_arr.attrs.keys():
-                vals = vals.reshape(dat_arr.attrs['shape'])
+            if lazy and dat_arr.maxshape != (None, 1):
+                vals = LazyHDF5Array(dat_arr, self.cache)
+            else:
+                # old style datasets need reshaping, so they are never lazy
+                vals = self._read_values(dat_arr)
             if array_id not in data_set.arrays.keys():  # create new array
-                d_array = DataArray(
-                    name=name, array_id=array_id, label=label, parameter=None,
-                    unit=unit,
-                    is_setpoint=is_setpoint, set_arrays=(),
-                    preset_data=vals)
+                if isinstance(vals, LazyHDF5Array):
+                    d_array = DataArray(
+                        name=name, array_id=array_id, label=label,
+                        parameter=None, unit=unit, is_setpoint=is_setpoint,
+                        set_arrays=(), shape=vals.shape)
+                    d_array.ndarray = vals
+                    d_array.init_data()
+                else:
+                    d_array = DataArray(
+                        name=name, array_id=array_id, label=label,
+                        parameter=None, unit=unit, is_setpoint=is_setpoint,
+                        set_arrays=(), preset_data=vals)
                 data_set.add_array(d_array)
             else:  # update existing array with extracted values
                 d_array = data_set.arrays[array_id]
@@ -92,7 +147,12 @@ class HDF5Format(Formatter):
                 d_array.unit = unit
                 d_array.is_setpoint = is_setpoint
                 d_array.ndarray = vals
-                d_array.shape = dat_arr.attrs['shape']
+                d_array.shape = vals.shape
+                d_array.init_data()
+            if isinstance(vals, LazyHDF5Array):
+                # all of the data is in the file already
+                d_array.modified_range = None
+                d_array.mark_saved(vals.size - 1)
             # needed because I cannot add set_arrays at this point
             data_set.arrays[array_id]._sa_array_ids = set_arrays
 
@@ -165,27 +225,27 @@ class HDF5Format(Formatter):
         else:
             arr_group = data_set._h5_base_group[data_name]
 
-        for array_id in data_set.arrays.keys():
-            if array_id not in arr_group.keys() or force_write:
-                self._create_dataarray_dset(array=data_set.arrays[array_id],
-                                            group=arr_group)
+        for array_id, array in data_set.arrays.items():
+            if array_id in arr_group.keys() and (
+                    force_write or arr_group[array_id].shape != array.shape):
+                # rewriting everything, or the dataset was written by an
+                # older version (as an (N, 1) column): we need to start over
+                del arr_group[array_id]
+            if array_id not in arr_group.keys():
+                self._create_dataarray_dset(array=array, group=arr_group)
+                # anything we saved before is not in this file
+                array.clear_save()
             dset = arr_group[array_id]
-            # Resize the dataset and add the new values
-
-            # dataset refers to the hdf5 dataset here
-            datasetshape = dset.shape
-            old_dlen = datasetshape[0]
-            x = data_set.arrays[array_id]
-            new_dlen = len(x[~np.isnan(x)])
-            new_datasetshape = (new_dlen,
-                                datasetshape[1])
-            dset.resize(new_datasetshape)
-            new_data_shape = (new_dlen - old_dlen, datasetshape[1])
-            dset[old_dlen:new_dlen] = x[old_dlen:new_dlen].reshape(
-                new_data_shape)
-            # allow resizing extracted data, here so it gets written for
-            # incremental writes aswell
-            dset.attrs['shape'] = x.shape
+
+            # only push the changes, the rest of the file is already there
+            # (or still holds the NaN fill value)
+            save_range = array.modified_range
+            if save_range:
+                for slab in _hyperslabs(array.shape, save_range[0],
+                                        save_range[1] + 1):
+                    dset[slab] = array.ndarray[slab]
+                array.mark_saved(save_range[1])
+
         if write_metadata:
             self.write_metadata(
                 data_set, io_manager=io_manager, location=location)
@@ -216,9 +276,18 @@ class HDF5Format(Formatter):
             name = array.array_id
 
         # Create the hdf5 dataset
-        dset = group.create_dataset(
-            array.array_id, (0, 1),
-            maxshape=(None, 1))
+        shape = tuple(array.shape)
+        if shape and all(shape):
+            dset = group.create_dataset(
+                array.array_id, shape, dtype=float, fillvalue=np.nan,
+                chunks=self._chunk_shape(shape),
+                compression=self.compression,
+                compression_opts=self.compression_opts)
+        else:
+            # scalar or empty arrays can't be chunked
+            dset = group.create_dataset(array.array_id, shape, dtype=float,
+                                        fillvalue=np.nan)
+        dset.attrs['shape'] = shape
         dset.attrs['label'] = _encode_to_utf8(str(label))
         dset.attrs['name'] = _encode_to_utf8(str(name))
         dset.attrs['unit'] = _encode_to_utf8(str(array.unit or ''))
@@ -233,6 +302,34 @@ class HDF5Format(Formatter):
 
         return dset
 
+    def _chunk_shape(self, shape):
+        """
+        Chunks of whole inner loops, about ``chunk_size`` points each.
+        """
+        chunks = []
+        remaining = max(self.chunk_size, 1)
+        for size in reversed(shape):
+            n = max(min(size, remaining), 1)
+            chunks.insert(0, n)
+            remaining //= size
+        return tuple(chunks)
+
+    @staticmethod
+    def _read_values(dset):
+        """
+        Read the values of an hdf5 dataset as an ndarray of the right shape.
+        """
+        if dset.maxshape != (None, 1):
+            return dset[...]
+
+        # older files store an (N, 1) column, which may stop short of the
+        # full array if the data was not complete.
+        shape = tuple(dset.attrs.get('shape', dset.shape[:1]))
+        vals = np.full(int(np.prod(shape)), np.nan)
+        column = dset[:, 0]
+        vals[:len(column)] = column
+        return vals.reshape(shape)
+
     def write_metadata(self, data_set, io_manager=None, location=None, read_first=True):
         """
         Writes metadata of dataset to file using write_dict_to_hdf5 method
@@ -380,6 +477,211 @@ def _encode_to_utf8(s):
     return s.encode('utf-8')
 
 
+class ChunkCache:
+    """
+    Least recently used cache of blocks of data read from hdf5 files.
+
+    Args:
+        max_bytes (int): how much data to hold on to. A block bigger than
+            this on its own is still returned, but not kept.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._blocks = OrderedDict()
+
+    def get(self, key, read):
+        """
+        Get a block from the cache, or read it and add it to the cache.
+
+        Args:
+            key (hashable): identifies the block.
+            read (callable): with no arguments, returns the block as a
+                numpy array if it is not in the cache.
+
+        Returns:
+            numpy.ndarray: the block. Do not change it, it is shared.
+        """
+        block = self._blocks.get(key)
+        if block is not None:
+            self._blocks.move_to_end(key)
+            return block
+
+        block = read()
+        self._blocks[key] = block
+        self.nbytes += block.nbytes
+        while self.nbytes > self.max_bytes and self._blocks:
+            _, dropped = self._blocks.popitem(last=False)
+            self.nbytes -= dropped.nbytes
+        return block
+
+    def clear(self):
+        """Drop all blocks from the cache."""
+        self._blocks.clear()
+        self.nbytes = 0
+
+
+class LazyHDF5Array:
+    """
+    A read-only, array-like view of an hdf5 dataset.
+
+    Used as the ``ndarray`` of DataArrays that were loaded lazily. Indexing
+    with integers and slices only reads the blocks of rows (along the first,
+    outer loop, dimension) that are needed, and keeps them in a
+    ``ChunkCache``. Anything else, like ``numpy.asarray``, arithmetic,
+    or other ndarray methods, reads the whole array.
+
+    Args:
+        dset (h5py.Dataset): the dataset holding the data.
+
+        cache (ChunkCache): where to keep the blocks we read.
+
+        block_size (int): approximate number of points to read at once.
+            Rounded to whole rows and to whole chunks of the dataset.
+            Default 2**17.
+    """
+    _ids = count()
+
+    def __init__(self, dset, cache, block_size=2**17):
+        self.dset = dset
+        self.cache = cache
+        self.shape = tuple(dset.shape)
+        self.dtype = dset.dtype
+        self.ndim = len(self.shape)
+        self.size = int(np.prod(self.shape))
+        self.nbytes = self.size * self.dtype.itemsize
+
+        row_size = int(np.prod(self.shape[1:]))
+        rows = max(block_size // max(row_size, 1), 1)
+        if dset.chunks:
+            chunk_rows = dset.chunks[0]
+            rows = max(rows // chunk_rows, 1) * chunk_rows
+        self.block_rows = rows
+        self._id = next(self._ids)
+
+    def __len__(self):
+        if not self.shape:
+            raise TypeError('len() of unsized object')
+        return self.shape[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return '<{} {} {}>'.format(self.__class__.__name__,
+                                   self.shape, self.dtype)
+
+    def __array__(self, dtype=None):
+        vals = self.load()
+        return vals if dtype is None else vals.astype(dtype)
+
+    def __getattr__(self, key):
+        # everything else an ndarray can do, on the whole array
+        if key.startswith('_') or 'dset' not in self.__dict__:
+            raise AttributeError(key)
+        return getattr(self.load(), key)
+
+    def __setitem__(self, key, value):
+        raise TypeError('lazily loaded data is read-only, call load() on '
+                        'the DataArray first to change it')
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if not self.shape or not key or not self._is_basic(key[0]):
+            return self.load()[key]
+
+        first, rest = key[0], key[1:]
+        if first is Ellipsis:
+            first, rest = slice(None), key
+
+        if isinstance(first, slice):
+            rows = range(*first.indices(self.shape[0]))
+            if not rows:
+                empty = np.empty((0,) + self.shape[1:], self.dtype)
+                return empty[(slice(None),) + rest]
+            low, high = min(rows), max(rows)
+            vals = self._read_rows(low, high + 1)
+            # a new array, so the cached blocks stay safe
+            return vals[[row - low for row in rows]][(slice(None),) + rest]
+
+        row = int(first)
+        if row < 0:
+            row += self.shape[0]
+        if not 0 <= row < self.shape[0]:
+            raise IndexError('index {} is out of bounds for axis 0 with '
+                             'size {}'.format(first, self.shape[0]))
+        block = self._read_block(row // self.block_rows)
+        vals = block[row % self.block_rows][rest]
+        return vals.copy() if isinstance(vals, np.ndarray) else vals
+
+    @staticmethod
+    def _is_basic(index):
+        return (isinstance(index, (Integral, slice)) or index is Ellipsis)
+
+    def _read_block(self, i):
+        start = i * self.block_rows
+        stop = start + self.block_rows
+        return self.cache.get((self._id, i), lambda: self.dset[start:stop])
+
+    def _read_rows(self, start, stop):
+        first = start // self.block_rows
+        last = (stop - 1) // self.block_rows
+        offset = first * self.block_rows
+        blocks = [self._read_block(i) for i in range(first, last + 1)]
+        if len(blocks) == 1:
+            return blocks[0][start - offset:stop - offset]
+        return np.concatenate(blocks)[start - offset:stop - offset]
+
+    def load(self):
+        """
+        Read all the data.
+
+        Returns:
+            numpy.ndarray: a new in-memory copy of the whole array.
+        """
+        return self.dset[...]
+
+
+def _hyperslabs(shape, start, stop):
+    """
+    Split the raveled index range ``start:stop`` of an array into
+    rectangular pieces.
+
+    hdf5 can only select hyperslabs, not arbitrary ranges of a raveled array.
+    A range is made of a partial inner loop at each end, and complete inner
+    loops in between, so we need at most ``2 * len(shape) - 1`` pieces.
+
+    Yields:
+        tuple: index (of ints and slices) of each piece.
+    """
+    if start >= stop:
+        return
+    if len(shape) == 1:
+        yield (slice(start, stop),)
+        return
+
+    inner_size = int(np.prod(shape[1:]))
+    first, first_rest = divmod(start, inner_size)
+    last, last_rest = divmod(stop, inner_size)
+
+    if first == last:
+        for piece in _hyperslabs(shape[1:], first_rest, last_rest):
+            yield (first,) + piece
+        return
+
+    if first_rest:
+        for piece in _hyperslabs(shape[1:], first_rest, inner_size):
+            yield (first,) + piece
+        first += 1
+    if last > first:
+        yield (slice(first, last),) + (slice(None),) * (len(shape) - 1)
+    if last_rest:
+        for piece in _hyperslabs(shape[1:], 0, last_rest):
+            yield (last,) + piece
+
+
 def str_to_bool(s):
     if s == 'True':
         return True
@@ -4,6 +4,7 @@ from traceback import format_exc
 import logging
 
 from qcodes.process.server import ServerManager, BaseServer
+from .shared_memory import SharedArrays
 
 
 def get_data_manager(only_existing=False):
@@ -70,11 +71,21 @@ class DataServer(BaseServer):
     they are nearly identical objects, but are configured differently so that
     the loop `DataSet` doesn't hold any data itself, it only passes that data
     on to the `DataServer`
+
+    With `use_shared_memory` (the default), the arrays of the running
+    `DataSet` are kept in shared memory (see `SharedArrays`), which the loop
+    stores into and live copies read from directly. Then only the
+    `DataServer` copy writes to storage, and no data goes through the queues.
     """
     default_storage_period = 1  # seconds between data storage calls
     queries_per_store = 5
     default_monitor_period = 60  # seconds between monitoring storage calls
 
+    # keep the arrays of the live DataSet in shared memory, so the loop
+    # and live copies use them directly instead of sending data through
+    # the queues
+    use_shared_memory = True
+
     def __init__(self, query_queue, response_queue, extras=None):
         super().__init__(query_queue, response_queue, extras)
 
@@ -82,6 +93,7 @@ class DataServer(BaseServer):
         self._monitor_period = self.default_monitor_period
 
         self._data = NoData()
+        self._shared = None
         self._measuring = False
 
         self.run_event_loop()
@@ -105,6 +117,7 @@ class DataServer(BaseServer):
                 if self._measuring and now > next_store_ts:
                     td = timedelta(seconds=self._storage_period)
                     next_store_ts = now + td
+                    self._mark_shared_modified()
                     self._data.write()
 
                 if now > next_monitor_ts:
@@ -131,19 +144,44 @@ class DataServer(BaseServer):
         self._data.init_on_server()
         self._measuring = True
 
+        if self.use_shared_memory:
+            self._shared = self._data._shared = SharedArrays.create(data_set)
+            return self._shared
+
     def handle_finalize_data(self):
         """
         Mark this DataSet as complete and write its final changes to storage
         """
+        self._mark_shared_modified()
         self._data.finalize()
         self._measuring = False
 
+        if self._shared is not None:
+            self._data._detach_shared()
+            self._shared.remove()
+            self._shared = None
+
+    def _mark_shared_modified(self):
+        if self._shared is not None:
+            self._shared.mark_modified(self._data)
+
     def handle_store_data(self, *args):
         """
         Put some data into the DataSet
         """
         self._data.store(*args)
 
+    def handle_store_batch(self, batch):
+        """
+        Put several sets of data into the DataSet
+
+        Args:
+            batch (List[tuple]): the ``(loop_indices, ids_values)`` arguments
+                of each call to ``DataSet.store``, in order.
+        """
+        for loop_indices, ids_values in batch:
+            self._data.store(loop_indices, ids_values)
+
     def handle_get_measuring(self):
         """
         Is a measurement loop presently running?
@@ -160,4 +198,5 @@ class DataServer(BaseServer):
         """
         Return all new data after the last sync
         """
+        self._mark_shared_modified()
         return self._data.get_changes(synced_indices)
@@ -0,0 +1,319 @@
+import json
+import mmap
+import os
+
+import numpy as np
+
+from qcodes.utils.helpers import deep_update, NumpyJSONEncoder
+from .data_array import DataArray
+from .format import Formatter
+
+
+class MemmapFormat(Formatter):
+    """
+    Saves each DataArray as a binary ``.npy`` file, memory-mapped into the
+    DataArray itself.
+
+    Once a DataSet is set up with this formatter, its DataArrays are backed
+    directly by the files: ``DataSet.store`` writes into the page cache, and
+    ``write`` only has to flush the ``modified_range`` of each array and
+    record how far it got. Nothing has to fit in RAM, so this is meant for
+    very large DataSets. Loading opens the files without reading them, data
+    is only paged in when you index into the arrays.
+
+    The files in each location are:
+
+    - ``<array_id>.npy`` for each DataArray, readable with ``numpy.load``
+      even without qcodes. Points that have not been measured are NaN.
+    - ``arrays.json``: the structure of the DataSet (names, labels, units,
+      setpoints of each array) and the last saved index of each array.
+    - ``snapshot.json``: the metadata, as in ``GNUPlotFormat``.
+
+    Args:
+        extension (default 'npy'): file extension for data files
+
+        index_file (default 'arrays.json'): file describing the arrays
+
+        metadata_file (default 'snapshot.json'): file for the metadata
+    """
+
+    def __init__(self, extension='npy', index_file=None, metadata_file=None):
+        self.extension = '.' + extension.lstrip('.')
+        self.index_file = index_file or 'arrays.json'
+        self.metadata_file = metadata_file or 'snapshot.json'
+
+    def init_arrays(self, data_set):
+        """
+        Create the data files for a new DataSet and use them as its arrays.
+
+        Called by the DataSet before it initializes its DataArrays, so the
+        arrays never need to be allocated in memory. Preset data (such as
+        setpoints) is copied into the files.
+
+        Args:
+            data_set (DataSet): the DataSet whose arrays to create.
+        """
+        io_manager = data_set.io
+        location = data_set.location
+        for array in data_set.arrays.values():
+            path = self._array_path(io_manager, location, array)
+            mm = self._create_file(path, array.shape)
+            self._fill(mm, array.ndarray)
+            array.ndarray = mm
+
+    def write(self, data_set, io_manager, location, write_metadata=True,
+              force_write=False):
+        """
+        Write updates in this DataSet to storage.
+
+        Arrays that are already backed by their file at this location just
+        get their modified range flushed. Otherwise we write the arrays into
+        new files (or the modified range into existing files, if we have
+        saved there before); if this is the DataSet's own location the
+        arrays are backed by these files from now on.
+
+        Args:
+            data_set (DataSet): the data we're storing
+            io_manager (io_manager): the base location to write to
+            location (str): the file location within io_manager
+            write_metadata (bool): if True, then the metadata is written
+            force_write (bool): if True, write every array completely to
+                new files.
+        """
+        own_location = (data_set.location is not False and
+                        io_manager.to_path(location) ==
+                        data_set.io.to_path(data_set.location))
+
+        for array in data_set.arrays.values():
+            path = self._array_path(io_manager, location, array)
+            mr = array.modified_range
+
+            if self._is_backed(array, path):
+                if force_write:
+                    self._flush(array.ndarray, 0, array.ndarray.size - 1)
+                elif mr:
+                    self._flush(array.ndarray, *mr)
+            else:
+                mm = None
+                if not force_write and array.last_saved_index is not None:
+                    # we've saved before, just add the changes
+                    mm = self._open_existing(path, array.shape)
+                    save_range = mr
+                if mm is None:
+                    mm = self._create_file(path, array.shape)
+                    save_range = (0, array.ndarray.size - 1)
+
+                if save_range:
+                    lo, hi = save_range
+                    mm.reshape(-1)[lo:hi + 1] = (
+                        array.ndarray.reshape(-1)[lo:hi + 1])
+                    self._flush(mm, lo, hi)
+
+                if own_location:
+                    array.ndarray = mm
+                else:
+                    del mm
+
+            last_index = array.last_saved_index
+            if mr:
+                last_index = max(mr[1], -1 if last_index is None
+                                 else last_index)
+            if last_index is not None:
+                array.mark_saved(last_index)
+
+        self._write_index(data_set, io_manager, location)
+
+        if write_metadata:
+            self.write_metadata(
+                data_set, io_manager=io_manager, location=location)
+
+    def read(self, data_set):
+        """
+        Open the arrays of a DataSet, without reading their data.
+
+        The arrays are memory-mapped copy-on-write, so they can be changed
+        in memory. Changes will only reach the files if the DataSet is
+        written again.
+
+        Args:
+            data_set (DataSet): the data to read into. Should already have
+                attributes ``io`` (an io manager), ``location`` (string),
+                and ``arrays`` (dict of ``{array_id: array}``, can be empty
+                or can already have some or all of the arrays present, they
+                expect to be overwritten)
+        """
+        io_manager = data_set.io
+        location = data_set.location
+
+        index_fn = io_manager.join(location, self.index_file)
+        if not io_manager.list(index_fn):
+            raise IOError('no data found at ' + location)
+
+        with io_manager.open(index_fn, 'r') as f:
+            index = json.load(f)
+
+        self.read_metadata(data_set)
+
+        arrays = data_set.arrays
+        for array_id, info in index['arrays'].items():
+            path = self._array_path(io_manager, location, array_id)
+            mm = np.load(path, mmap_mode='c')
+            shape = tuple(info['shape'])
+            if mm.shape != shape:
+                raise ValueError('shape of file does not match', path,
+                                 mm.shape, shape)
+
+            if array_id in arrays:
+                array = arrays[array_id]
+                if array.shape != shape:
+                    raise ValueError('shapes do not match for array: ' +
+                                     array_id)
+                array.ndarray = mm
+                array.init_data()
+            else:
+                array = DataArray(
+                    name=info['name'], array_id=array_id,
+                    label=info['label'], unit=info['unit'],
+                    is_setpoint=info['is_setpoint'], shape=shape,
+                    snapshot=data_set.get_array_metadata(array_id))
+                array.init_data(mm)
+                data_set.add_array(array)
+
+            # the file holds whatever we saved, nothing is modified (yet)
+            array.modified_range = None
+            array.last_saved_index = None
+            if info['last_saved_index'] is not None:
+                array.mark_saved(info['last_saved_index'])
+
+        for array_id, info in index['arrays'].items():
+            arrays[array_id].set_arrays = tuple(
+                arrays[set_id] for set_id in info['set_arrays'])
+
+    def write_metadata(self, data_set, io_manager, location, read_first=True):
+        """
+        Write all metadata in this DataSet to storage.
+
+        Args:
+            data_set (DataSet): the data we're storing
+
+            io_manager (io_manager): the base location to write to
+
+            location (str): the file location within io_manager
+
+            read_first (bool, optional): read previously saved metadata before
+                writing? The current metadata will still be the used if
+                there are changes, but if the saved metadata has information
+                not present in the current metadata, it will be retained.
+                Default True.
+        """
+        if read_first:
+            # In case the saved file has more metadata than we have here,
+            # read it in first. But any changes to the in-memory copy should
+            # override the saved file data.
+            memory_metadata = data_set.metadata
+            data_set.metadata = {}
+            self.read_metadata(data_set)
+            deep_update(data_set.metadata, memory_metadata)
+
+        fn = io_manager.join(location, self.metadata_file)
+        with io_manager.open(fn, 'w', encoding='utf8') as snap_file:
+            json.dump(data_set.metadata, snap_file, sort_keys=True,
+                      indent=4, ensure_ascii=False, cls=NumpyJSONEncoder)
+
+    def read_metadata(self, data_set):
+        io_manager = data_set.io
+        location = data_set.location
+        fn = io_manager.join(location, self.metadata_file)
+        if io_manager.list(fn):
+            with io_manager.open(fn, 'r') as snap_file:
+                metadata = json.load(snap_file)
+            data_set.metadata.update(metadata)
+
+    def _array_path(self, io_manager, location, array):
+        array_id = getattr(array, 'array_id', array)
+        return io_manager.to_path(
+            io_manager.join(location, array_id + self.extension))
+
+    @staticmethod
+    def _create_file(path, shape):
+        folder = os.path.dirname(path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        return np.lib.format.open_memmap(path, mode='w+', dtype=float,
+                                         shape=shape)
+
+    @staticmethod
+    def _open_existing(path, shape):
+        if not os.path.isfile(path):
+            return None
+        mm = np.load(path, mmap_mode='r+')
+        if mm.shape != shape or mm.dtype != float:
+            return None
+        return mm
+
+    @staticmethod
+    def _fill(mm, data, block_size=2**20):
+        """Fill a new file with data (or NaN) a block at a time."""
+        flat = mm.reshape(-1)
+        values = None if data is None else np.ravel(data)
+        for start in range(0, flat.size, block_size):
+            end = start + block_size
+            if values is None:
+                flat[start:end] = np.nan
+            else:
+                flat[start:end] = values[start:end]
+
+    @staticmethod
+    def _is_backed(array, path):
+        mm = array.ndarray
+        return (isinstance(mm, np.memmap) and mm.mode in ('r+', 'w+') and
+                mm.filename == os.path.abspath(path))
+
+    @staticmethod
+    def _flush(mm, lo, hi):
+        """
+        Flush the pages holding raveled indices lo to hi to disk.
+
+        Falls back on flushing the whole map if we can't find the mmap
+        behind it.
+        """
+        base = getattr(mm, '_mmap', None)
+        if base is None:
+            mm.flush()
+            return
+
+        # byte range within the mmap (which starts at an allocation boundary
+        # somewhere at or before the start of the data)
+        data_start = mm.offset % mmap.ALLOCATIONGRANULARITY
+        start = data_start + lo * mm.itemsize
+        end = data_start + (hi + 1) * mm.itemsize
+        start -= start % mmap.ALLOCATIONGRANULARITY
+        base.flush(start, end - start)
+
+    def _write_index(self, data_set, io_manager, location):
+        index = {'arrays': {}}
+        for array_id, array in data_set.arrays.items():
+            index['arrays'][array_id] = {
+                'name': array.name,
+                'label': array.label,
+                'unit': array.unit,
+                'is_setpoint': array.is_setpoint,
+                'set_arrays': [sa.array_id for sa in array.set_arrays],
+                'shape': array.shape,
+                'last_saved_index': array.last_saved_index
+            }
+
+        fn = io_manager.join(location, self.index_file)
+        with io_manager.open(fn, 'w', encoding='utf8') as f:
+            json.dump(index, f, sort_keys=True, indent=4,
+                      ensure_ascii=False, cls=NumpyJSONEncoder)
+
+    def close_file(self, data_set):
+        """
+        Flush every array to disk.
+
+        The arrays stay memory-mapped, so the DataSet can still be used.
+        """
+        for array in data_set.arrays.values():
+            if isinstance(array.ndarray, np.memmap):
+                array.ndarray.flush()
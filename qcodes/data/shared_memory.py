@@ -0,0 +1,205 @@
+"""Share the arrays of a live DataSet between processes."""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# columns of SharedArrays._ranges
+_LOW, _HIGH, _PENDING_LOW, _PENDING_HIGH, _STORES, _SEEN = range(6)
+
+
+def _shared_dir():
+    # a RAM-backed file system, if we have one
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+class SharedArrays:
+    """
+    Shared memory holding the arrays of the DataSet in the DataServer.
+
+    Each array is a memory-mapped file (in ``/dev/shm`` where available) that
+    the DataServer, the measurement loop and any live copies of the DataSet
+    all map into their own ``DataArray``. The loop stores its data directly
+    into these files, and records the range of flat indices it has stored
+    to in each array, so no data has to be sent between the processes, and
+    no messages at all are needed for ``store``.
+
+    Data may come in any order (a Loop with a snake or Hilbert ``order``
+    goes back over rows it already started). The writer collects the range
+    it stored to since the DataServer last looked, and the DataServer
+    marks exactly that range modified, so points stored below the last
+    saved index are written too. Live copies still only follow the highest
+    index stored, like ``DataArray.get_changes``.
+
+    Only the location and array ids are pickled, so this can be sent to
+    other processes, which then ``attach`` to the files.
+
+    Args:
+        path (str): the folder holding the files.
+        array_ids (Sequence[str]): the arrays in the files.
+    """
+    ranges_file = 'ranges.npy'
+
+    def __init__(self, path, array_ids):
+        self.path = path
+        self.array_ids = tuple(array_ids)
+        self._positions = {array_id: i
+                           for i, array_id in enumerate(self.array_ids)}
+        self._ranges = None
+
+    @classmethod
+    def create(cls, data_set):
+        """
+        Move the arrays of a DataSet into new shared memory files.
+
+        The DataArrays keep their data and saved state, but are mapped to
+        the files from now on.
+
+        Args:
+            data_set (DataSet): an initialized DataSet, normally the
+                DataServer copy.
+
+        Returns:
+            SharedArrays: the new shared memory, attached to ``data_set``.
+        """
+        path = tempfile.mkdtemp(prefix='qcodes_', dir=_shared_dir())
+        shared = cls(path, data_set.arrays.keys())
+
+        for array_id, array in data_set.arrays.items():
+            mm = np.lib.format.open_memmap(
+                shared._array_path(array_id), mode='w+',
+                dtype=array.ndarray.dtype, shape=array.shape)
+            mm[...] = array.ndarray
+            array.ndarray = mm
+
+        # for each array, the columns are:
+        # - LOW, HIGH: all the flat indices stored to so far
+        # - PENDING_LOW, PENDING_HIGH: those stored to since the DataServer
+        #   last marked them modified
+        # - STORES: how many stores the loop has made (only it writes 0-4)
+        # - SEEN: STORES when the DataServer last read PENDING (only it
+        #   writes this), so the loop knows to start a new PENDING range
+        shared._ranges = np.lib.format.open_memmap(
+            os.path.join(path, cls.ranges_file), mode='w+', dtype=np.int64,
+            shape=(len(shared.array_ids), 6))
+        shared._ranges[:] = -1
+        shared._ranges[:, _STORES] = 0
+        shared._ranges[:, _SEEN] = 0
+
+        return shared
+
+    def __getstate__(self):
+        return {'path': self.path, 'array_ids': self.array_ids}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def attach(self, data_set, mode='r+'):
+        """
+        Map the shared files into the arrays of a DataSet.
+
+        Args:
+            data_set (DataSet): a copy of the DataSet these arrays came from.
+            mode (str): ``'r+'`` to be able to store data, or ``'r'`` to
+                only read it. Default ``'r+'``.
+        """
+        for array_id in self.array_ids:
+            array = data_set.arrays[array_id]
+            array.ndarray = np.load(self._array_path(array_id),
+                                    mmap_mode=mode)
+            array.init_data()
+        self._ranges = np.load(os.path.join(self.path, self.ranges_file),
+                               mmap_mode=mode)
+
+    def detach(self, data_set):
+        """Copy the data of a DataSet out of shared memory."""
+        for array_id in self.array_ids:
+            array = data_set.arrays[array_id]
+            if isinstance(array.ndarray, np.memmap):
+                array.ndarray = np.array(array.ndarray)
+        self._ranges = None
+
+    def remove(self):
+        """
+        Delete the shared files.
+
+        Processes that still have them mapped can keep using them (except
+        on Windows, where we can't delete them until they're closed).
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def store(self, data_set, loop_indices, ids_values):
+        """
+        Store data into shared memory, as ``DataSet.store`` does.
+
+        Args:
+            data_set (DataSet): the DataSet we're attached to.
+            loop_indices (tuple): the indices within the loop(s).
+            ids_values (Dict[Union[float, sequence]]): the values to store,
+                by array_id.
+        """
+        ranges = self._ranges
+        for array_id, value in ids_values.items():
+            array = data_set.arrays[array_id]
+            # find just the range of this store, then put back the total
+            total = array.modified_range
+            array.modified_range = None
+            array[loop_indices] = value
+            low, high = array.modified_range
+            if total is not None:
+                array._update_modified_range(*total)
+
+            # the data itself goes first, readers check the ranges after
+            row = ranges[self._positions[array_id]]
+            stores = row[_STORES]
+            if row[_SEEN] != stores:
+                # the DataServer hasn't seen the last range yet, add to it
+                low = min(low, row[_PENDING_LOW])
+                high = max(high, row[_PENDING_HIGH])
+            row[_PENDING_LOW], row[_PENDING_HIGH] = low, high
+            row[_LOW], row[_HIGH] = array.modified_range
+            row[_STORES] = stores + 1
+
+    def mark_modified(self, data_set):
+        """
+        Mark new data stored by other processes as modified in a DataSet.
+
+        Use this in the DataServer before writing or looking for changes.
+        This marks everything stored since the last call, wherever it is
+        in the arrays.
+        """
+        ranges = self._ranges
+        for array_id, position in self._positions.items():
+            row = ranges[position]
+            # read the count first: a store after this is seen next time
+            stores = row[_STORES]
+            if stores == row[_SEEN]:
+                continue
+            low, high = row[_PENDING_LOW], row[_PENDING_HIGH]
+            data_set.arrays[array_id]._update_modified_range(int(low),
+                                                             int(high))
+            row[_SEEN] = stores
+
+    def mark_synced(self, data_set):
+        """
+        Mark new data stored by other processes as synced in a DataSet.
+
+        The data is already in the arrays, this just tells the DataSet how
+        far it goes.
+        """
+        for array_id, (low, high) in self._stored_ranges():
+            array = data_set.arrays[array_id]
+            if high > array.get_synced_index():
+                array.synced_index = high
+
+    def _stored_ranges(self):
+        for array_id, row in zip(self.array_ids, self._ranges.tolist()):
+            if row[_HIGH] >= 0:
+                yield array_id, (row[_LOW], row[_HIGH])
+
+    def _array_path(self, array_id):
+        return os.path.join(self.path, array_id + '.npy')
@@ -1,5 +1,6 @@
 """Instrument base class."""
 import logging
+import threading
 import time
 import warnings
 import weakref
@@ -8,6 +9,7 @@ from qcodes.utils.metadata import Metadatable
 from qcodes.utils.helpers import DelegateAttributes, strip_attrs, full_class
 from qcodes.utils.nested_attrs import NestedAttrAccess
 from qcodes.utils.validators import Anything
+from .batch import CommandBatch
 from .parameter import StandardParameter
 from .function import Function
 from .metaclass import InstrumentMetaclass
@@ -74,10 +76,21 @@ class Instrument(Metadatable, DelegateAttributes, NestedAttrAccess,
 
         functions (Dict[Function]): All the functions supported by this
             instrument. Usually populated via ``add_function``
+
+        command_separator (Optional[str]): joins commands sent together in
+            a ``batch``, such as ';' for SCPI instruments. Default None,
+            for instruments that take one command at a time.
     """
 
     shared_kwargs = ()
 
+    # joins commands sent together by ``batch``, eg ';' for SCPI. None if
+    # the instrument can't take several commands at once.
+    command_separator = None
+
+    # the CommandBatch collecting this instrument's writes, if any
+    _batch = None
+
     _all_instruments = {}
 
     def __init__(self, name, server_name=None, **kwargs):
@@ -93,7 +106,7 @@ class Instrument(Metadatable, DelegateAttributes, NestedAttrAccess,
 
         self._meta_attrs = ['name']
 
-        self._no_proxy_methods = {'__getstate__'}
+        self._no_proxy_methods = {'__getstate__', 'batch'}
 
     def get_idn(self):
         """
@@ -447,6 +460,9 @@ class Instrument(Metadatable, DelegateAttributes, NestedAttrAccess,
         it call ``super().write(new_cmd)``. Subclasses that define a new
         hardware communication should instead override ``write_raw``.
 
+        Inside a ``batch`` the command is only added to the batch, to be
+        sent with the others.
+
         Args:
             cmd (str): the string to send to the instrument
 
@@ -454,6 +470,10 @@ class Instrument(Metadatable, DelegateAttributes, NestedAttrAccess,
             Exception: wraps any underlying exception with extra context,
                 including the command and the instrument.
         """
+        batch = self._batch
+        if batch is not None and batch.thread == threading.get_ident():
+            batch.write(cmd)
+            return
         try:
             self.write_raw(cmd)
         except Exception as e:
@@ -493,6 +513,10 @@ class Instrument(Metadatable, DelegateAttributes, NestedAttrAccess,
             Exception: wraps any underlying exception with extra context,
                 including the command and the instrument.
         """
+        batch = self._batch
+        if batch is not None and batch.thread == threading.get_ident():
+            # the response is needed now, so send the batch first
+            batch.flush()
         try:
             return self.ask_raw(cmd)
         except Exception as e:
@@ -514,6 +538,51 @@ class Instrument(Metadatable, DelegateAttributes, NestedAttrAccess,
             'Instrument {} has not defined an ask method'.format(
                 type(self).__name__))
 
+    def batch(self):
+        """
+        Collect commands to send to the instrument together, in one transfer.
+
+        Use it as a context manager. Inside the ``with`` block, every
+        ``write`` (including setting parameters) is held back, as are the
+        queries added with ``batch.get(parameter)`` and ``batch.ask(cmd)``.
+        At the end of the block they are joined with ``command_separator``
+        and sent at once, and the responses are split and handed back in
+        the ``BatchResult`` objects ``get`` and ``ask`` returned.
+        Parameters read this way get their latest value saved, as with
+        ``parameter.get()``.
+
+        A plain ``ask`` in the block sends the batch first, so commands
+        always reach the instrument in order. If the block raises an error,
+        whatever is still held back is dropped.
+
+        Instruments that can take several commands at once declare it by
+        setting ``command_separator``. For any other instrument the batch
+        doesn't collect anything, and each command is sent on its own.
+
+        Examples:
+            >>> with meter.batch() as batch:
+            ...     meter.nplc.set(1)
+            ...     meter.digits.set(6)
+            ...     mode = batch.get(meter.mode)
+            >>> mode.get()
+            'VOLT:DC'
+
+        Returns:
+            CommandBatch: the batch, or the one already open in this thread.
+        """
+        batch = self._batch
+        if batch is not None and batch.thread == threading.get_ident():
+            return batch
+        return CommandBatch(self)
+
+    def _join_commands(self, commands):
+        """Combine the commands of a batch into one string to send."""
+        return self.command_separator.join(commands)
+
+    def _split_responses(self, response):
+        """Split the response to a batch into one string per query."""
+        return response.split(self.command_separator)
+
     #
     # shortcuts to parameters & setters & getters                            #
     #
@@ -0,0 +1,195 @@
+"""Sending several commands to one instrument in a single transfer."""
+import threading
+
+
+class CommandBatch:
+    """
+    Commands and queries collected to send to an instrument together.
+
+    Made by ``Instrument.batch``, see there for how to use it. If the
+    instrument has no ``command_separator``, nothing is collected: every
+    write, ``get`` and ``ask`` happens right away, so code using a batch
+    works with any instrument.
+
+    Args:
+        instrument (Instrument): the instrument to send commands to.
+    """
+    def __init__(self, instrument):
+        self.instrument = instrument
+        self.thread = threading.get_ident()
+        self.collecting = instrument.command_separator is not None
+        # nested ``with instrument.batch()`` blocks share one batch
+        self._depth = 0
+        self._commands = []
+        # a BatchResult for each query in _commands, None for each write
+        self._results = []
+
+    def __enter__(self):
+        if self.collecting and not self._depth:
+            self.instrument._batch = self
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._depth -= 1
+        if self._depth:
+            return
+        if self.instrument._batch is self:
+            self.instrument._batch = None
+        if exc_type is None:
+            self.flush()
+        else:
+            # don't send the rest of a sequence that broke partway
+            self._commands, self._results = [], []
+
+    def write(self, cmd):
+        """
+        Add a command with no response to the batch.
+
+        ``Instrument.write`` calls this for you inside the batch, so
+        setting a parameter adds its set command here.
+
+        Args:
+            cmd (str): the string to send to the instrument.
+        """
+        if not self.collecting:
+            self.instrument.write(cmd)
+            return
+        self._commands.append(cmd)
+        self._results.append(None)
+
+    def ask(self, cmd, parser=None):
+        """
+        Add a query to the batch.
+
+        Args:
+            cmd (str): the query to send to the instrument.
+
+            parser (Optional[callable]): transform the response string.
+
+        Returns:
+            BatchResult: holds the (parsed) response once the batch is sent.
+        """
+        if not self.collecting:
+            response = self.instrument.ask(cmd)
+            return BatchResult(cmd, parser)._fill(response)
+        return self._add_query(BatchResult(cmd, parser))
+
+    def get(self, parameter):
+        """
+        Add a parameter ``get`` to the batch.
+
+        Only a parameter whose ``get_cmd`` is a query string to this
+        instrument can wait to be sent with the rest. Any other parameter
+        is read right away, after sending what's already in the batch, so
+        the order of commands is always kept.
+
+        When the batch is sent, the response goes through the parameter's
+        ``get_parser`` (or ``val_mapping``) and is saved as its latest value.
+
+        Args:
+            parameter (Parameter): the parameter to read.
+
+        Returns:
+            BatchResult: holds the parameter value once the batch is sent.
+        """
+        getter = getattr(parameter, '_get', None)
+        cmd = getattr(getter, 'cmd_str', None)
+        if (not self.collecting or cmd is None or
+                getter.exec_str != self.instrument.ask):
+            self.flush()
+            return BatchResult(parameter=parameter)._fill(parameter.get(),
+                                                          parsed=True)
+
+        parser = getattr(getter, 'output_parser', None)
+        return self._add_query(BatchResult(cmd.format(), parser, parameter))
+
+    def _add_query(self, result):
+        self._commands.append(result.cmd)
+        self._results.append(result)
+        return result
+
+    def flush(self):
+        """
+        Send everything in the batch now, in one transfer.
+
+        If there are any queries the combined command is sent with
+        ``ask_raw``, otherwise with ``write_raw``. This also happens at the
+        end of the ``with`` block.
+
+        Raises:
+            ValueError: if the number of responses doesn't match the
+                number of queries.
+        """
+        commands, results = self._commands, self._results
+        if not commands:
+            return
+        self._commands, self._results = [], []
+
+        instrument = self.instrument
+        cmd = instrument._join_commands(commands)
+        queries = [result for result in results if result is not None]
+        try:
+            if not queries:
+                instrument.write_raw(cmd)
+                return
+
+            responses = instrument._split_responses(instrument.ask_raw(cmd))
+            if len(responses) != len(queries):
+                raise ValueError(
+                    'expected {} responses, got {}'.format(len(queries),
+                                                           len(responses)),
+                    responses)
+        except Exception as e:
+            e.args = e.args + ('sending batch ' + repr(cmd) + ' to ' +
+                               repr(instrument),)
+            raise e
+
+        # fill in every result we can before reporting a bad one
+        error = None
+        for result, response in zip(queries, responses):
+            try:
+                result._fill(response)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+
+class BatchResult:
+    """
+    The response to one query in a ``CommandBatch``.
+
+    Its ``value`` is filled in when the batch is sent; until then ``get``
+    raises a ``RuntimeError``.
+    """
+    def __init__(self, cmd=None, parser=None, parameter=None):
+        self.cmd = cmd
+        self.parser = parser
+        self.parameter = parameter
+        self.done = False
+        self.value = None
+
+    def _fill(self, response, parsed=False):
+        try:
+            if self.parser is not None and not parsed:
+                response = self.parser(response)
+            if self.parameter is not None and not parsed:
+                self.parameter._save_val(response)
+        except Exception as e:
+            name = getattr(self.parameter, 'full_name', None) or self.cmd
+            e.args = e.args + ('parsing the response for {}'.format(name),)
+            raise e
+        self.value = response
+        self.done = True
+        return self
+
+    def get(self):
+        """The response, once the batch has been sent."""
+        if not self.done:
+            raise RuntimeError('batch has not been sent yet', self.cmd)
+        return self.value
+
+    def __repr__(self):
+        return '<BatchResult {!r}: {}>'.format(
+            self.cmd, repr(self.value) if self.done else 'not sent')
@@ -1,5 +1,8 @@
 """Ethernet instrument driver class based on sockets."""
+import select
 import socket
+import threading
+import time
 
 from .base import Instrument
 
@@ -23,11 +26,16 @@ class IPInstrument(Instrument):
         terminator (str): Character(s) to terminate each send. Default '\n'.
 
         persistent (bool): Whether to leave the socket open between calls.
-            Default True.
+            Default True. Without, the socket still stays open for
+            ``linger`` seconds after each call, so calls in quick succession
+            share it.
 
         write_confirmation (bool): Whether the instrument acknowledges writes
             with some response we should read. Default True.
 
+        read_terminator (Optional[str]): What each response ends with.
+            Default the last character of ``terminator``.
+
         server_name (str): Name of the InstrumentServer to use. Defaults to
             'IPInstruments'.
 
@@ -37,25 +45,41 @@ class IPInstrument(Instrument):
         metadata (Optional[Dict]): additional static metadata to add to this
             instrument's JSON snapshot.
 
+    All IPInstruments in a process with the same address and port share one
+    socket, with TCP keep-alive. It's checked before each call, and if it
+    was closed or fails to send, it's opened again, trying
+    ``reconnect_attempts`` times with growing delays from
+    ``reconnect_delay`` seconds.
+
     See help for ``qcodes.Instrument`` for additional information on writing
     instrument subclasses.
     """
 
+    # how many times to try to open a connection
+    reconnect_attempts = 3
+
+    # wait before the second try (s), doubled before each next one
+    reconnect_delay = 0.1
+
+    # how long (s) a connection not in use stays open, if not persistent
+    linger = 1
+
     def __init__(self, name, address=None, port=None, timeout=5,
                  terminator='\n', persistent=True, write_confirmation=True,
-                 **kwargs):
+                 read_terminator=None, **kwargs):
         super().__init__(name, **kwargs)
 
         self._address = address
         self._port = port
         self._timeout = timeout
         self._terminator = terminator
+        self._read_terminator = read_terminator
         self._confirmation = write_confirmation
 
         self._ensure_connection = EnsureConnection(self)
         self._buffer_size = 1400
 
-        self._socket = None
+        self._connection = None
 
         self.set_persistent(persistent)
 
@@ -108,20 +132,25 @@ class IPInstrument(Instrument):
             self._disconnect()
 
     def _connect(self):
-        if self._socket is not None:
+        if self._connection is None:
+            self._connection = _get_connection(self._address, self._port)
+        try:
+            self._open()
+        except:
             self._disconnect()
+            raise
 
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._socket.connect((self._address, self._port))
-        self.set_timeout(self._timeout)
+    def _open(self):
+        self._connection.open(self._timeout, self.reconnect_attempts,
+                              self.reconnect_delay)
 
-    def _disconnect(self):
-        if getattr(self, '_socket', None) is None:
+    def _disconnect(self, linger=0):
+        connection = getattr(self, '_connection', None)
+        if connection is None:
             return
 
-        self._socket.shutdown(socket.SHUT_RDWR)
-        self._socket.close()
-        self._socket = None
+        self._connection = None
+        _release_connection(connection, linger)
 
     def set_timeout(self, timeout=None):
         """
@@ -132,25 +161,47 @@ class IPInstrument(Instrument):
         """
         self._timeout = timeout
 
-        if self._socket is not None:
-            self._socket.settimeout(float(self._timeout))
+        if self._connection is not None:
+            self._connection.settimeout(self._timeout)
 
-    def set_terminator(self, terminator):
+    def set_terminator(self, terminator, read_terminator=None):
         r"""
         Change the write terminator to use.
 
         Args:
             terminator (str): Character(s) to terminate each send.
                 Default '\n'.
+
+            read_terminator (Optional[str]): What each response ends with.
+                Default the last character of ``terminator``.
         """
         self._terminator = terminator
+        self._read_terminator = read_terminator
 
     def _send(self, cmd):
         data = cmd + self._terminator
-        self._socket.send(data.encode())
+        try:
+            self._connection.send(data.encode())
+        except OSError as e:
+            if isinstance(e, socket.timeout):
+                raise
+            # the connection dropped since we last checked: try once more
+            self._connection.close()
+            self._open()
+            self._connection.send(data.encode())
 
     def _recv(self):
-        return self._socket.recv(self._buffer_size).decode()
+        """
+        Read one response, up to and including the read terminator.
+
+        Whatever arrives after it is kept for the next ``_recv``. With an
+        empty terminator, return whatever arrives with one read.
+        """
+        terminator = self._read_terminator
+        if terminator is None:
+            terminator = self._terminator[-1:]
+        return self._connection.recv(terminator.encode(),
+                                     self._buffer_size).decode()
 
     def close(self):
         """Disconnect and irreversibly tear down the instrument."""
@@ -210,13 +261,186 @@ class IPInstrument(Instrument):
         return snap
 
 
+# the open connections of this process, by (address, port)
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def _get_connection(address, port):
+    """Get the shared connection to (address, port), and count its user."""
+    with _connections_lock:
+        connection = _connections.get((address, port))
+        if connection is None:
+            connection = _IPConnection(address, port)
+            _connections[(address, port)] = connection
+        connection.users += 1
+        connection.cancel_close()
+        return connection
+
+
+def _release_connection(connection, linger=0):
+    """
+    A user is done with this connection.
+
+    Once it has no users left, it's closed after ``linger`` seconds, unless
+    it's used again by then.
+    """
+    with _connections_lock:
+        connection.users -= 1
+        if connection.users > 0:
+            return
+        if linger > 0:
+            connection.close_later(linger)
+            return
+        _close_unused(connection)
+
+
+def _close_unused(connection):
+    # with _connections_lock held
+    if connection.users > 0:
+        return
+    if _connections.get(connection.key) is connection:
+        del _connections[connection.key]
+    connection.close()
+
+
+def _close_if_unused(connection):
+    with _connections_lock:
+        _close_unused(connection)
+
+
+class _IPConnection:
+
+    """
+    A socket to one (address, port), shared by all IPInstruments using it.
+
+    Args:
+        address (str): The IP address or name.
+        port (int): The IP port.
+    """
+
+    def __init__(self, address, port):
+        self.key = (address, port)
+        self.users = 0
+        # held for each exchange with the instrument
+        self.lock = threading.RLock()
+        self.socket = None
+        self._buffer = b''
+        self._close_timer = None
+
+    def open(self, timeout, attempts=3, delay=0.1):
+        """Connect, unless we're connected and it still works."""
+        if self.socket is not None:
+            if self.is_alive():
+                self.settimeout(timeout)
+                return
+            self.close()
+
+        for attempt in range(attempts):
+            try:
+                sock = socket.create_connection(self.key, timeout=timeout)
+                break
+            except OSError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(delay * 2 ** attempt)
+
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # commands are short, don't wait to fill a packet
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket = sock
+        self._buffer = b''
+
+    def is_alive(self):
+        """Whether the other end still has the connection open."""
+        try:
+            readable = select.select([self.socket], [], [], 0)[0]
+            # readable but nothing to read means it was closed
+            return not readable or bool(self.socket.recv(1, socket.MSG_PEEK))
+        except (OSError, ValueError):
+            return False
+
+    def settimeout(self, timeout):
+        if self.socket is not None:
+            self.socket.settimeout(float(timeout))
+
+    def send(self, data):
+        if self.socket is None:
+            raise ConnectionError('not connected to {}:{}'.format(*self.key))
+        self.socket.sendall(data)
+
+    def recv(self, terminator, size):
+        """
+        Read up to and including ``terminator``, keeping any more data.
+
+        Args:
+            terminator (bytes): the end of a response. If empty, return
+                what we have, or else what one read gives.
+            size (int): how much to read at once.
+
+        Returns:
+            bytes: the response.
+        """
+        buffer = self._buffer
+        start = 0
+        while True:
+            if terminator:
+                end = buffer.find(terminator, start)
+                if end >= 0:
+                    end += len(terminator)
+                    self._buffer = buffer[end:]
+                    return buffer[:end]
+                # the terminator may be split between reads
+                start = max(len(buffer) - len(terminator) + 1, 0)
+            elif buffer:
+                self._buffer = b''
+                return buffer
+
+            if self.socket is None:
+                raise ConnectionError(
+                    'not connected to {}:{}'.format(*self.key))
+            # keep what we have if this times out
+            self._buffer = buffer
+            data = self.socket.recv(size)
+            if not data:
+                self.close()
+                raise ConnectionError(
+                    'connection to {}:{} closed'.format(*self.key))
+            buffer += data
+
+    def close_later(self, delay):
+        self.cancel_close()
+        self._close_timer = threading.Timer(delay, _close_if_unused, (self,))
+        self._close_timer.daemon = True
+        self._close_timer.start()
+
+    def cancel_close(self):
+        if self._close_timer is not None:
+            self._close_timer.cancel()
+            self._close_timer = None
+
+    def close(self):
+        self.cancel_close()
+        if self.socket is None:
+            return
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            # already closed at the other end
+            pass
+        self.socket.close()
+        self.socket = None
+        self._buffer = b''
+
+
 class EnsureConnection:
 
     """
     Context manager to ensure an instrument is connected when needed.
 
-    Uses ``instrument._persistent`` to determine whether or not to close
-    the connection immediately on completion.
+    Holds the connection's lock, so instruments sharing it take turns.
+    Uses ``instrument._persistent`` to determine whether or not to give up
+    the connection on completion.
 
     Args:
         instrument (IPInstrument): the instance to connect.
@@ -227,10 +451,20 @@ class EnsureConnection:
 
     def __enter__(self):
         """Make sure we connect when entering the context."""
-        if not self.instrument._persistent or self.instrument._socket is None:
-            self.instrument._connect()
+        instrument = self.instrument
+        if instrument._connection is None:
+            instrument._connection = _get_connection(instrument._address,
+                                                     instrument._port)
+        instrument._connection.lock.acquire()
+        try:
+            instrument._open()
+        except:
+            self.__exit__(None, None, None)
+            raise
 
     def __exit__(self, type, value, tb):
         """Possibly disconnect on exiting the context."""
-        if not self.instrument._persistent:
-            self.instrument._disconnect()
+        instrument = self.instrument
+        instrument._connection.lock.release()
+        if not instrument._persistent:
+            instrument._disconnect(instrument.linger)
@@ -984,6 +984,33 @@ class StandardParameter(Parameter):
             self._step = step
             self.set = self._validate_and_sweep
 
+    def _is_stepped(self):
+        return self.set == self._validate_and_sweep
+
+    def _ramp_steps(self, value):
+        """Every value a ``set`` to ``value`` goes through, ending there."""
+        self.validate(value)
+        if self._is_stepped():
+            return self._sweep_steps(value) + [value]
+        return [value]
+
+    def ramp_time(self, value):
+        """
+        How long setting this parameter to ``value`` should take.
+
+        This is the number of calls to the hardware (with a step, from the
+        latest value, which is measured first if it's older than
+        ``max_val_age``), times the delay. The time of the calls themselves
+        isn't known, so isn't included.
+
+        Args:
+            value (Union[int, float]): the value to set.
+
+        Returns:
+            float: the expected time in seconds.
+        """
+        return len(self._ramp_steps(value)) * (self._delay or 0)
+
     def get_delay(self):
         """Return the delay time of this parameter. Also see `set_delay` """
         return self._delay
@@ -1127,6 +1154,78 @@ def combine(*parameters, name, label=None, unit=None, units=None,
     return multi_par
 
 
+def set_together(parameters, values):
+    """
+    Set several parameters, ramping the stepped ones at the same time.
+
+    Every value is validated first, so a bad one leaves everything as it
+    was. Parameters without a step (or that aren't ``StandardParameter``\s)
+    are then set, in order. Then all stepped ``StandardParameter``\s ramp
+    together: the time of every step of every ramp is worked out first,
+    from each parameter's own step and delay, and the steps are made in the
+    order of these times. So setting independent channels (of one DAC or
+    of several) takes as long as the slowest ramp, not as long as all
+    ramps one after the other.
+
+    Args:
+        parameters (Sequence[Parameter]): the parameters to set.
+        values (Sequence): the value to set each parameter to.
+    """
+    ramps = []
+    others = []
+    for parameter, value in zip(parameters, values):
+        try:
+            if (isinstance(parameter, StandardParameter) and
+                    parameter._is_stepped()):
+                # validates, and reads where the ramp starts
+                ramps.append((parameter, value, parameter._ramp_steps(value)))
+            else:
+                if hasattr(parameter, 'validate'):
+                    parameter.validate(value)
+                others.append((parameter, value))
+        except Exception as e:
+            name = getattr(parameter, 'full_name', repr(parameter))
+            e.args = e.args + ('setting {} to {}'.format(name, repr(value)),)
+            raise e
+
+    for parameter, value in others:
+        parameter.set(value)
+
+    if len(ramps) == 1:
+        parameter, value, _ = ramps[0]
+        parameter.set(value)
+        return
+
+    # (time from start, ramp, value) of every step
+    schedule = []
+    end = 0
+    for i, (parameter, value, steps) in enumerate(ramps):
+        delay = parameter._delay or 0
+        schedule.extend((k * delay, i, step) for k, step in enumerate(steps))
+        end = max(end, len(steps) * delay)
+    # sort is stable, so steps at the same time stay in order
+    schedule.sort(key=lambda event: event[:2])
+
+    start = time.perf_counter()
+    for t, i, step in schedule:
+        remainder = start + t - time.perf_counter()
+        if remainder > 0:
+            time.sleep(remainder)
+        parameter = ramps[i][0]
+        try:
+            parameter._set(step)
+            parameter._save_val(step)
+        except Exception as e:
+            e.args = e.args + (
+                'setting {} to {}'.format(parameter.full_name, repr(step)),)
+            raise e
+
+    # and the delay after the last step, as in a single set
+    remainder = start + end - time.perf_counter()
+    if remainder > 0:
+        time.sleep(remainder)
+
+
 class CombinedParameter(Metadatable):
     """ A combined parameter
 
@@ -1141,7 +1240,8 @@ class CombinedParameter(Metadatable):
     A combined parameter sets all the combined parameters at every point of the
     sweep.
     The sets are called in the same order the parameters are, and
-    sequentially.
+    sequentially, except that parameters which ramp in steps all ramp at the
+    same time, see ``set_together``.
     """
 
     def __init__(self, parameters, name, label=None,
@@ -1181,8 +1281,7 @@ class CombinedParameter(Metadatable):
             list: values that where actually set
         """
         values = self.setpoints[index]
-        for setFunction, value in zip(self.sets, values):
-            setFunction(value)
+        set_together(self.parameters, values)
         return values
 
     def sweep(self, *array: numpy.ndarray):
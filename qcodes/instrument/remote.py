@@ -1,5 +1,8 @@
 """Proxies to interact with server-based instruments from another process."""
+from copy import deepcopy
+from datetime import datetime
 import multiprocessing as mp
+import time
 
 from qcodes.utils.deferred_operations import DeferredOperations
 from qcodes.utils.helpers import DelegateAttributes, named_repr
@@ -37,6 +40,16 @@ class RemoteInstrument(DelegateAttributes):
 
         functions (Dict[Function]): All the functions supported by this
             instrument. Usually populated via ``add_function``
+
+    The latest value of each parameter is kept locally too, from every
+    ``get`` and ``set`` through this proxy and from every snapshot. If you
+    allow it by setting ``RemoteParameter.max_val_age``, ``get_latest`` and
+    ``snapshot(update=False)`` of the parameters and of the whole instrument
+    use these values, without the server. Nothing tells us when another
+    process (such as a background Loop) changes the instrument, so only do
+    this if this process is the only one using it. Calling any method or
+    function of the instrument, or changing its attributes, forgets these
+    values, as the server copy may have changed them.
     """
 
     delegate_attr_dicts = ['_methods', 'parameters', 'functions']
@@ -78,6 +91,12 @@ class RemoteInstrument(DelegateAttributes):
         self.parameters = {}
         self.functions = {}
 
+        # local copies of parameter values and snapshots, by parameter name
+        self._latest_values = {}
+        self._snapshots = {}
+        # and the last snapshot of the whole instrument
+        self._instrument_snapshot = None
+
         # bind all the different categories of actions we need
         # to interface with the remote instrument
 
@@ -118,6 +137,7 @@ class RemoteInstrument(DelegateAttributes):
 
     def update(self):
         """Check with the server for updated components."""
+        self._clear_latest()
         connection_attrs = self._ask_server('connection_attrs', self._id)
         self._update_components(connection_attrs)
 
@@ -125,6 +145,122 @@ class RemoteInstrument(DelegateAttributes):
         """Query the server copy of this instrument, expecting a response."""
         return self._manager.ask('cmd', self._id, func_name, *args, **kwargs)
 
+    def _ask_server_many(self, queries):
+        """
+        Run several queries on the server copy, in one round trip.
+
+        Args:
+            queries (Sequence[tuple]): ``(func_name, args)`` or
+                ``(func_name, args, kwargs)`` for each query, as for
+                ``_ask_server(func_name, *args, **kwargs)``.
+
+        Returns:
+            list: the response to each query.
+        """
+        return self._manager.ask_many(
+            [('cmd', (self._id, query[0]) + tuple(query[1])) +
+             tuple(query[2:]) for query in queries])
+
+    def _get_many(self, names):
+        """
+        Get several parameters in one round trip to the server.
+
+        Args:
+            names (Sequence[str]): the names of the parameters.
+
+        Returns:
+            list: the value of each parameter.
+        """
+        values = self._ask_server_many([('get', (name,)) for name in names])
+        ts = datetime.now()
+        for name, value in zip(names, values):
+            self._save_latest(name, {'value': value, 'ts': ts})
+        return values
+
+    def _save_latest(self, name, latest):
+        """Keep ``latest``, a dict of value and ts, of parameter ``name``."""
+        self._latest_values[name] = (latest, time.perf_counter())
+
+    def _cached_latest(self, name, max_val_age):
+        """
+        The latest value and ts of parameter ``name`` we have locally.
+
+        Returns:
+            Optional[dict]: a copy of the dict from ``_save_latest``, or None
+                if there is none that was saved up to ``max_val_age``
+                seconds ago.
+        """
+        entry = self._latest_values.get(name)
+        if entry is None or time.perf_counter() - entry[1] > max_val_age:
+            return None
+        return dict(entry[0])
+
+    def _clear_latest(self, name=None):
+        """Forget the local values of parameter ``name``, or of all."""
+        if name is None:
+            self._latest_values.clear()
+            self._snapshots.clear()
+            self._instrument_snapshot = None
+        else:
+            self._latest_values.pop(name, None)
+            self._snapshots.pop(name, None)
+
+    def snapshot(self, update=False):
+        """
+        State of the instrument as a JSON-compatible dict.
+
+        The values of its parameters in the snapshot are kept locally too.
+        With ``update=False``, if we have a value for every parameter that
+        is no older than its ``max_val_age``, the snapshot is made from
+        these without asking the server.
+
+        Args:
+            update (bool): If True, update the state by querying the
+                instrument. If False, just use the latest values in memory.
+
+        Returns:
+            dict: snapshot, as made by the server copy.
+        """
+        if not update and self._instrument_snapshot is not None:
+            snap = self._local_snapshot()
+            if snap is not None:
+                return snap
+
+        snap = self._ask_server('snapshot', update)
+        for name, param_snap in snap.get('parameters', {}).items():
+            if name in self.parameters and 'value' in param_snap:
+                self._snapshots[name] = deepcopy(param_snap)
+                self._save_latest(name, {'value': param_snap['value'],
+                                         'ts': _parse_ts(param_snap['ts'])})
+        self._instrument_snapshot = deepcopy(snap)
+        return snap
+
+    def _local_snapshot(self):
+        """The last instrument snapshot with our latest values, if fresh."""
+        snap = deepcopy(self._instrument_snapshot)
+        for name, param_snap in snap.get('parameters', {}).items():
+            if 'value' not in param_snap:
+                continue
+            parameter = self.parameters.get(name)
+            if parameter is None:
+                return None
+            latest = self._cached_latest(name, parameter.max_val_age)
+            if latest is None:
+                return None
+            param_snap['value'] = latest['value']
+            param_snap['ts'] = _format_ts(latest['ts'])
+        return snap
+
+    def _request_server(self, func_name, *args, **kwargs):
+        """
+        Query the server copy, collecting the response later.
+
+        Returns:
+            ServerRequest: call its ``result()`` for the response.
+        """
+        return self._manager.request('cmd', self._id, func_name,
+                                     *args, **kwargs)
+
     def _write_server(self, func_name, *args, **kwargs):
         """Send a command to the server, without waiting for a response."""
         self._manager.write('cmd', self._id, func_name, *args, **kwargs)
@@ -148,6 +284,7 @@ class RemoteInstrument(DelegateAttributes):
 
             **kwargs: constructor arguments for ``parameter_class``.
         """
+        self._clear_latest()
         attrs = self._ask_server('add_parameter', name, **kwargs)
         self.parameters[name] = RemoteParameter(name, self, attrs)
 
@@ -167,6 +304,7 @@ class RemoteInstrument(DelegateAttributes):
 
             **kwargs: constructor kwargs for ``Function``
         """
+        self._clear_latest()
         attrs = self._ask_server('add_function', name, **kwargs)
         self.functions[name] = RemoteFunction(name, self, attrs)
 
@@ -309,6 +447,7 @@ class RemoteComponent:
         """
         if attr not in type(self)._local_attrs and attr in self._attrs:
             full_attr = self.name + '.' + attr
+            self._instrument._clear_latest()
             self._instrument._ask_server('setattr', full_attr, val)
             if attr in self._delattrs:
                 self._delattrs.remove(attr)
@@ -325,6 +464,7 @@ class RemoteComponent:
 
         if attr not in type(self)._local_attrs and attr in self._attrs:
             full_attr = self.name + '.' + attr
+            self._instrument._clear_latest()
             self._instrument._ask_server('delattr', full_attr)
             self._delattrs.add(attr)
 
@@ -365,12 +505,25 @@ class RemoteMethod(RemoteComponent):
 
     def __call__(self, *args, **kwargs):
         """Call the method on the server, passing on any args and kwargs."""
+        self._instrument._clear_latest()
         return self._instrument._ask_server(self.name, *args, **kwargs)
 
 
 class RemoteParameter(RemoteComponent, DeferredOperations):
 
-    """Proxy for a Parameter of the server instrument."""
+    """
+    Proxy for a Parameter of the server instrument.
+
+    Its latest value is kept by the RemoteInstrument, from every ``get`` and
+    ``set`` through this proxy. For ``get_latest`` and
+    ``snapshot(update=False)``, that's used if it was saved at most
+    ``max_val_age`` seconds ago, else they ask the server. By default that's
+    0, always ask the server: set it (on one parameter, or on this class)
+    only if no other process changes the instrument, as we won't know.
+    """
+
+    # how long (s) to trust the latest value we have locally
+    max_val_age = 0
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -400,7 +553,10 @@ class RemoteParameter(RemoteComponent, DeferredOperations):
         Returns:
             any: the current value of the parameter.
         """
-        return self._instrument._ask_server('get', self.name)
+        value = self._instrument._ask_server('get', self.name)
+        self._instrument._save_latest(self.name, {'value': value,
+                                                  'ts': datetime.now()})
+        return value
 
     def set(self, value):
         """
@@ -413,7 +569,14 @@ class RemoteParameter(RemoteComponent, DeferredOperations):
         # we want it async... which would just be changing the '_ask_server'
         # to '_write_server' below. how do we decide, and how do we let the
         # user do it?
-        self._instrument._ask_server('set', self.name, value)
+        try:
+            self._instrument._ask_server('set', self.name, value)
+        except:
+            # it may have stopped anywhere
+            self._instrument._clear_latest(self.name)
+            raise
+        self._instrument._save_latest(self.name, {'value': value,
+                                                  'ts': datetime.now()})
 
     def validate(self, value):
         """
@@ -440,7 +603,14 @@ class RemoteParameter(RemoteComponent, DeferredOperations):
         return Parameter.sweep(self, *args, **kwargs)
 
     def _latest(self):
-        return self._instrument._ask_server('callattr', self.name + '._latest')
+        instrument = self._instrument
+        latest = instrument._cached_latest(self.name, self.max_val_age)
+        if latest is None:
+            latest = instrument._ask_server('callattr',
+                                            self.name + '._latest')
+            instrument._save_latest(self.name, latest)
+            latest = dict(latest)
+        return latest
 
     def snapshot(self, update=False):
         """
@@ -448,13 +618,26 @@ class RemoteParameter(RemoteComponent, DeferredOperations):
 
         Args:
             update (bool): If True, update the state by querying the
-                instrument. If False, just use the latest value in memory.
+                instrument. If False, just use the latest value in memory,
+                which doesn't need the server if we have a recent one.
 
         Returns:
             dict: snapshot
         """
-        return self._instrument._ask_server('callattr',
-                                            self.name + '.snapshot', update)
+        instrument = self._instrument
+        snap = instrument._snapshots.get(self.name)
+        latest = instrument._cached_latest(self.name, self.max_val_age)
+        if update or snap is None or latest is None:
+            snap, latest = instrument._ask_server_many([
+                ('callattr', (self.name + '.snapshot', update)),
+                ('callattr', (self.name + '._latest',))])
+            instrument._snapshots[self.name] = snap
+            instrument._save_latest(self.name, latest)
+
+        snap = deepcopy(snap)
+        snap['value'] = latest['value']
+        snap['ts'] = _format_ts(latest['ts'])
+        return snap
 
     def setattr(self, attr, value):
         """
@@ -465,6 +648,7 @@ class RemoteParameter(RemoteComponent, DeferredOperations):
                 ``NestedAttrAccess``.
             value: The new value to set.
         """
+        self._instrument._clear_latest()
         self._instrument._ask_server('setattr', self.name + '.' + attr, value)
 
     def getattr(self, attr):
@@ -493,6 +677,7 @@ class RemoteParameter(RemoteComponent, DeferredOperations):
         Returns:
             any: the return value of the called method.
         """
+        self._instrument._clear_latest()
         return self._instrument._ask_server(
             'callattr', self.name + '.' + attr, *args, **kwargs)
 
@@ -512,6 +697,7 @@ class RemoteFunction(RemoteComponent):
         Returns:
             any: the return value of the function.
         """
+        self._instrument._clear_latest()
         return self._instrument._ask_server('call', self.name, *args)
 
     def call(self, *args):
@@ -527,3 +713,21 @@ class RemoteFunction(RemoteComponent):
         """
         return self._instrument._ask_server(
             'callattr', self.name + '.validate', *args)
+
+
+# how Parameter.snapshot_base writes timestamps
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _parse_ts(ts):
+    """A timestamp from a snapshot, back as a datetime if it was one."""
+    if isinstance(ts, str):
+        return datetime.strptime(ts, _TS_FORMAT)
+    return ts
+
+
+def _format_ts(ts):
+    """A timestamp as it appears in a snapshot."""
+    if isinstance(ts, datetime):
+        return ts.strftime(_TS_FORMAT)
+    return ts
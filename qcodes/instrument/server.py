@@ -1,9 +1,14 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import multiprocessing as mp
+import threading
 
-from qcodes.process.server import ServerManager, BaseServer
+from qcodes.process.server import ServerManager, BaseServer, QUERY_REQUEST
 
 
-def get_instrument_server_manager(server_name, shared_kwargs={}):
+def get_instrument_server_manager(server_name, shared_kwargs={},
+                                  workers=None):
     """
     Find or make a given `InstrumentServerManager`.
 
@@ -23,6 +28,10 @@ def get_instrument_server_manager(server_name, shared_kwargs={}):
     shared_kwargs: unpicklable items needed by the instruments on the
         server, will get sent with the manager when it's started up
         and included in the kwargs to construct each new instrument
+
+    workers: how many instruments on a new server can run commands at once,
+        see `InstrumentServer`. Default 1, one command at a time. If the
+        server already exists, this must match what it was started with.
     """
     if not server_name:
         server_name = 'Instruments'
@@ -38,8 +47,13 @@ def get_instrument_server_manager(server_name, shared_kwargs={}):
             raise ValueError(('An InstrumentServer with name "{}" already '
                               'exists but with different shared_attrs'
                               ).format(server_name))
+        if workers is not None and manager.workers != workers:
+            raise ValueError(('An InstrumentServer with name "{}" already '
+                              'exists but with {} workers'
+                              ).format(server_name, manager.workers))
     else:
-        manager = InstrumentServerManager(server_name, shared_kwargs)
+        manager = InstrumentServerManager(server_name, shared_kwargs,
+                                          workers=workers or 1)
 
     return manager
 
@@ -54,12 +68,15 @@ class InstrumentServerManager(ServerManager):
             additional queues, that can only be shared on creation)
             These items will be set as attributes of any instrument that
             connects to the server
+        workers: how many instruments can run commands at once on the
+            server, see `InstrumentServer`. Default 1.
     """
     instances = {}
 
-    def __init__(self, name, shared_kwargs=None):
+    def __init__(self, name, shared_kwargs=None, workers=1):
         self.name = name
         self.shared_kwargs = shared_kwargs
+        self.workers = workers
         self.instances[name] = self
 
         self.instruments = {}
@@ -67,6 +84,12 @@ class InstrumentServerManager(ServerManager):
         super().__init__(name=name, server_class=InstrumentServer,
                          shared_attrs=shared_kwargs)
 
+    def _run_server(self):
+        # workers goes to the server process with this manager, so it
+        # arrives whatever the multiprocessing start method
+        self._server_class(self._query_queue, self._response_queue,
+                           self._shared_attrs, workers=self.workers)
+
     def restart(self):
         """
         Restart the InstrumentServer and reconnect the instruments that
@@ -105,15 +128,55 @@ class InstrumentServerManager(ServerManager):
 
 
 class InstrumentServer(BaseServer):
+    """
+    Server process holding one or more instruments.
+
+    By default every query is handled in order, one at a time. With
+    ``workers`` above 1, commands for different instruments run in parallel
+    on a pool of that many threads, while the commands of each instrument
+    still run one at a time, in the order they arrive. So a slow instrument
+    doesn't hold up another one on the same server. Responses to tagged
+    requests (``ServerManager.request``) can then come back in a different
+    order than the requests were sent. Queries that aren't for one
+    instrument, like adding or deleting an instrument, wait for all
+    commands to finish.
+
+    To use this, make the server with ``workers`` before putting any
+    instruments on it, for example
+    ``get_instrument_server_manager('Instruments', workers=4)``.
+    Only do it if none of the instruments on the server share a bus or
+    connection, or call each other.
+
+    Args:
+        query_queue (multiprocessing.Queue): source of queries
+
+        response_queue (multiprocessing.Queue): destination for responses
+
+        shared_kwargs (Dict): items included in the kwargs to construct
+            each new instrument
+
+        workers (int): how many instruments can run commands at once.
+            With 1 (default), every query is handled in order in the main
+            thread, like any BaseServer.
+    """
     # just for testing - how long to allow it to wait on a queue.get
     timeout = None
 
-    def __init__(self, query_queue, response_queue, shared_kwargs):
+    def __init__(self, query_queue, response_queue, shared_kwargs,
+                 workers=1):
         super().__init__(query_queue, response_queue, shared_kwargs)
 
+        self.workers = workers
         self.instruments = {}
         self.next_id = 0
 
+        # commands waiting or running, for each instrument id
+        self._pool = None
+        if self.workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._jobs = {}
+        self._jobs_done = threading.Condition()
+
         # Ensure no references of instruments defined in the main process
         # are copied to the server process. With the spawn multiprocessing
         # method this is not an issue, as the class is reimported in the
@@ -121,7 +184,88 @@ class InstrumentServer(BaseServer):
         from qcodes.instrument.base import Instrument
         Instrument._all_instruments = {}
 
-        self.run_event_loop()
+        try:
+            self.run_event_loop()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+
+    def process_query(self, query):
+        """
+        Act on one query: in the pool if it's for a single instrument.
+
+        Args:
+            query (tuple): as in ``BaseServer.process_query``.
+        """
+        instrument_id = None
+        if self._pool is not None:
+            instrument_id = self._query_instrument(query)
+
+        if instrument_id is None:
+            self._wait_for_jobs()
+            super().process_query(query)
+        else:
+            self._add_job(instrument_id,
+                          partial(super().process_query, query))
+
+    def _query_instrument(self, query):
+        """
+        The id of the one instrument this query acts on, if any.
+
+        That's a ``cmd`` query, or a ``many`` of only ``cmd`` queries for
+        the same instrument. Anything else, including malformed queries,
+        gives None.
+        """
+        try:
+            func_name = query[1]
+            parts = query[3:] if query[0] == QUERY_REQUEST else query[2:]
+            args = parts[0] if parts and isinstance(parts[0], tuple) else ()
+
+            if func_name == 'cmd':
+                ids = {args[0]}
+            elif func_name == 'many':
+                ids = set()
+                for sub_query in args[0]:
+                    if sub_query[0] != 'cmd':
+                        return None
+                    ids.add(sub_query[1][0])
+            else:
+                return None
+        except (IndexError, TypeError, KeyError):
+            return None
+
+        if len(ids) == 1:
+            instrument_id = ids.pop()
+            if instrument_id in self.instruments:
+                return instrument_id
+        return None
+
+    def _add_job(self, instrument_id, job):
+        with self._jobs_done:
+            jobs = self._jobs.get(instrument_id)
+            if jobs:
+                # the worker already running this instrument's jobs gets it
+                jobs.append(job)
+                return
+            self._jobs[instrument_id] = deque([job])
+        self._pool.submit(self._run_jobs, instrument_id)
+
+    def _run_jobs(self, instrument_id):
+        jobs = self._jobs[instrument_id]
+        while True:
+            # process_query catches and reports any errors
+            jobs[0]()
+            with self._jobs_done:
+                jobs.popleft()
+                if not jobs:
+                    del self._jobs[instrument_id]
+                    self._jobs_done.notify_all()
+                    return
+
+    def _wait_for_jobs(self):
+        with self._jobs_done:
+            while self._jobs:
+                self._jobs_done.wait()
 
     def handle_new_id(self):
         """
@@ -1,7 +1,10 @@
 from copy import deepcopy
+import heapq
+import itertools
+import math
 
 from qcodes.utils.helpers import (is_sequence, permissive_range, make_sweep,
-                                  named_repr)
+                                  named_repr, full_class)
 from qcodes.utils.metadata import Metadatable
 
 
@@ -284,3 +287,212 @@ class SweepFixedValues(SweepValues):
         new_sv = self.copy()
         new_sv.reverse()
         return new_sv
+
+
+class _SampleIndex:
+    """What the DataSet sees as the swept parameter of an AdaptiveSweep."""
+    def __init__(self, name, label):
+        self.name = self.full_name = name
+        self.label = label
+        self.unit = ''
+
+
+class AdaptiveSweep(Metadatable):
+    """
+    Sweep one or more parameters, choosing each point from the data so far.
+
+    Starts with a coarse grid, then keeps splitting the grid cell (an
+    interval, rectangle, box...) where the measured value changes the most
+    relative to the cell's size, so points collect near features and flat
+    regions stay coarse. Splitting a cell measures its center and the
+    centers of its edges and faces, sharing points with its neighbors.
+
+    Use this as the sweep of a ``Loop``, which passes each measurement back
+    with ``feedback``. Like a ``CombinedParameter`` sweep, the DataSet gets
+    one row per point: a setpoint array of sample numbers, then an array of
+    set values for each parameter and one for each measurement. Rows past
+    the last point measured stay NaN.
+
+    >>> Loop(AdaptiveSweep((gate1, 0, 1), (gate2, -1, 1), max_points=500),
+    ...      delay).each(meter).run()
+
+    Args:
+        *ranges (tuple): ``(parameter, start, stop)`` for each parameter to
+            sweep.
+
+        max_points (int): the most points to measure. Default 1000.
+
+        tolerance (float): stop once the biggest change over any cell,
+            times the fraction of the whole sweep the cell covers, is at
+            most this fraction of the range of all measured values.
+            Default 0, to use all of ``max_points`` unless all cells are
+            flat.
+
+        initial_points (int): points along each parameter in the starting
+            grid. Default 5.
+
+        max_depth (int): the most times a starting cell can be split.
+            Default 16.
+
+        measurement_index (int): which of the measured values (in the
+            order of the loop's actions) to follow. Default 0.
+
+        name (Optional[str]): name of the sample number setpoint array.
+            Default ``'sample'``.
+
+        label (Optional[str]): label of the sample number setpoint array.
+    """
+    def __init__(self, *ranges, max_points=1000, tolerance=0,
+                 initial_points=5, max_depth=16, measurement_index=0,
+                 name='sample', label='Sample'):
+        super().__init__()
+        if not ranges:
+            raise ValueError('AdaptiveSweep needs at least one range')
+        if initial_points < 2:
+            raise ValueError('initial_points must be at least 2')
+
+        self.parameters = [r[0] for r in ranges]
+        self.sets = [p.set for p in self.parameters]
+        self.starts = [r[1] for r in ranges]
+        self.stops = [r[2] for r in ranges]
+        for parameter, start, stop in ranges:
+            if hasattr(parameter, 'validate'):
+                parameter.validate(start)
+                parameter.validate(stop)
+
+        self.max_points = max_points
+        self.tolerance = tolerance
+        self.initial_points = initial_points
+        self.max_depth = max_depth
+        self.measurement_index = measurement_index
+
+        self.name = name
+        self.parameter = _SampleIndex(name, label)
+
+        # cell corners are integer coordinates, so we can find shared
+        # points exactly
+        self._cell_size = 2 ** max_depth
+        self._full_size = (initial_points - 1) * self._cell_size
+        self._reset()
+
+    def _reset(self):
+        self._coords = {}
+        self._points = []
+        self._values = []
+        self._cells = []
+        self._cell_order = itertools.count()
+        self._current = None
+
+    def __len__(self):
+        return self.max_points
+
+    def __iter__(self):
+        self._reset()
+        return self._indices()
+
+    def set(self, index):
+        """
+        Set all the parameters to the point with this sample number.
+
+        Returns:
+            list: the values that were set
+        """
+        self._current = index
+        values = self._points[index]
+        for set_function, value in zip(self.sets, values):
+            set_function(value)
+        return values
+
+    def feedback(self, set_values, measured_values):
+        """
+        Record the measurements at the point that was set last.
+
+        Args:
+            set_values (Sequence): the values that were set.
+            measured_values (Sequence): the values measured there.
+        """
+        value = measured_values[self.measurement_index]
+        self._values[self._current] = float(value)
+
+    @property
+    def points(self):
+        """The values of each parameter at every point so far."""
+        return list(self._points)
+
+    def _add_point(self, coords):
+        index = len(self._points)
+        self._coords[coords] = index
+        self._points.append([
+            start + (stop - start) * c / self._full_size
+            for start, stop, c in zip(self.starts, self.stops, coords)])
+        self._values.append(float('nan'))
+        return index
+
+    def _push_cell(self, low, size):
+        corners = [self._values[self._coords[tuple(
+            lo + offset for lo, offset in zip(low, offsets))]]
+            for offsets in itertools.product((0, size), repeat=len(low))]
+        corners = [v for v in corners if not math.isnan(v)]
+        spread = max(corners) - min(corners) if corners else 0
+        loss = spread * (size / self._full_size) ** len(low)
+        # cells of equal loss are split in the order they were made
+        heapq.heappush(self._cells,
+                       (-loss, next(self._cell_order), low, size))
+
+    def _value_range(self):
+        values = [v for v in self._values if not math.isnan(v)]
+        return max(values) - min(values) if values else 0
+
+    def _indices(self):
+        dims = len(self.parameters)
+        size = self._cell_size
+        grid = range(0, self._full_size + 1, size)
+        for coords in itertools.product(grid, repeat=dims):
+            if len(self._points) >= self.max_points:
+                return
+            yield self._add_point(coords)
+
+        for low in itertools.product(grid[:-1], repeat=dims):
+            self._push_cell(low, size)
+
+        while self._cells and len(self._points) < self.max_points:
+            neg_loss, _, low, size = heapq.heappop(self._cells)
+            if -neg_loss <= self.tolerance * self._value_range():
+                return
+            if size == 1:
+                continue
+
+            half = size // 2
+            for offsets in itertools.product((0, half, size), repeat=dims):
+                coords = tuple(lo + offset for lo, offset in zip(low, offsets))
+                if coords not in self._coords:
+                    if len(self._points) >= self.max_points:
+                        return
+                    yield self._add_point(coords)
+
+            for offsets in itertools.product((0, half), repeat=dims):
+                self._push_cell(tuple(lo + offset
+                                      for lo, offset in zip(low, offsets)),
+                                half)
+
+    def snapshot_base(self, update=False):
+        """
+        State of the adaptive sweep as a JSON-compatible dict.
+
+        Args:
+            update (bool): Place holder for API compatibility.
+
+        Returns:
+            dict: base snapshot
+        """
+        return {
+            '__class__': full_class(self),
+            'parameters': [p.snapshot() for p in self.parameters],
+            'ranges': [[start, stop] for start, stop
+                       in zip(self.starts, self.stops)],
+            'max_points': self.max_points,
+            'tolerance': self.tolerance,
+            'initial_points': self.initial_points,
+            'max_depth': self.max_depth,
+            'measurement_index': self.measurement_index
+        }
@@ -77,6 +77,9 @@ class Keithley_2700(VisaInstrument):
     This driver does not contain all commands available, but only the ones
     most commonly used.
     '''
+    # all commands start from the root (':'), so they can be sent together
+    command_separator = ';'
+
     def __init__(self, name, address, reset=False, **kwargs):
         super().__init__(name, address, **kwargs)
 
@@ -231,11 +234,14 @@ class Keithley_2700(VisaInstrument):
         '''
         logging.info('Get all relevant data from device')
 
-        for p in ['mode', 'trigger_count', 'trigger_continuous', 'averaging',
-                  'digits', 'nplc', 'integrationtime', 'range', 'display']:
-            logging.debug('get %s' % p)
-            par = getattr(self, p)
-            par.get()
+        # the mode-dependent getters send what's queued before them, so the
+        # mode is known by the time they need it
+        with self.batch() as batch:
+            for p in ['mode', 'trigger_count', 'trigger_continuous',
+                      'averaging', 'digits', 'nplc', 'integrationtime',
+                      'range', 'display']:
+                logging.debug('get %s' % p)
+                batch.get(getattr(self, p))
 
         # self.get_trigger_delay()
         # self.get_trigger_source()
@@ -44,9 +44,43 @@ Supported commands to .set_measurement or .each are:
     - ActiveLoop (or Loop, will be activated with default measurement)
     - Task: any callable that does not generate data
     - Wait: a delay
+
+A loop can also run as a single hardware sweep, with no Python round trip
+per point, if its sweep parameter can take the whole list of setpoints and
+every action is a parameter that can return a buffer of readings. This
+happens automatically, with the same loop syntax, when the sweep parameter
+has ``arm_sweep(values, delay)`` and ``trigger_sweep()`` methods, and every
+action has ``arm_buffer(npts)`` and ``get_buffer()`` methods. Otherwise the
+loop runs point by point as usual. See ``ActiveLoop._run_buffered``.
+
+A loop normally visits its setpoints in order, and an inner loop starts
+again from its first setpoint at each outer point. With ``order='snake'``
+it goes the other way every second time instead, so a stepped or ramped
+parameter doesn't have to go back to the start:
+
+>>> Loop(sv1, delay1).loop(sv2, delay2, order='snake').run()
+
+``order`` can also be any sequence of indices to visit, or of index tuples
+to visit the grid of this loop and the loops inside it in any order, such
+as ``hilbert_order`` for 2D maps:
+
+>>> Loop(sv1, delay1, order=hilbert_order(len(sv1), len(sv2))).loop(
+...     sv2, delay2).run()
+
+Either way, each point is stored at its usual place in the DataSet.
+
+Everything a loop needs at each point (its compiled actions, and the
+array_ids its data goes to) is worked out once per run, the first time the
+loop starts, and kept in a ``_LoopPlan``. Nested loops keep theirs too, so
+the inner loop only does the sets, gets and stores themselves, however many
+times it is entered.
 """
 
-from datetime import datetime
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import groupby
 import multiprocessing as mp
 import time
 import numpy as np
@@ -60,6 +94,8 @@ from qcodes.data.manager import get_data_manager
 from qcodes.utils.helpers import wait_secs, full_class, tprint
 from qcodes.process.qcodes_process import QcodesProcess
 from qcodes.utils.metadata import Metadatable
+from qcodes.utils.profiling import LoopProfiler
+from qcodes.utils.threading import instrument_lock
 
 from .actions import (_actions_snapshot, Task, Wait, _Measure, _Nest,
                       BreakIf, _QcodesBreak)
@@ -157,6 +193,12 @@ class Loop(Metadatable):
             and give an error if you wait longer than expected.
         progress_interval: should progress of the loop every x seconds. Default
             is None (no output)
+        order: the order to visit the setpoints in. None (default) goes
+            from first to last. ``'snake'`` goes back from last to first
+            every second time the loop runs, for inner loops. Or give a
+            sequence of indices into ``sweep_values``, or of index tuples
+            to also choose the order of the loops inside this one, such as
+            ``hilbert_order(len(sv1), len(sv2))``.
 
     After creating a Loop, you attach ``action``\s to it, making an ``ActiveLoop``
 
@@ -171,10 +213,11 @@ class Loop(Metadatable):
     this one.
     """
     def __init__(self, sweep_values, delay=0, station=None,
-                 progress_interval=None):
+                 progress_interval=None, order=None):
         super().__init__()
         if delay < 0:
             raise ValueError('delay must be > 0, not {}'.format(repr(delay)))
+        order = _check_order(order)
 
         self.sweep_values = sweep_values
         self.delay = delay
@@ -186,14 +229,16 @@ class Loop(Metadatable):
         self.bg_final_task = None
         self.bg_min_delay = None
         self.progress_interval = progress_interval
+        self.order = order
 
-    def loop(self, sweep_values, delay=0):
+    def loop(self, sweep_values, delay=0, order=None):
         """
         Nest another loop inside this one.
 
         Args:
             sweep_values ():
             delay (int):
+            order: the order of the new loop's setpoints, see ``Loop``
 
         Examples:
             >>> Loop(sv1, d1).loop(sv2, d2).each(*a)
@@ -208,15 +253,16 @@ class Loop(Metadatable):
 
         if out.nested_loop:
             # nest this new loop inside the deepest level
-            out.nested_loop = out.nested_loop.loop(sweep_values, delay)
+            out.nested_loop = out.nested_loop.loop(sweep_values, delay,
+                                                   order)
         else:
-            out.nested_loop = Loop(sweep_values, delay)
+            out.nested_loop = Loop(sweep_values, delay, order=order)
 
         return out
 
     def _copy(self):
         out = Loop(self.sweep_values, self.delay,
-                   progress_interval=self.progress_interval)
+                   progress_interval=self.progress_interval, order=self.order)
         out.nested_loop = self.nested_loop
         out.then_actions = self.then_actions
         out.station = self.station
@@ -255,7 +301,8 @@ class Loop(Metadatable):
         return ActiveLoop(self.sweep_values, self.delay, *actions,
                           then_actions=self.then_actions, station=self.station,
                           progress_interval=self.progress_interval,
-                          bg_task=self.bg_task, bg_final_task=self.bg_final_task, bg_min_delay=self.bg_min_delay)
+                          bg_task=self.bg_task, bg_final_task=self.bg_final_task, bg_min_delay=self.bg_min_delay,
+                          order=self.order)
 
     def with_bg_task(self, task, bg_final_task=None, min_delay=0.01):
         """
@@ -354,12 +401,36 @@ class Loop(Metadatable):
         Returns:
             dict: base snapshot
         """
-        return {
+        snap = {
             '__class__': full_class(self),
             'sweep_values': self.sweep_values.snapshot(update=update),
             'delay': self.delay,
             'then_actions': _actions_snapshot(self.then_actions, update)
         }
+        if self.order is not None:
+            snap['order'] = self.order
+        return snap
+
+
+def _check_order(order):
+    """Check a Loop ``order``, and make a sequence of indices a tuple."""
+    if isinstance(order, str):
+        if order != 'snake':
+            raise ValueError('unknown loop order', order)
+        return order
+    if order is None:
+        return order
+
+    order = tuple(tuple(index) if isinstance(index, (tuple, list))
+                  else index for index in order)
+    if not order:
+        raise ValueError('a loop order needs at least one index')
+    for index in order:
+        # all indices, or all index tuples
+        if isinstance(index, tuple) != isinstance(order[0], tuple):
+            raise TypeError('a loop order needs all indices or all index '
+                            'tuples', order)
+    return order
 
 
 def _attach_then_actions(loop, actions, overwrite):
@@ -408,11 +479,17 @@ class ActiveLoop(Metadatable):
     # maximum sleep time (secs) between checking the signal_queue for a HALT
     signal_period = 1
 
+    # minimum time (secs) between checking the signal_queue when there is no
+    # delay to wait. Looking at the queue is a system call, which can take
+    # longer than the rest of a point.
+    signal_check_period = 0.01
+
     def __init__(self, sweep_values, delay, *actions, then_actions=(),
                  station=None, progress_interval=None, bg_task=None,
-                 bg_final_task=None, bg_min_delay=None):
+                 bg_final_task=None, bg_min_delay=None, order=None):
         super().__init__()
         self.sweep_values = sweep_values
+        self.order = _check_order(order)
         self.delay = delay
         self.actions = list(actions)
         self.progress_interval = progress_interval
@@ -422,6 +499,17 @@ class ActiveLoop(Metadatable):
         self.bg_final_task = bg_final_task
         self.bg_min_delay = bg_min_delay
         self.data_set = None
+        self.pipelined = False
+        self.skip_unchanged = False
+        # worker threads for use_threads and pipelined, while running
+        self.executor = None
+        # _LoopPlan by action_indices, for the current run
+        self._plans = {}
+        # times this loop started so far in this run, for order='snake'
+        self._starts = {}
+        self._next_signal_check = 0
+        # LoopProfiler of the current or last run, if it was profiled
+        self.profiler = None
 
         # compile now, but don't save the results
         # just used for preemptive error checking
@@ -441,7 +529,8 @@ class ActiveLoop(Metadatable):
         # for sending halt signals to the loop
         self.signal_queue = mp.Queue()
 
-        self._monitor = None  # TODO: how to specify this?
+        # the Station's Monitor, to fill delays with, while running
+        self._monitor = None
 
     def then(self, *actions, overwrite=False):
         """
@@ -460,7 +549,8 @@ class ActiveLoop(Metadatable):
                 the Loop) will add to each other or overwrite the earlier ones.
         """
         loop = ActiveLoop(self.sweep_values, self.delay, *self.actions,
-                          then_actions=self.then_actions, station=self.station)
+                          then_actions=self.then_actions, station=self.station,
+                          order=self.order)
         return _attach_then_actions(loop, actions, overwrite)
 
     def with_bg_task(self, task, bg_final_task=None, min_delay=0.01):
@@ -484,13 +574,16 @@ class ActiveLoop(Metadatable):
 
     def snapshot_base(self, update=False):
         """Snapshot of this ActiveLoop's definition."""
-        return {
+        snap = {
             '__class__': full_class(self),
             'sweep_values': self.sweep_values.snapshot(update=update),
             'delay': self.delay,
             'actions': _actions_snapshot(self.actions, update),
             'then_actions': _actions_snapshot(self.then_actions, update)
         }
+        if self.order is not None:
+            snap['order'] = self.order
+        return snap
 
     def containers(self):
         """
@@ -655,19 +748,34 @@ class ActiveLoop(Metadatable):
 
         return sp
 
-    def set_common_attrs(self, data_set, use_threads, signal_queue):
+    def set_common_attrs(self, data_set, use_threads, signal_queue,
+                         pipelined=False, profiler=None, monitor=None,
+                         skip_unchanged=False):
         """
         set a couple of common attributes that the main and nested loops
         all need to have:
         - the DataSet collecting all our measurements
         - a queue for communicating with the main process
+        - whether to measure in threads, or pipeline the loop
+        - whether to skip sets to the latest value
+        - the LoopProfiler timing each step, if any
+        - the Monitor to call during delays, if any
         """
         self.data_set = data_set
         self.signal_queue = signal_queue
         self.use_threads = use_threads
+        self.pipelined = pipelined
+        self.skip_unchanged = skip_unchanged
+        self.profiler = profiler
+        self._monitor = monitor
+        # plans depend on all of these, so start over
+        self._plans = {}
+        self._starts = {}
         for action in self.actions:
             if hasattr(action, 'set_common_attrs'):
-                action.set_common_attrs(data_set, use_threads, signal_queue)
+                action.set_common_attrs(data_set, use_threads, signal_queue,
+                                        pipelined, profiler, monitor,
+                                        skip_unchanged)
 
     def _check_signal(self):
         while not self.signal_queue.empty():
@@ -707,6 +815,8 @@ class ActiveLoop(Metadatable):
             io: knows how to connect to the storage (disk vs cloud etc)
             write_period: how often to save to storage during the loop.
                 default 5 sec, use None to write only at the end
+            write_in_background: write during the loop from a separate
+                thread, so the loop only copies the new data. Default False.
 
         returns:
             a DataSet object that we can use to plot
@@ -747,6 +857,7 @@ class ActiveLoop(Metadatable):
 
     def run(self, background=USE_MP, use_threads=False, quiet=False,
             data_manager=USE_MP, station=None, progress_interval=False,
+            pipelined=False, profile=False, skip_unchanged=False,
             *args, **kwargs):
         """
         Execute this loop.
@@ -756,14 +867,36 @@ class ActiveLoop(Metadatable):
                 so we can have live plotting and other analysis in the main process
             use_threads: (default False): whenever there are multiple `get` calls
                 back-to-back, execute them in separate threads so they run in
-                parallel (as long as they don't block each other)
+                parallel (as long as they don't block each other). Calls to
+                one instrument stay in order in one thread, and the threads
+                are kept for the whole loop.
             quiet: (default False): set True to not print anything except errors
             data_manager: set to True to use a DataManager. Default to False.
-            station: a Station instance for snapshots (omit to use a previously
+            station: a Station instance for snapshots, whose monitor (if any)
+                is called during every delay (omit to use a previously
                 provided Station, or the default Station)
             progress_interval (default None): show progress of the loop every x
                 seconds. If provided here, will override any interval provided
                 with the Loop definition
+            pipelined: (default False): overlap the steps of each loop. While
+                the measurements of one point are stored, the next setpoint
+                is already being set in another thread, and each `get` group
+                measures different instruments in parallel. Every instrument
+                is only used by one thread at a time.
+            profile: (default False): time every set, delay, get, store and
+                write of the run, and add statistics of these to the
+                DataSet metadata at ``metadata['loop']['profile']``. Give a
+                ``LoopProfiler`` to choose what is kept, for example
+                ``LoopProfiler(save_arrays=True)`` to also keep the time of
+                every step as DataArrays. Afterwards, with
+                ``background=False``, the profiler is ``self.profiler``.
+            skip_unchanged: (default False): don't set a sweep parameter to
+                the value it already has, according to its latest value (set
+                or measured), as when an inner loop with ``order='snake'``
+                turns around. This also saves the delay and any ramp of the
+                parameter. True trusts the latest value however old it is,
+                or give the longest time (in seconds) to trust it. Sweeps of
+                several parameters are always set.
 
         kwargs are passed along to data_set.new_data. These can only be
         provided when the `DataSet` is first created; giving these during `run`
@@ -781,8 +914,10 @@ class ActiveLoop(Metadatable):
             formatter: knows how to read and write the file format
                 default can be set in DataSet.default_formatter
             io: knows how to connect to the storage (disk vs cloud etc)
-                write_period: how often to save to storage during the loop.
+            write_period: how often to save to storage during the loop.
                 default 5 sec, use None to write only at the end
+            write_in_background: write during the loop from a separate
+                thread, so the loop only copies the new data. Default False.
 
 
         returns:
@@ -806,25 +941,23 @@ class ActiveLoop(Metadatable):
                 'or you will not be able to sync your DataSet.',
                 UserWarning)
 
-        self.set_common_attrs(data_set=data_set, use_threads=use_threads,
-                              signal_queue=self.signal_queue)
+        if profile is True:
+            profile = LoopProfiler()
+        profiler = profile or None
 
         station = station or self.station or Station.default
-        if station:
-            data_set.add_metadata({'station': station.snapshot()})
+        self.set_common_attrs(data_set=data_set, use_threads=use_threads,
+                              signal_queue=self.signal_queue,
+                              pipelined=pipelined, profiler=profiler,
+                              monitor=getattr(station, 'monitor', None),
+                              skip_unchanged=skip_unchanged)
 
-        # information about the loop definition is in its snapshot
-        data_set.add_metadata({'loop': self.snapshot()})
-        # then add information about how and when it was run
-        ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        data_set.add_metadata({'loop': {
-            'ts_start': ts,
+        self._save_run_metadata(data_set, station, {
             'background': background,
             'use_threads': use_threads,
+            'pipelined': pipelined,
             'use_data_manager': (data_manager is not False)
-        }})
-
-        data_set.save_metadata()
+        })
 
         if prev_loop and not quiet:
             print('...done. Starting ' + (data_set.location or 'new loop'),
@@ -873,6 +1006,73 @@ class ActiveLoop(Metadatable):
 
         return ds
 
+    def _save_run_metadata(self, data_set, station, run_info):
+        station = station or self.station or Station.default
+        if station:
+            data_set.add_metadata({'station': station.snapshot()})
+
+        # information about the loop definition is in its snapshot
+        data_set.add_metadata({'loop': self.snapshot()})
+        # then add information about how and when it was run
+        ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        data_set.add_metadata({'loop': dict(run_info, ts_start=ts)})
+
+        data_set.save_metadata()
+
+    def _get_plan(self, action_indices):
+        """
+        The ``_LoopPlan`` of this loop at ``action_indices``, made the first
+        time it's needed in each run.
+
+        The same ActiveLoop can be used more than once within an outer loop,
+        so there is one plan for each place it appears.
+        """
+        plan = self._plans.get(action_indices)
+        if plan is None:
+            plan = self._plans[action_indices] = self._make_plan(
+                action_indices)
+        return plan
+
+    def _make_plan(self, action_indices):
+        id_map = self.data_set.action_id_map
+        parameter_ids = None
+        aggregate = None
+        set_ = self._set_locked if self.pipelined else self.sweep_values.set
+        if self.skip_unchanged and not hasattr(self.sweep_values,
+                                               'parameters'):
+            set_ = partial(_set_if_changed, self.sweep_values.parameter, set_,
+                           self.skip_unchanged)
+        if hasattr(self.sweep_values, 'parameters'):
+            # the arrays of the swept parameters follow those of the actions
+            parameter_ids = tuple(
+                id_map[action_indices + (len(self.actions) + j,)]
+                for j in range(len(self.sweep_values.parameters)))
+            aggregate = getattr(self.sweep_values, 'aggregate', None)
+
+        # the setpoints by index, to visit in any order
+        values = None
+        if hasattr(self.sweep_values, 'feedback'):
+            if self.order is not None:
+                raise ValueError(_ORDER_ERROR)
+        else:
+            values = list(self.sweep_values)
+
+        return _LoopPlan(
+            callables=tuple(self._compile_actions(self.actions,
+                                                  action_indices)),
+            then_callables=tuple(self._compile_actions(self.then_actions,
+                                                       ())),
+            store=self._timed('store', self.data_set.store),
+            set=self._timed('set ' + self.sweep_values.parameter.full_name,
+                            set_, new_point=True),
+            wait=self._timed('delay', self._wait),
+            set_id=id_map[action_indices],
+            parameter_ids=parameter_ids,
+            aggregate=aggregate,
+            feedback_ids=self._feedback_ids(action_indices),
+            buffered=self._buffered_actions(action_indices),
+            values=values)
+
     def _compile_actions(self, actions, action_indices=()):
         callables = []
         measurement_group = []
@@ -882,42 +1082,123 @@ class ActiveLoop(Metadatable):
                 measurement_group.append((action, new_action_indices))
                 continue
             elif measurement_group:
-                callables.append(_Measure(measurement_group, self.data_set,
-                                          self.use_threads))
+                callables.append(self._measure(measurement_group))
                 measurement_group[:] = []
 
             callables.append(self._compile_one(action, new_action_indices))
 
         if measurement_group:
-            callables.append(_Measure(measurement_group, self.data_set,
-                                      self.use_threads))
+            callables.append(self._measure(measurement_group))
             measurement_group[:] = []
 
         return callables
 
+    def _timed(self, phase, func, new_point=False):
+        """``func``, timed as ``phase`` if we're profiling this run."""
+        if self.profiler is None:
+            return func
+        return self.profiler.timed(phase, func, new_point)
+
+    def _measure(self, params_indices):
+        store = self._timed('store', self.data_set.store)
+        use_threads = self.use_threads
+        if self.pipelined:
+            # stores wait until the next setpoint is on its way
+            store = self._defer_store
+            use_threads = True
+        if hasattr(self.sweep_values, 'feedback'):
+            store = partial(self._store_measured, store)
+        return _Measure(params_indices, self.data_set, use_threads,
+                        store=store, executor=self.executor,
+                        profiler=self.profiler)
+
+    def _store_measured(self, store, loop_indices, ids_values):
+        # keep what was measured at this point for feedback
+        self._measured.update(ids_values)
+        store(loop_indices, ids_values)
+
+    def _defer_store(self, loop_indices, ids_values):
+        self._pending_stores.append((loop_indices, ids_values))
+
+    def _store_pending(self):
+        pending, self._pending_stores = self._pending_stores, []
+        store = self._timed('store', self.data_set.store)
+        for loop_indices, ids_values in pending:
+            store(loop_indices, ids_values)
+
+    def _set_locked(self, value):
+        with instrument_lock(self.sweep_values.parameter):
+            return self.sweep_values.set(value)
+
     def _compile_one(self, action, new_action_indices):
         if isinstance(action, Wait):
-            return Task(self._wait, action.delay)
+            return Task(self._timed('delay', self._wait), action.delay)
         elif isinstance(action, ActiveLoop):
             return _Nest(action, new_action_indices)
         else:
             return action
 
+    def _set_executor(self, executor):
+        self.executor = executor
+        for action in self.actions:
+            if isinstance(action, ActiveLoop):
+                action._set_executor(executor)
+
+    def _instrument_locks(self):
+        """The locks of every instrument measured in this and inner loops."""
+        locks = {}
+        for action in self.actions:
+            if isinstance(action, ActiveLoop):
+                locks.update(action._instrument_locks())
+            elif hasattr(action, 'get'):
+                lock = instrument_lock(action)
+                locks[id(lock)] = lock
+        return locks
+
     def _run_wrapper(self, *args, **kwargs):
+        # one set of worker threads for the whole run, started here as this
+        # may be a new process: a thread per instrument, and one to set
+        # the next setpoint
+        if self.use_threads or self.pipelined:
+            workers = len(self._instrument_locks()) + 1
+            self._set_executor(ThreadPoolExecutor(max_workers=workers))
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.reset()
+            self.data_set.profiler = profiler
         try:
             self._run_loop(*args, **kwargs)
         except _QuietInterrupt:
             pass
         finally:
+            if self.executor is not None:
+                # lets any gets or sets still going finish first
+                self.executor.shutdown()
+                self._set_executor(None)
             if hasattr(self, 'data_set'):
                 # somehow this does not show up in the data_set returned by
                 # run(), but it is saved to the metadata
                 ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 self.data_set.add_metadata({'loop': {'ts_end': ts}})
+                if profiler is not None:
+                    self._save_profile(profiler)
                 self.data_set.finalize()
 
+    def _save_profile(self, profiler):
+        """Put the timing of this run into the DataSet."""
+        profiler.stop()
+        self.data_set.profiler = None
+        self.data_set.add_metadata({'loop': {'profile': profiler.summary()}})
+        if profiler.save_arrays:
+            if self.data_set.mode == DataMode.LOCAL:
+                for array in profiler.arrays():
+                    self.data_set.add_array(array)
+            else:
+                warnings.warn('profile arrays can only be saved in a local '
+                              'DataSet, not on a DataServer', UserWarning)
+
     def _run_loop(self, first_delay=0, action_indices=(),
-                  loop_indices=(), current_values=(),
+                  loop_indices=(), current_values=(), indices=None,
                   **ignore_kwargs):
         """
         the routine that actually executes the loop, and can be called
@@ -927,6 +1208,8 @@ class ActiveLoop(Metadatable):
         action_indices: where we are in any outer loop action arrays
         loop_indices: setpoint indices in any outer loops
         current_values: setpoint values in any outer loops
+        indices: the setpoints to visit this time, if an outer loop's
+            order chooses them
         signal_queue: queue to communicate with main process directly
         ignore_kwargs: for compatibility with other loop tasks
         """
@@ -935,79 +1218,103 @@ class ActiveLoop(Metadatable):
         # the loop parameter may be increased if an outer loop requested longer
         delay = max(self.delay, first_delay)
 
-        callables = self._compile_actions(self.actions, action_indices)
+        self._pending_stores = []
+        self._measured = {}
+        plan = self._get_plan(action_indices)
+        callables = plan.callables
 
         t0 = time.time()
         last_task = t0
         last_task_failed = False
         imax = len(self.sweep_values)
-        for i, value in enumerate(self.sweep_values):
-            if self.progress_interval is not None:
-                tprint('loop %s: %d/%d (%.1f [s])' % (
-                    self.sweep_values.name, i, imax, time.time() - t0),
-                    dt=self.progress_interval, tag='outerloop')
-
-            set_val = self.sweep_values.set(value)
-
-            new_indices = loop_indices + (i,)
-            new_values = current_values + (value,)
-            data_to_store = {}
-
-            if hasattr(self.sweep_values, "parameters"):
-                set_name = self.data_set.action_id_map[action_indices]
-                if hasattr(self.sweep_values, 'aggregate'):
-                    value = self.sweep_values.aggregate(*set_val)
-                self.data_set.store(new_indices, {set_name: value})
-                for j, val in enumerate(set_val):
-                    set_index = action_indices + (j+1, )
-                    set_name = (self.data_set.action_id_map[set_index])
-                    data_to_store[set_name] = val
+        n = -1
+        if plan.buffered is not None and indices is None:
+            self._run_buffered(plan, first_delay, action_indices,
+                               loop_indices)
+            n = imax - 1
+        else:
+            feedback_ids = plan.feedback_ids
+            steps = self._steps(plan, action_indices, indices)
+            if self.pipelined and feedback_ids is None:
+                # (adaptive sweeps need feedback before the next value)
+                points = _with_next(steps)
             else:
-                set_name = self.data_set.action_id_map[action_indices]
-                data_to_store[set_name] = value
-
-            self.data_set.store(new_indices, data_to_store)
-
-            if not self._nest_first:
-                # only wait the delay time if an inner loop will not inherit it
-                self._wait(delay)
-
-            try:
-                for f in callables:
-                    f(first_delay=delay,
-                      loop_indices=new_indices,
-                      current_values=new_values)
-
-                    # after the first action, no delay is inherited
-                    delay = 0
-            except _QcodesBreak:
-                break
-
-            # after the first setpoint, delay reverts to the loop delay
-            delay = self.delay
-
-            # now check for a background task and execute it if it's
-            # been long enough since the last time
-            # don't let exceptions in the background task interrupt
-            # the loop
-            # if the background task fails twice consecutively, stop
-            # executing it
-            if self.bg_task is not None:
-                t = time.time()
-                if t - last_task >= self.bg_min_delay:
-                    try:
-                        self.bg_task()
-                        last_task_failed = False
-                    except Exception:
-                        if last_task_failed:
-                            self.bg_task = None
-                        last_task_failed = True
-                    last_task = t
+                points = ((step, _NO_VALUE) for step in steps)
+            next_set = None
+
+            for n, ((i, value, inner), next_step) in enumerate(points):
+                if self.progress_interval is not None:
+                    tprint('loop %s: %d/%d (%.1f [s])' % (
+                        self.sweep_values.name, n, imax, time.time() - t0),
+                        dt=self.progress_interval, tag='outerloop')
+
+                if next_set is not None:
+                    # set in the background during the previous point
+                    set_val = next_set.result()
+                    next_set = None
+                else:
+                    set_val = plan.set(value)
+
+                new_indices = loop_indices + (i,)
+                new_values = current_values + (value,)
+                if plan.parameter_ids is None:
+                    plan.store(new_indices, {plan.set_id: value})
+                else:
+                    self._store_setpoint(plan, value, set_val, new_indices)
+
+                if not self._nest_first:
+                    # only wait the delay time if an inner loop will not
+                    # inherit it
+                    plan.wait(delay)
+
+                try:
+                    for f in callables:
+                        f(first_delay=delay,
+                          loop_indices=new_indices,
+                          current_values=new_values,
+                          indices=inner)
+
+                        # after the first action, no delay is inherited
+                        delay = 0
+
+                    if next_step is not _NO_VALUE:
+                        next_set = self.executor.submit(plan.set,
+                                                        next_step[1])
+                except _QcodesBreak:
+                    break
+                finally:
+                    # only pipelined measurements are waiting to be stored
+                    if self._pending_stores:
+                        self._store_pending()
+
+                if feedback_ids is not None:
+                    self._feedback(set_val, feedback_ids)
+
+                # after the first setpoint, delay reverts to the loop delay
+                delay = self.delay
+
+                # now check for a background task and execute it if it's
+                # been long enough since the last time
+                # don't let exceptions in the background task interrupt
+                # the loop
+                # if the background task fails twice consecutively, stop
+                # executing it
+                if self.bg_task is not None:
+                    t = time.time()
+                    if t - last_task >= self.bg_min_delay:
+                        try:
+                            self.bg_task()
+                            last_task_failed = False
+                        except Exception:
+                            if last_task_failed:
+                                self.bg_task = None
+                            last_task_failed = True
+                        last_task = t
 
         if self.progress_interval is not None:
             # final progress note: set dt=-1 so it *always* prints
             tprint('loop %s DONE: %d/%d (%.1f [s])' % (
-                   self.sweep_values.name, i + 1, imax, time.time() - t0),
+                   self.sweep_values.name, n + 1, imax, time.time() - t0),
                    dt=-1, tag='outerloop')
 
         # run the background task one last time to catch the last setpoint(s)
@@ -1015,18 +1322,144 @@ class ActiveLoop(Metadatable):
             self.bg_task()
 
         # the loop is finished - run the .then actions
-        for f in self._compile_actions(self.then_actions, ()):
+        for f in plan.then_callables:
             f()
 
         # run the bg_final_task from the bg_task:
         if self.bg_final_task is not None:
             self.bg_final_task()
 
+    def _steps(self, plan, action_indices, indices=None):
+        """
+        The ``(index, value, inner_indices)`` of each setpoint to visit, in
+        the order to visit them.
+
+        ``inner_indices`` are the indices for the loops inside this one to
+        visit at this setpoint, if this loop's order has index tuples,
+        otherwise None.
+        """
+        if indices is None:
+            indices = self.order
+            if indices == 'snake':
+                starts = self._starts.get(action_indices, 0)
+                self._starts[action_indices] = starts + 1
+                if starts % 2:
+                    indices = range(len(plan.values) - 1, -1, -1)
+                else:
+                    indices = None
+
+        if indices is None:
+            return ((i, value, None)
+                    for i, value in enumerate(self.sweep_values))
+        if plan.values is None:
+            raise ValueError(_ORDER_ERROR)
+        return _ordered_steps(indices, plan.values)
+
+    def _store_setpoint(self, plan, value, set_val, loop_indices):
+        """Store the setpoint of a sweep of several parameters."""
+        if plan.aggregate is not None:
+            value = plan.aggregate(*set_val)
+        data_to_store = {plan.set_id: value}
+        data_to_store.update(zip(plan.parameter_ids, set_val))
+        plan.store(loop_indices, data_to_store)
+
+    def _feedback_ids(self, action_indices):
+        """
+        The array_ids of everything measured directly in this loop, if the
+        sweep wants ``feedback``, otherwise None.
+        """
+        if not hasattr(self.sweep_values, 'feedback'):
+            return None
+
+        id_map = self.data_set.action_id_map
+        ids = []
+        for i, action in enumerate(self.actions):
+            if hasattr(action, 'names'):
+                ids.extend(id_map[action_indices + (i, j)]
+                           for j in range(len(action.names)))
+            elif hasattr(action, 'get'):
+                ids.append(id_map[action_indices + (i,)])
+        return ids
+
+    def _feedback(self, set_val, feedback_ids):
+        measured = [self._measured.get(array_id, float('nan'))
+                    for array_id in feedback_ids]
+        self._measured = {}
+        self.sweep_values.feedback(set_val, measured)
 
+    def _buffered_actions(self, action_indices):
+        """
+        Find out if this loop can run as a single buffered hardware sweep.
+
+        That needs a sweep parameter with ``arm_sweep`` and
+        ``trigger_sweep`` methods, and every action must be a parameter
+        with ``arm_buffer`` and ``get_buffer`` methods.
+
+        Returns:
+            Optional[List[tuple]]: the ``(parameter, action_indices)`` of
+                each action, or None to run the loop point by point.
+        """
+        sweep_param = getattr(self.sweep_values, 'parameter', None)
+        if (self.order is not None or
+                hasattr(self.sweep_values, 'parameters') or
+                not hasattr(sweep_param, 'arm_sweep') or
+                not hasattr(sweep_param, 'trigger_sweep')):
+            return None
+
+        for action in self.actions:
+            if not (hasattr(action, 'arm_buffer') and
+                    hasattr(action, 'get_buffer')):
+                return None
+
+        return [(action, action_indices + (i,))
+                for i, action in enumerate(self.actions)]
+
+    def _run_buffered(self, plan, first_delay, action_indices,
+                      loop_indices):
+        """
+        Run this loop as one hardware sweep, and store the whole row at once.
+
+        The sweep parameter gets the full list of setpoints and the delay
+        to wait at each one with ``arm_sweep(values, delay)``. If an outer
+        loop asked for a longer delay, we wait the rest of it ourselves
+        before starting the sweep, so only the first point gets it. Each
+        parameter to measure is told how many readings to take with
+        ``arm_buffer(npts)``. Then ``trigger_sweep()`` starts the sweep, and
+        ``get_buffer()`` returns all readings of a parameter: what ``get``
+        would return, with an extra first dimension of length ``npts`` (for
+        a parameter with ``names``, one of these for each name).
+        """
+        params_indices = plan.buffered
+        values = list(self.sweep_values)
+        npts = len(values)
+
+        self.sweep_values.parameter.arm_sweep(values, self.delay)
+        for param, _ in params_indices:
+            param.arm_buffer(npts)
+
+        # the sweep waits self.delay after its first point already
+        self._wait(max(first_delay - self.delay, 0))
+        self._check_signal()
+        self.sweep_values.parameter.trigger_sweep()
+
+        id_map = self.data_set.action_id_map
+        data_to_store = {id_map[action_indices]: values}
+        for param, indices in params_indices:
+            readings = param.get_buffer()
+            if hasattr(param, 'names'):
+                for j, part in enumerate(readings):
+                    data_to_store[id_map[indices + (j,)]] = part
+            else:
+                data_to_store[id_map[indices]] = readings
+
+        plan.store(loop_indices + (slice(0, npts),), data_to_store)
 
     def _wait(self, delay):
         if delay:
             finish_clock = time.perf_counter() + delay
+            # don't keep data from the DataServer (and live plots) while
+            # we wait
+            self.data_set.push_store_batch(due_in=delay)
 
             if self._monitor:
                 # TODO - perhpas pass self._check_signal in here
@@ -1041,7 +1474,141 @@ class ActiveLoop(Metadatable):
                 if t <= self.signal_period:
                     break
         else:
-            self._check_signal()
+            # no need to look for a HALT at every point of a fast loop
+            t = time.perf_counter()
+            if t >= self._next_signal_check:
+                self._next_signal_check = t + self.signal_check_period
+                self._check_signal()
+
+
+# what a loop does at each point, worked out once per run:
+# see ActiveLoop._get_plan
+_LoopPlan = namedtuple('_LoopPlan', 'callables then_callables store set wait '
+                       'set_id parameter_ids aggregate feedback_ids buffered '
+                       'values')
+
+_NO_VALUE = object()
+
+_ORDER_ERROR = ('an adaptive sweep chooses its own order, it cannot have '
+                'a loop order')
+
+
+def _set_if_changed(parameter, set_, max_age, value):
+    """
+    ``set_(value)``, unless the latest value of ``parameter`` is ``value``
+    already, and no older than ``max_age`` seconds (any age if True).
+    """
+    latest = parameter._latest()
+    if latest['ts'] is not None and latest['value'] == value:
+        if max_age is True or (datetime.now() - latest['ts'] <=
+                               timedelta(seconds=max_age)):
+            return None
+    return set_(value)
+
+
+def _ordered_steps(indices, values):
+    """
+    ``(index, value, inner_indices)`` for a loop order, see
+    ``ActiveLoop._steps``. Consecutive index tuples with the same first
+    index are one visit to that setpoint, with the rest of each tuple
+    as the ``inner_indices``.
+    """
+    npts = len(values)
+    for i, group in groupby(indices, key=_first_index):
+        if not 0 <= i < npts:
+            raise IndexError('loop index {} is not in range({})'.format(
+                i, npts))
+        inner = [index[1] if len(index) == 2 else index[1:]
+                 for index in group if isinstance(index, tuple)]
+        yield i, values[i], (inner or None)
+
+
+def _first_index(index):
+    return index[0] if isinstance(index, tuple) else index
+
+
+def hilbert_order(*shape):
+    """
+    Visit a 2D grid of any size along a (generalized) Hilbert curve.
+
+    Each step goes to a neighbouring point, except that when one size is
+    even and the other odd there may be a single diagonal step. The curve
+    stays local: it fills one block of the grid before moving on, so both
+    parameters of a 2D map only ever take small steps. Use it as the
+    ``order`` of the outer ``Loop``.
+
+    Args:
+        *shape (int): the number of setpoints of the outer and the inner
+            loop.
+
+    Returns:
+        List[Tuple[int, int]]: every ``(outer, inner)`` index pair once,
+            starting at ``(0, 0)``.
+    """
+    if len(shape) != 2:
+        raise ValueError('hilbert_order needs a 2D shape', shape)
+    width, height = shape
+    if width >= height:
+        return list(_hilbert(0, 0, width, 0, 0, height))
+    return list(_hilbert(0, 0, 0, height, width, 0))
+
+
+def _sign(x):
+    return (x > 0) - (x < 0)
+
+
+def _hilbert(x, y, ax, ay, bx, by):
+    """
+    The points of a Hilbert curve filling the rectangle from (x, y) along
+    the major axis (ax, ay) and the minor axis (bx, by). This is the
+    "generalized Hilbert" (gilbert) recursion, which allows any size.
+    """
+    w = abs(ax + ay)
+    h = abs(bx + by)
+    dax, day = _sign(ax), _sign(ay)
+    dbx, dby = _sign(bx), _sign(by)
+
+    if h == 1:
+        for _ in range(w):
+            yield x, y
+            x, y = x + dax, y + day
+        return
+    if w == 1:
+        for _ in range(h):
+            yield x, y
+            x, y = x + dbx, y + dby
+        return
+
+    ax2, ay2 = ax // 2, ay // 2
+    bx2, by2 = bx // 2, by // 2
+    w2 = abs(ax2 + ay2)
+    h2 = abs(bx2 + by2)
+
+    if 2 * w > 3 * h:
+        # long and thin: split in two along the major axis
+        if w2 % 2 and w > 2:
+            ax2, ay2 = ax2 + dax, ay2 + day
+        yield from _hilbert(x, y, ax2, ay2, bx, by)
+        yield from _hilbert(x + ax2, y + ay2, ax - ax2, ay - ay2, bx, by)
+    else:
+        # split in three: up, along and back down
+        if h2 % 2 and h > 2:
+            bx2, by2 = bx2 + dbx, by2 + dby
+        yield from _hilbert(x, y, bx2, by2, ax2, ay2)
+        yield from _hilbert(x + bx2, y + by2, ax, ay, bx - bx2, by - by2)
+        yield from _hilbert(x + (ax - dax) + (bx2 - dbx),
+                            y + (ay - day) + (by2 - dby),
+                            -bx2, -by2, -(ax - ax2), -(ay - ay2))
+
+
+def _with_next(values):
+    """Iterate over (value, next_value), with next_value=_NO_VALUE at the end."""
+    iterator = iter(values)
+    for value in iterator:
+        for next_value in iterator:
+            yield value, next_value
+            value = next_value
+        yield value, _NO_VALUE
 
 
 class _QuietInterrupt(Exception):
@@ -0,0 +1,277 @@
+"""Monitor: low-priority reads that fill the waits of a measurement Loop."""
+import heapq
+import logging
+import time
+from numbers import Number
+
+import numpy as np
+
+from qcodes.utils.helpers import full_class
+from qcodes.utils.metadata import Metadatable
+
+
+class Monitor(Metadatable):
+    """
+    A set of things to read now and then, while a Loop is waiting anyway.
+
+    Give it to a ``Station`` (``Station(..., monitor=monitor)``) and every
+    Loop using that Station calls it during each delay, with the time the
+    delay ends. The monitor then runs only the tasks that are due and that
+    it expects to finish by then, highest ``priority`` first. So a fridge
+    temperature or magnet status is read in time the loop would otherwise
+    spend sleeping, without making any delay longer.
+
+    How long a task takes is estimated from its previous runs. Until it has
+    run, the ``duration`` given to ``add`` is used, or ``default_duration``,
+    so give a duration for tasks meant to fit in short delays. A task that
+    fails twice in a row is dropped, like a Loop background task.
+
+    Every result is kept with its time in a ring buffer of the last
+    ``history`` values of that task, see ``Monitor.history``.
+
+    Args:
+        history (int): how many results of each task to keep. Default 1000.
+
+        margin (float): run a task only if this many times its expected
+            duration fits before the deadline. Default 1.5.
+
+    Examples:
+        >>> monitor = Monitor()
+        >>> monitor.add(fridge.temperature, period=10)
+        >>> monitor.add(magnet.status, period=60, priority=-1)
+        >>> station = Station(fridge, magnet, monitor=monitor)
+        >>> Loop(gate[0:1:0.01], 0.1).each(meter.amplitude).run()
+        >>> times, temperatures = monitor.history('fridge_temperature')
+    """
+    # expected duration (s) of a task that never ran and has no duration
+    default_duration = 0.05
+
+    # weight of the latest run in the duration estimate
+    duration_weight = 0.3
+
+    def __init__(self, history=1000, margin=1.5):
+        super().__init__()
+        if history < 1:
+            raise ValueError('history must be at least 1')
+        self.history_size = history
+        self.margin = margin
+        self.tasks = {}
+        # [next_due, order, name]: the task queue, by perf_counter time
+        self._queue = []
+        self._order = 0
+
+    def add(self, target, name=None, period=0, priority=0, duration=None):
+        """
+        Add a task to the monitor.
+
+        Args:
+            target (Union[Parameter, callable]): a parameter to ``get``, or
+                any callable with no arguments, such as
+                ``partial(instrument.snapshot, update=True)``. What it
+                returns is kept in the history.
+
+            name (Optional[str]): the name of the task, by default the
+                ``full_name`` or ``name`` of ``target``.
+
+            period (float): the least time (s) from one run to the next.
+                Default 0, run at every chance.
+
+            priority (float): tasks with higher priority run first when
+                they are due at the same call. Default 0.
+
+            duration (Optional[float]): how long (s) the task is expected
+                to take, until it has run once.
+
+        Returns:
+            str: the name of the task.
+
+        Raises:
+            ValueError: if there is already a task with this name.
+        """
+        if name is None:
+            name = (getattr(target, 'full_name', None) or
+                    getattr(target, 'name', None) or repr(target))
+        if name in self.tasks:
+            raise ValueError('monitor task {} already exists'.format(name))
+
+        func = target.get if hasattr(target, 'get') else target
+        if not callable(func):
+            raise TypeError('monitor tasks must be parameters or callables',
+                            target)
+
+        self.tasks[name] = _MonitorTask(
+            func, period, priority,
+            self.default_duration if duration is None else duration,
+            _RingBuffer(self.history_size))
+        self._push(time.perf_counter(), name)
+        return name
+
+    def remove(self, name):
+        """Remove the task ``name``, and its history."""
+        del self.tasks[name]
+        # its queue entry is skipped when it comes up
+
+    def _push(self, due, name):
+        entry = [due, self._order, name]
+        self.tasks[name].entry = entry
+        heapq.heappush(self._queue, entry)
+        self._order += 1
+
+    def _is_queued(self, entry):
+        # not a task that was removed, even if one of that name was added
+        task = self.tasks.get(entry[2])
+        return task is not None and task.entry is entry
+
+    def call(self, finish_by=None):
+        """
+        Run the tasks that are due and fit in the time left.
+
+        Args:
+            finish_by (Optional[float]): the ``time.perf_counter()`` by
+                which to be done. Omit to run every task that is due.
+
+        Returns:
+            int: how many tasks ran.
+        """
+        now = time.perf_counter()
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            entry = heapq.heappop(self._queue)
+            if self._is_queued(entry):
+                due.append(entry)
+        # highest priority first, then the longest overdue
+        due.sort(key=lambda entry: (-self.tasks[entry[2]].priority,
+                                    entry[0]))
+
+        ran = 0
+        for entry in due:
+            if not self._is_queued(entry):
+                # removed by an earlier task
+                continue
+            name = entry[2]
+            task = self.tasks[name]
+            if (finish_by is not None and
+                    now + self.margin * task.duration > finish_by):
+                # maybe next time: try the shorter ones still
+                heapq.heappush(self._queue, entry)
+                continue
+
+            if self._run_task(name, task):
+                self._push(now + task.period, name)
+            ran += 1
+            now = time.perf_counter()
+
+        return ran
+
+    def _run_task(self, name, task):
+        """Run one task, and return whether it should run again."""
+        t_start = time.perf_counter()
+        try:
+            value = task.func()
+        except Exception:
+            task.failures += 1
+            logging.warning('monitor task {} failed'.format(name),
+                            exc_info=True)
+            if task.failures >= 2:
+                logging.warning('monitor task {} failed twice, '
+                                'removing it'.format(name))
+                del self.tasks[name]
+                return False
+            return True
+
+        dt = time.perf_counter() - t_start
+        task.failures = 0
+        if task.runs:
+            w = self.duration_weight
+            task.duration = (1 - w) * task.duration + w * dt
+        else:
+            task.duration = dt
+        task.runs += 1
+        task.buffer.append(time.time(), value)
+        return True
+
+    def history(self, name):
+        """
+        The results of task ``name``, oldest first.
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: the times (from
+                ``time.time()``) and values of up to ``history`` runs.
+                Numeric results are floats, others are kept as objects.
+        """
+        return self.tasks[name].buffer.get()
+
+    def latest(self, name):
+        """The last result of task ``name``, or None if it never ran."""
+        times, values = self.history(name)
+        return values[-1] if len(values) else None
+
+    def clear(self):
+        """Forget the history of every task."""
+        for task in self.tasks.values():
+            task.buffer = _RingBuffer(self.history_size)
+
+    def snapshot_base(self, update=False):
+        """
+        State of the monitor as a JSON-compatible dict.
+
+        Args:
+            update (bool): not used, the monitor only reads when called.
+
+        Returns:
+            dict: base snapshot
+        """
+        return {
+            '__class__': full_class(self),
+            'tasks': {name: {'period': task.period,
+                             'priority': task.priority,
+                             'duration': task.duration,
+                             'runs': task.runs}
+                      for name, task in self.tasks.items()}
+        }
+
+
+class _MonitorTask:
+    """One task of a ``Monitor``, with what we've learned about it."""
+    def __init__(self, func, period, priority, duration, buffer):
+        self.func = func
+        self.period = period
+        self.priority = priority
+        self.duration = duration
+        self.buffer = buffer
+        self.runs = 0
+        self.failures = 0
+        # its entry in the Monitor's queue
+        self.entry = None
+
+
+class _RingBuffer:
+    """
+    The last ``size`` (time, value) pairs, in preallocated numpy arrays.
+
+    Values are kept as floats while they are numbers, and as objects
+    otherwise.
+    """
+    def __init__(self, size):
+        self.times = np.zeros(size)
+        self.values = np.full(size, np.nan)
+        self.count = 0
+
+    def append(self, t, value):
+        if (self.values.dtype != object and
+                not (isinstance(value, Number) and
+                     not isinstance(value, complex))):
+            self.values = self.values.astype(object)
+        i = self.count % len(self.times)
+        self.times[i] = t
+        self.values[i] = value
+        self.count += 1
+
+    def get(self):
+        size = len(self.times)
+        if self.count <= size:
+            return (self.times[:self.count].copy(),
+                    self.values[:self.count].copy())
+        i = self.count % size
+        return (np.concatenate((self.times[i:], self.times[:i])),
+                np.concatenate((self.values[i:], self.values[:i])))
@@ -8,6 +8,7 @@ import logging
 
 QUERY_WRITE = 'WRITE'
 QUERY_ASK = 'ASK'
+QUERY_REQUEST = 'REQUEST'
 RESPONSE_OK = 'OK'
 RESPONSE_ERROR = 'ERROR'
 
@@ -29,6 +30,11 @@ class ServerManager:
       to wait for confirmation that the query has completed
     - ``manager.write(func_name, *args, **kwargs)``: if they want to continue
       immediately without blocking for the query.
+    - ``manager.ask_many(queries)``: to send several queries in one message,
+      and wait for all their responses at once.
+    - ``manager.request(func_name, *args, **kwargs)``: to send a query and
+      continue, collecting the response later with ``result()``. Several
+      requests can be outstanding at once.
 
     The server communicates with this manager via two multiprocessing *Queue*\s.
     """
@@ -64,6 +70,10 @@ class ServerManager:
         # and move on.
         self.query_lock = mp.RLock()
 
+        # responses to tagged requests, by tag, until they're collected
+        self._requests = {}
+        self._responses = {}
+
         # uuid is used to pass references to this object around
         # for example, to get it after someone else has sent it to a server
         self.uuid = uuid4().hex
@@ -121,26 +131,131 @@ class ServerManager:
             # in case a previous query errored and left something on the
             # response queue, clear it
             while not self._response_queue.empty():
-                value = self._get_response()
-                logging.warning(
-                    'unexpected data in response queue before ask:\n' +
-                    repr(value))
+                res = self._response_queue.get()
+                if not self._keep_tagged(res):
+                    value = self._check_response(res)
+                    logging.warning(
+                        'unexpected data in response queue before ask:\n' +
+                        repr(value))
 
             self._query_queue.put(query)
 
             value = self._get_response(timeout=timeout, query=query)
 
             while not self._response_queue.empty():
-                logging .warning(
-                    'unexpected multiple responses in queue during ask, '
-                    'using the last one. earlier item(s):\n' +
-                    repr(value))
-                value = self._get_response(query=query)
+                res = self._response_queue.get()
+                if not self._keep_tagged(res):
+                    logging .warning(
+                        'unexpected multiple responses in queue during ask, '
+                        'using the last one. earlier item(s):\n' +
+                        repr(value))
+                    value = self._check_response(res, query=query)
 
         return value
 
+    def ask_many(self, queries, timeout=None):
+        """
+        Send several queries to the server in one message.
+
+        This costs one round trip through the queues instead of one per
+        query. The server runs every query, in order, even if some of them
+        fail.
+
+        Args:
+            queries (Sequence[tuple]): ``(func_name, args)`` or
+                ``(func_name, args, kwargs)`` for each query, as for
+                ``ask(func_name, *args, **kwargs)``.
+
+            timeout (Optional[float]): max time to wait for the responses,
+                as in ``ask``.
+
+        Returns:
+            list: the response to each query.
+
+        Raises:
+            Exception: the error of the first query that failed, as ``ask``
+                would raise it.
+        """
+        queries = [tuple(q) for q in queries]
+        responses = self.ask('many', queries, timeout=timeout)
+
+        values = []
+        for query, (code, value) in zip(queries, responses):
+            if code != RESPONSE_OK:
+                self._handle_error(code, value, query)
+            values.append(value)
+        return values
+
+    def request(self, func_name, *args, **kwargs):
+        """
+        Send a query to the server, without waiting for the response.
+
+        The query is tagged, so its response can be collected later, in any
+        order relative to other requests. ``query_lock`` is held from here
+        until the response is collected, so other processes can't take it
+        from the queue: collect every request, in the thread that made it.
+
+        `req = request(func_name, *args, **kwargs)` proxies to server method:
+        `resp = server.handle_<func_name>(*args, **kwargs)`, with
+        `resp = req.result()`
+
+        Returns:
+            ServerRequest: call its ``result()`` for the response.
+        """
+        self._check_alive()
+
+        self.query_lock.acquire()
+        tag = uuid4().hex
+        query = (QUERY_REQUEST, func_name, tag, args, kwargs)
+        self._requests[tag] = query
+        try:
+            self._query_queue.put(query)
+        except:
+            del self._requests[tag]
+            self.query_lock.release()
+            raise
+        return ServerRequest(self, tag)
+
+    def _collect(self, tag, timeout=None):
+        """Wait for the response to request ``tag``, and return it."""
+        timeout = timeout or self.query_timeout
+        while tag not in self._responses:
+            self._keep_tagged(self._response_queue.get(timeout=timeout),
+                              warn=True)
+
+        query = self._requests.pop(tag)
+        res = self._responses.pop(tag)
+        self.query_lock.release()
+        return self._check_response(res, query=query)
+
+    def _keep_tagged(self, res, warn=False):
+        """
+        If ``res`` is the response to a request, keep it for ``_collect``.
+
+        Returns:
+            bool: whether ``res`` was tagged, so we took care of it.
+        """
+        if isinstance(res, tuple) and len(res) == 3:
+            code, value, tag = res
+            if tag in self._requests:
+                self._responses[tag] = (code, value)
+            else:
+                logging.warning('response to an unknown request:\n' +
+                                repr(res))
+            return True
+
+        if warn:
+            logging.warning('unexpected data in response queue while '
+                            'waiting for a request:\n' + repr(res))
+        return False
+
     def _get_response(self, timeout=None, query=None):
         res = self._response_queue.get(timeout=timeout)
+        while self._keep_tagged(res):
+            res = self._response_queue.get(timeout=timeout)
+        return self._check_response(res, query=query)
+
+    def _check_response(self, res, query=None):
         try:
             code, value = res
         except (TypeError, ValueError):
@@ -208,6 +323,56 @@ class ServerManager:
             del self.query_lock
 
 
+class ServerRequest:
+
+    """
+    A query sent by ``ServerManager.request``, whose response may be pending.
+
+    Args:
+        manager (ServerManager): the manager that sent the query.
+
+        tag (str): the tag the server puts on the response.
+    """
+
+    def __init__(self, manager, tag):
+        self.manager = manager
+        self.tag = tag
+        self._done = False
+        self._value = None
+        self._error = None
+
+    def result(self, timeout=None):
+        """
+        Wait for the response, and return it.
+
+        Args:
+            timeout (Optional[float]): max time to wait, by default the
+                manager's ``query_timeout``. If it runs out, ``queue.Empty``
+                is raised and the request is still pending.
+
+        Returns:
+            Any: what the server handler returned. Later calls return the
+                same value again.
+
+        Raises:
+            Exception: the error of the query, as ``ServerManager.ask``
+                would raise it.
+        """
+        if not self._done:
+            try:
+                self._value = self.manager._collect(self.tag, timeout)
+            except Exception as e:
+                if self.tag in self.manager._requests:
+                    # timed out, the response may still come
+                    raise
+                self._error = e
+            self._done = True
+
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
 class BaseServer(NestedAttrAccess):
 
     """
@@ -238,13 +403,20 @@ class BaseServer(NestedAttrAccess):
     - `QUERY_WRITE` (from `server_manager.write`): will NEVER send a response,
       return values are ignored and errors go to the logging framework.
 
-    Three handlers are predefined:
+    - `QUERY_REQUEST` (from `server_manager.request`): like `QUERY_ASK`, but
+      the query is `(code, func_name, tag[, args][, kwargs])` and the
+      response is `(response_code, value, tag)`, so responses to several
+      outstanding requests can be told apart.
+
+    Four handlers are predefined:
 
     - `handle_halt` (but override it if your event loop does not use
       self.running=False to stop)
 
     - `handle_get_handlers` (lists all available handler methods)
 
+    - `handle_many` (run a list of queries, from `server_manager.ask_many`)
+
     - `handle_method_call` (call an arbitrary method on the server)
     """
 
@@ -294,17 +466,23 @@ class BaseServer(NestedAttrAccess):
         """
         Act on one query received through the query queue.
 
-        query: should have the form `(code, func_name[, args][, kwargs])`
+        query: should have the form `(code, func_name[, args][, kwargs])`,
+            or `(code, func_name, tag[, args][, kwargs])` for `QUERY_REQUEST`
         """
+        code = None
+        tag = None
         try:
-            code = None
             code, func_name = query[:2]
+            parts = query[2:]
+            if code == QUERY_REQUEST:
+                tag = parts[0]
+                parts = parts[1:]
 
             func = getattr(self, 'handle_' + func_name)
 
             args = None
             kwargs = None
-            for part in query[2:]:
+            for part in parts:
                 if isinstance(part, tuple) and args is None:
                     args = part
                 elif isinstance(part, dict) and kwargs is None:
@@ -312,16 +490,16 @@ class BaseServer(NestedAttrAccess):
                 else:
                     raise ValueError(part)
 
-            if code == QUERY_ASK:
-                self._process_ask(func, args or (), kwargs or {})
+            if code in (QUERY_ASK, QUERY_REQUEST):
+                self._process_ask(func, args or (), kwargs or {}, tag)
             elif code == QUERY_WRITE:
                 self._process_write(func, args or (), kwargs or {})
             else:
                 raise ValueError(code)
         except:
-            self.report_error(query, code)
+            self.report_error(query, code, tag)
 
-    def report_error(self, query, code):
+    def report_error(self, query, code, tag=None):
         """
         Common error handler for all queries.
 
@@ -337,23 +515,29 @@ class BaseServer(NestedAttrAccess):
             'method `handle_<func_name>`, and optionally args is a tuple and '
             'kwargs is a dict\nquery: ' + repr(query) + '\n' + format_exc())
 
-        if code != QUERY_ASK:
+        if code not in (QUERY_ASK, QUERY_REQUEST):
             logging.error(error_str)
         if code != QUERY_WRITE:
             try:
-                self._response_queue.put((RESPONSE_ERROR, error_str))
+                self._respond(RESPONSE_ERROR, error_str, tag)
             except:
                 logging.error('Could not put error on response queue\n' +
                               error_str)
 
-    def _process_ask(self, func, args, kwargs):
+    def _respond(self, code, value, tag=None):
+        if tag is None:
+            self._response_queue.put((code, value))
+        else:
+            self._response_queue.put((code, value, tag))
+
+    def _process_ask(self, func, args, kwargs, tag=None):
         try:
             response = func(*args, **kwargs)
-            self._response_queue.put((RESPONSE_OK, response))
+            self._respond(RESPONSE_OK, response, tag)
         except:
-            self._response_queue.put(
-                (RESPONSE_ERROR, repr((func, args, kwargs)) + '\n' +
-                    format_exc()))
+            self._respond(RESPONSE_ERROR,
+                          repr((func, args, kwargs)) + '\n' + format_exc(),
+                          tag)
 
     def _process_write(self, func, args, kwargs):
         try:
@@ -372,6 +556,31 @@ class BaseServer(NestedAttrAccess):
         """
         self.running = False
 
+    def handle_many(self, queries):
+        """
+        Run several queries, and collect all their responses.
+
+        Args:
+            queries (Sequence[tuple]): ``(func_name, args)`` or
+                ``(func_name, args, kwargs)`` for each query, mapping to
+                ``self.handle_<func_name>(*args, **kwargs)``.
+
+        Returns:
+            List[tuple]: ``(RESPONSE_OK, value)`` or
+                ``(RESPONSE_ERROR, error_str)`` for each query, in order.
+        """
+        responses = []
+        for query in queries:
+            try:
+                func_name, args = query[:2]
+                kwargs = query[2] if len(query) > 2 else {}
+                func = getattr(self, 'handle_' + func_name)
+                responses.append((RESPONSE_OK, func(*args, **kwargs)))
+            except:
+                responses.append((RESPONSE_ERROR,
+                                  repr(query) + '\n' + format_exc()))
+        return responses
+
     def handle_get_handlers(self):
         """List all available query handlers."""
         handlers = []
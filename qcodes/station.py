@@ -27,7 +27,8 @@ class Station(Metadatable, DelegateAttributes):
         *components (list[Any]): components to add immediately to the Station.
             can be added later via self.add_component
 
-        monitor (None): Not implememnted, the object that monitors the system continuously
+        monitor (Optional[Monitor]): reads to make while a Loop using this
+            Station is waiting, see ``qcodes.monitor.Monitor``
 
         default (bool): is this station the default, which gets
             used in Loops and elsewhere that a Station can be specified, default  true
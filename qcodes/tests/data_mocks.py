@@ -1,5 +1,6 @@
 import numpy
 import multiprocessing as mp
+import threading
 
 from qcodes.data.data_array import DataArray
 from qcodes.data.data_set import new_data
@@ -11,9 +12,15 @@ class MockDataManager:
 
     def __init__(self):
         self.needs_restart = False
+        self.messages = []
+
+    def write(self, *args):
+        self.messages.append(args)
 
     def ask(self, *args, timeout=None):
-        if args == ('get_data', 'location'):
+        if args == ('finalize_data',):
+            self.messages.append(args)
+        elif args == ('get_data', 'location'):
             return self.location
         elif args == ('get_data',):
             return self.live_data
@@ -68,6 +75,38 @@ class RecordingMockFormatter:
                                           location, read_first))
 
 
+class ThreadedMockFormatter:
+    """Records what it writes and where, and can block or fail writes."""
+    def __init__(self):
+        self.writes = []
+        self.writing = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = False
+        self.closed = False
+
+    def write(self, data_set, io_manager, location, write_metadata=False):
+        self.writing.set()
+        self.gate.wait()
+        if self.fail:
+            raise RuntimeError('disk is full')
+
+        self.writes.append({
+            'thread': threading.current_thread(),
+            'arrays': {array_id: (array.modified_range, array.tolist())
+                       for array_id, array in data_set.arrays.items()}
+        })
+        for array in data_set.arrays.values():
+            if array.modified_range:
+                array.mark_saved(array.modified_range[1])
+
+    def write_metadata(self, data_set, io_manager, location, read_first=True):
+        pass
+
+    def close_file(self, data_set):
+        self.closed = True
+
+
 class MatchIO:
     def __init__(self, existing_matches, fmt=None):
         self.existing_matches = existing_matches
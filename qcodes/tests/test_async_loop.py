@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from unittest import TestCase
+
+from qcodes.actions import Task, Wait, BreakIf
+from qcodes.async_loop import AsyncLoop
+from qcodes.loops import Loop
+from qcodes.instrument.parameter import Parameter, ManualParameter
+from qcodes.instrument.sweep_values import AdaptiveSweep
+from qcodes.utils.validators import Numbers
+
+
+class FakeInstrument:
+    def __init__(self, name):
+        self.name = name
+
+
+class AsyncParameter(Parameter):
+    """
+    A parameter with coroutine get and set, that records how many
+    parameters are busy at once.
+    """
+    def __init__(self, name, instrument, busy, delay=0.01):
+        super().__init__(name, vals=Numbers())
+        self._instrument = instrument
+        self.busy = busy
+        self.delay = delay
+        self.value = 0
+
+    async def _talk(self):
+        busy = self.busy
+        if self._instrument.name in busy['instruments']:
+            busy['overlaps'] += 1
+        busy['instruments'].add(self._instrument.name)
+        busy['max'] = max(busy['max'], len(busy['instruments']))
+        await asyncio.sleep(self.delay)
+        busy['instruments'].discard(self._instrument.name)
+
+    async def get(self):
+        await self._talk()
+        return self.value
+
+    async def set(self, value):
+        await self._talk()
+        self.value = value
+
+
+class BlockingParameter(ManualParameter):
+    """A ManualParameter that records the threads it is measured in."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def get(self):
+        self.threads.add(threading.current_thread().name)
+        return super().get()
+
+
+class TestAsyncLoop(TestCase):
+    def setUp(self):
+        self.p1 = BlockingParameter('p1', vals=Numbers(-10, 10))
+        self.p2 = BlockingParameter('p2', vals=Numbers(-10, 10))
+        self.busy = {'instruments': set(), 'max': 0, 'overlaps': 0}
+
+    def test_blocking(self):
+        loop = Loop(self.p1[1:3:1], 0.001).loop(self.p2[3:5:1], 0.001).each(
+            self.p1, self.p2)
+        data = AsyncLoop(loop).run_temp()
+
+        self.assertEqual(data.p1_set.tolist(), [1, 2])
+        self.assertEqual(data.p2_set.tolist(), [[3, 4]] * 2)
+        self.assertEqual(data.p1.tolist(), [[1, 1], [2, 2]])
+        self.assertEqual(data.p2.tolist(), [[3, 4]] * 2)
+        self.assertTrue(data.metadata['loop']['use_async'])
+        self.assertIn('ts_end', data.metadata['loop'])
+
+        # blocking gets don't run in the event loop
+        self.assertNotIn(threading.current_thread().name, self.p1.threads)
+
+        # and the loop can run again
+        data2 = AsyncLoop(loop).run_temp()
+        self.assertEqual(data2.p2.tolist(), [[3, 4]] * 2)
+
+    def test_coroutines(self):
+        inst1, inst2, inst3 = (FakeInstrument('i{}'.format(i))
+                               for i in range(3))
+        gate = AsyncParameter('gate', inst1, self.busy)
+        a = AsyncParameter('a', inst2, self.busy)
+        b = AsyncParameter('b', inst2, self.busy)
+        c = AsyncParameter('c', inst3, self.busy)
+        a.value, b.value, c.value = 1, 2, 3
+
+        data = AsyncLoop(Loop(gate[1:4:1]).each(gate, a, b, c)).run_temp()
+
+        self.assertEqual(data.i0_gate_set.tolist(), [1, 2, 3])
+        self.assertEqual(data.i0_gate.tolist(), [1, 2, 3])
+        self.assertEqual(data.i1_a.tolist(), [1, 1, 1])
+        self.assertEqual(data.i1_b.tolist(), [2, 2, 2])
+        self.assertEqual(data.i2_c.tolist(), [3, 3, 3])
+
+        # the three instruments are measured at once, but one instrument
+        # only does one thing at a time
+        self.assertEqual(self.busy['max'], 3)
+        self.assertEqual(self.busy['overlaps'], 0)
+
+    def test_actions(self):
+        calls = []
+        loop = Loop(self.p1[1:6:1]).each(
+            Task(calls.append, self.p1.get_latest), Wait(0.001),
+            self.p1, BreakIf(self.p1 >= 3))
+        data = AsyncLoop(loop).run_temp()
+
+        self.assertEqual(calls, [1, 2, 3])
+        self.assertEqual(repr(data.p1.tolist()),
+                         repr([1., 2., 3., float('nan'), float('nan')]))
+
+    def test_order(self):
+        calls = []
+        loop = Loop(self.p1[1:3:1]).loop(self.p2[3:6:1], order='snake').each(
+            Task(calls.append, self.p2.get_latest), self.p2)
+        data = AsyncLoop(loop).run_temp()
+
+        self.assertEqual(data.p2.tolist(), [[3, 4, 5]] * 2)
+        self.assertEqual(calls, [3, 4, 5, 5, 4, 3])
+
+    def test_in_event_loop(self):
+        loop = Loop(self.p1[1:3:1]).each(self.p1)
+
+        async def measure():
+            return await AsyncLoop(loop).async_run(
+                quiet=True, location=False)
+
+        event_loop = asyncio.new_event_loop()
+        try:
+            data = event_loop.run_until_complete(measure())
+        finally:
+            event_loop.close()
+        self.assertEqual(data.p1.tolist(), [1, 2])
+
+    def test_adaptive(self):
+        def sweep():
+            return AdaptiveSweep((self.p1, 0, 1), max_points=20)
+
+        sync_sweep, async_sweep = sweep(), sweep()
+        Loop(sync_sweep).each(self.p1).run_temp()
+        AsyncLoop(Loop(async_sweep).each(self.p1)).run_temp()
+
+        self.assertEqual(async_sweep.points, sync_sweep.points)
+        self.assertEqual(len(async_sweep.points), 20)
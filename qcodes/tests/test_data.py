@@ -1,12 +1,13 @@
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import patch, Mock
 import numpy as np
 import os
 import pickle
 import logging
+import threading
 
 from qcodes.data.data_array import DataArray
-from qcodes.data.manager import get_data_manager, NoData
+from qcodes.data.manager import get_data_manager, NoData, DataServer
 from qcodes.data.io import DiskIO
 from qcodes.data.data_set import load_data, new_data, DataMode, DataSet
 from qcodes.process.helpers import kill_processes
@@ -15,7 +16,8 @@ from qcodes import active_children
 
 from .data_mocks import (MockDataManager, MockFormatter, MatchIO,
                          MockLive, MockArray, DataSet2D, DataSet1D,
-                         DataSetCombined, RecordingMockFormatter)
+                         DataSetCombined, RecordingMockFormatter,
+                         ThreadedMockFormatter)
 from .common import strip_qc
 
 
@@ -184,6 +186,70 @@ class TestDataArray(TestCase):
         ])
         self.assertEqual(data.modified_range, (2, 14))
 
+    def test_edit_and_mark_points(self):
+        data = DataArray(preset_data=np.zeros((3, 4, 5)))
+        data.modified_range = None
+
+        data[1, 2, 3] = 1
+        self.assertEqual(data.modified_range, (33, 33))
+        data[2, 0, 4] = 2
+        data[0, 3, 0] = 3
+        self.assertEqual(data.modified_range, (15, 44))
+        data[1, 1, 1] = 4
+        self.assertEqual(data.modified_range, (15, 44))
+        self.assertEqual(data.ndarray.ravel()[[33, 44, 15, 26]].tolist(),
+                         [1, 2, 3, 4])
+
+        # numpy ints take the general path, with the same result
+        data[np.int64(0), 0, 1] = 5
+        self.assertEqual(data.modified_range, (1, 44))
+        self.assertEqual(data[0, 0, 1], 5)
+
+        # as do indices outside the array
+        for indices in ((-1, 0, 0), (1, 4, 0)):
+            with self.assertRaises(ValueError):
+                data[indices] = 6
+        self.assertEqual(data.modified_range, (1, 44))
+
+        # new data with a new shape
+        data.shape = (4,)
+        data.ndarray = np.zeros(4)
+        data.init_data()
+        data.modified_range = None
+        data[3] = 7
+        self.assertEqual(data.modified_range, (3, 3))
+        self.assertEqual(data.tolist(), [0, 0, 0, 7])
+
+    def test_get_apply_changes(self):
+        source = DataArray(preset_data=np.arange(12.).reshape(3, 4))
+        source.mark_saved(4)
+        self.assertEqual(source.get_changes(11), None)
+
+        changes = source.get_changes(1)
+        self.assertEqual(changes['start'], 2)
+        self.assertEqual(changes['stop'], 11)
+        self.assertEqual(changes['vals'].tolist(), list(range(2, 12)))
+
+        # a modified range beyond last_saved_index counts too
+        source.modified_range = None
+        self.assertEqual(source.get_changes(3)['stop'], 4)
+        source[2, 1] = 20
+        changes = source.get_changes(3)
+        self.assertEqual(changes['stop'], 9)
+
+        dest = DataArray(shape=(3, 4))
+        dest.init_data()
+        dest.apply_changes(**changes)
+        self.assertEqual(dest.synced_index, 9)
+        self.assertEqual(
+            repr(dest.ndarray[1:].tolist()),
+            repr([[4., 5., 6., 7.], [8., 20., float('nan'), float('nan')]]))
+
+        # flat assignment also works for arrays that aren't contiguous
+        dest.ndarray = np.zeros((4, 3)).T
+        dest.apply_changes(start=1, stop=2, vals=[1, 2])
+        self.assertEqual(dest.ndarray[0].tolist(), [0, 1, 2, 0])
+
     def test_repr(self):
         array2d = [[1, 2], [3, 4]]
         arrayrepr = repr(np.array(array2d))
@@ -339,6 +405,14 @@ class TestLoadData(TestCase):
         self.assertEqual(data.has_read_data, True)
         self.assertEqual(data.has_read_metadata, True)
 
+    def test_lazy_not_supported(self):
+        dm = MockDataManager()
+        dm.location = 'somewhere else'
+
+        with self.assertRaises(ValueError):
+            load_data(formatter=MockFormatter(), data_manager=dm,
+                      location='here!', lazy=True)
+
 
 class TestDataSetMetaData(TestCase):
 
@@ -518,6 +592,62 @@ class TestDataSet(TestCase):
         with self.assertRaises(ValueError):
             data.add_array(MockArray())
 
+    @patch('qcodes.data.data_set.get_data_manager')
+    def test_push_store_batch(self, gdm_mock):
+        mock_dm = MockDataManager()
+        gdm_mock.return_value = mock_dm
+
+        data = DataSet(location=False, data_manager=True,
+                       mode=DataMode.PUSH_TO_SERVER)
+        data.push_batch_size = 3
+        data.push_batch_period = 1000
+
+        for i in range(4):
+            data.store((i,), {'y': i})
+        self.assertEqual(mock_dm.messages, [
+            ('store_batch', [((0,), {'y': 0}), ((1,), {'y': 1}),
+                             ((2,), {'y': 2})])
+        ])
+
+        # after push_batch_period, the next store sends everything
+        data.push_batch_period = 0
+        data.store((4,), {'y': 4})
+        self.assertEqual(mock_dm.messages[1:], [
+            ('store_batch', [((3,), {'y': 3}), ((4,), {'y': 4})])
+        ])
+
+        # before a wait, they're sent if they'd be too old by its end
+        data.push_batch_period = 10
+        data.store((5,), {'y': 5})
+        data.push_store_batch(due_in=1)
+        self.assertEqual(len(mock_dm.messages), 2)
+        data.push_store_batch(due_in=100)
+        self.assertEqual(mock_dm.messages[2:], [
+            ('store_batch', [((5,), {'y': 5})])
+        ])
+
+        # and finalize sends the rest first
+        data.push_batch_period = 1000
+        data.store((6,), {'y': 6})
+        self.assertEqual(len(mock_dm.messages), 3)
+        data.finalize()
+        self.assertEqual(mock_dm.messages[3:], [
+            ('store_batch', [((6,), {'y': 6})]),
+            ('finalize_data',)
+        ])
+
+    def test_server_store_batch(self):
+        data = new_data(arrays=(DataArray(name='y', shape=(3,)),),
+                        location=False)
+        data.y.init_data()
+        server = Mock()
+        server._data = data
+
+        DataServer.handle_store_batch(server, [((0,), {'y': 5}),
+                                               ((2,), {'y': 7})])
+        self.assertEqual(repr(data.y.tolist()),
+                         repr([5., float('nan'), 7.]))
+
     def test_write_copy(self):
         data = DataSet1D(location=False)
         mockbase = os.path.abspath('some_folder')
@@ -580,6 +710,75 @@ class TestDataSet(TestCase):
         self.assertEqual(data.formatter.write_metadata_calls,
                          [(mockbase2, 'yet/another/path', False)])
 
+    def test_write_in_background(self):
+        formatter = ThreadedMockFormatter()
+        x = DataArray(name='x', preset_data=(1., 2., 3., 4.),
+                      is_setpoint=True)
+        y = DataArray(name='y', set_arrays=(x,), shape=(4,))
+        data = new_data(arrays=(x, y), location='in_the_background',
+                        formatter=formatter, write_period=0,
+                        write_in_background=True)
+        nan = float('nan')
+
+        # the writer is busy, but store doesn't wait for it
+        formatter.gate.clear()
+        data.store((0,), {'y': 5})
+        self.assertIsNone(y.modified_range)
+        self.assertEqual(y.last_saved_index, 0)
+        formatter.writing.wait(1)
+        data.store((1,), {'y': 6})
+        y[0] = 99
+        data.store((2,), {'y': 7})
+        self.assertEqual(formatter.writes, [])
+
+        formatter.gate.set()
+        data.write()
+        first, second = formatter.writes
+        self.assertIsNot(first['thread'], threading.current_thread())
+        self.assertEqual(first['arrays']['x_set'], ((0, 3), [1, 2, 3, 4]))
+        # what gets written is copied when it's stored
+        self.assertEqual(repr(first['arrays']['y']),
+                         repr(((0, 0), [5., nan, nan, nan])))
+        # and changes that pile up are written together
+        self.assertEqual(second['arrays']['x_set'], (None, [1, 2, 3, 4]))
+        self.assertEqual(repr(second['arrays']['y']),
+                         repr(((0, 2), [99., 6., 7., nan])))
+
+        # errors in the writer come back to us
+        formatter.fail = True
+        data.store((3,), {'y': 8})
+        with self.assertRaises(RuntimeError):
+            data.write()
+
+        # and the data is written once the problem is fixed
+        formatter.fail = False
+        writer = data._writer
+        data.finalize()
+        self.assertEqual(formatter.writes[-1]['arrays']['y'],
+                         ((3, 3), [99, 6, 7, 8]))
+        self.assertFalse(writer.is_alive())
+        self.assertIsNone(data._writer)
+        self.assertTrue(formatter.closed)
+
+    def test_finalize_write_error(self):
+        formatter = ThreadedMockFormatter()
+        x = DataArray(name='x', preset_data=(1., 2.), is_setpoint=True)
+        y = DataArray(name='y', set_arrays=(x,), shape=(2,))
+        data = new_data(arrays=(x, y), location='in_the_background',
+                        formatter=formatter, write_period=0,
+                        write_in_background=True)
+
+        formatter.fail = True
+        data.store((0,), {'y': 5})
+        writer = data._writer
+        with self.assertRaises(RuntimeError):
+            data.finalize()
+
+        # the writer is still stopped and the file closed
+        self.assertFalse(writer.is_alive())
+        self.assertIsNone(data._writer)
+        self.assertTrue(formatter.closed)
+
     def test_pickle_dataset(self):
         # Test pickling of DataSet object
         # If the data_manager is set to None, then the object should pickle.
@@ -1,5 +1,6 @@
 from unittest import TestCase
 import os
+import numpy as np
 
 from qcodes.data.format import Formatter
 from qcodes.data.gnuplot_format import GNUPlotFormat
@@ -356,6 +357,95 @@ class TestGNUPlotFormat(TestCase):
             self.assertEqual(f.read(), starred_file)
         self.assertEqual(self.stars_before_write, 1)
 
+    def test_chunked_write_3d(self):
+        location = self.locations[0]
+        x = DataArray(name='x', label='X', preset_data=(1., 2.),
+                      is_setpoint=True)
+        y = DataArray(name='y', label='Y', preset_data=((3., 4.), (3., 4.)),
+                      set_arrays=(x,), is_setpoint=True)
+        z = DataArray(name='z', label='Z', set_arrays=(x, y),
+                      preset_data=[[[5., 6.], [5., 6.]]] * 2,
+                      is_setpoint=True)
+        v = DataArray(name='v', label='V', set_arrays=(x, y, z),
+                      preset_data=np.arange(8.).reshape(2, 2, 2))
+        data = new_data(arrays=(x, y, z, v), location=location)
+
+        expected = '\n'.join([
+            '# x_set\ty_set\tz_set\tv',
+            '# "X"\t"Y"\t"Z"\t"V"',
+            '# 2\t2\t2',
+            '1\t3\t5\t0', '1\t3\t6\t1', '',
+            '1\t4\t5\t2', '1\t4\t6\t3', '', '',
+            '2\t3\t5\t4', '2\t3\t6\t5', '',
+            '2\t4\t5\t6', '2\t4\t6\t7', ''])
+
+        # block boundaries that do and don't line up with the loops
+        for chunk_size in (1, 3, 4, 100):
+            formatter = GNUPlotFormat(write_chunk_size=chunk_size)
+            for array in data.arrays.values():
+                array.clear_save()
+            formatter.write(data, data.io, data.location)
+
+            with open(location + '/x_set_y_set_z_set.dat', 'r') as f:
+                self.assertEqual(f.read(), expected, chunk_size)
+
+        # incremental append starting in the middle of a loop
+        for array in (z, v):
+            array.mark_saved(4)
+        z[1, 0, 1] = 6
+        z[1, 1] = (5, 6)
+        v[1, 0, 1] = 5
+        v[1, 1] = (6, 7)
+        formatter = GNUPlotFormat(write_chunk_size=2)
+        with open(location + '/x_set_y_set_z_set.dat', 'w') as f:
+            f.write(expected[:expected.index('2\t3\t6')] + '*')
+        formatter.write(data, data.io, data.location)
+        expected = expected.replace('2\t3\t6', '*2\t3\t6')
+
+        with open(location + '/x_set_y_set_z_set.dat', 'r') as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_read_partial_file(self):
+        location = self.locations[1]
+        filexy = files_combined()[1]
+        # the writer stopped partway through a row
+        partial = filexy[:filexy.index('17\t23') + len('17\t23')]
+        os.makedirs(location, exist_ok=True)
+        with open(location + '/x_set_y_set.dat', 'w') as f:
+            f.write(partial)
+
+        nan = float('nan')
+        for chunk_size in (1, 2, 5, 1000):
+            data = DataSet(location=location)
+            GNUPlotFormat(read_chunk_size=chunk_size).read(data)
+
+            self.assertEqual(repr(data.x_set.tolist()), repr([16., 17.]))
+            self.assertEqual(repr(data.y_set.tolist()),
+                             repr([[22., 23., 24.], [22., 23., nan]]))
+            self.assertEqual(repr(data.z1.tolist()),
+                             repr([[25., 26., 27.], [28., nan, nan]]))
+            self.assertEqual(repr(data.z2.tolist()),
+                             repr([[31., 32., 33.], [34., nan, nan]]))
+            for array in (data.y_set, data.z1, data.z2):
+                self.assertEqual(array.last_saved_index, 4)
+                self.assertIsNone(array.modified_range)
+
+    def test_read_inconsistent_setpoints(self):
+        location = self.locations[1]
+        filexy = files_combined()[1].replace('17\t23\t29', '18\t23\t29')
+        os.makedirs(location, exist_ok=True)
+        with open(location + '/x_set_y_set.dat', 'w') as f:
+            f.write(filexy)
+
+        for chunk_size in (1, 4, 1000):
+            data = DataSet(location=location)
+            with LogCapture() as logs:
+                GNUPlotFormat(read_chunk_size=chunk_size).read(data)
+
+            self.assertIn('inconsistent setpoint values', logs.value)
+            # points before the bad one were read
+            self.assertEqual(data.z1[1, 0], 28)
+
     def test_constructor_errors(self):
         with self.assertRaises(AttributeError):
             # extension must be a string
@@ -372,6 +462,12 @@ class TestGNUPlotFormat(TestCase):
         with self.assertRaises(ValueError):
             GNUPlotFormat(comment='  \r\n\t  ')
 
+        with self.assertRaises(ValueError):
+            GNUPlotFormat(write_chunk_size=0)
+
+        with self.assertRaises(ValueError):
+            GNUPlotFormat(read_chunk_size=0)
+
     def test_read_errors(self):
         formatter = GNUPlotFormat()
 
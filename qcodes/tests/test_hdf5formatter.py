@@ -7,7 +7,8 @@ from shutil import copy
 from qcodes.station import Station
 from qcodes.loops import Loop
 from qcodes.data.location import FormatLocation
-from qcodes.data.hdf5_format import HDF5Format, str_to_bool
+from qcodes.data.hdf5_format import (HDF5Format, LazyHDF5Array, ChunkCache,
+                                     str_to_bool)
 
 from qcodes.data.data_set import new_data, load_data, DataSet
 from qcodes.data.data_array import DataArray
@@ -273,6 +274,171 @@ class TestHDF5_Format(TestCase):
         # to not be equal
         np.testing.assert_array_equal(data2.arrays['arr'], data1.arrays['arr'])
 
+    def test_nd_datasets(self):
+        data = DataSet2D(location=self.loc_provider, name='test_nd')
+        formatter = HDF5Format(compression='gzip', compression_opts=4,
+                               chunk_size=4)
+        formatter.write(data)
+
+        arr_group = data._h5_base_group['Data Arrays']
+        z = arr_group['z']
+        self.assertEqual(z.shape, (6, 4))
+        # whole inner loops, even if that's more than chunk_size
+        self.assertEqual(z.chunks, (1, 4))
+        self.assertEqual(z.compression, 'gzip')
+        self.assertEqual(z.compression_opts, 4)
+        self.assertEqual(arr_group['x_set'].shape, (6,))
+        self.assertEqual(arr_group['x_set'].chunks, (4,))
+
+        data2 = DataSet(location=data.location, formatter=formatter)
+        data2.read()
+        self.checkArraysEqual(data2.z, data.z)
+        formatter.close_file(data)
+        formatter.close_file(data2)
+
+    def test_incremental_write_2D(self):
+        data = DataSet2D(location=self.loc_provider, name='test_slabs')
+        data_copy = DataSet2D(False)
+        for array in data.arrays.values():
+            # the mock data are ints, which can't be NaN
+            array.ndarray = np.full(array.shape, np.nan)
+            array.modified_range = None
+
+        dset = None
+        for i, j in ((0, 0), (0, 1), (0, 3), (2, 2), (4, 1), (5, 3)):
+            data.x_set[i] = data_copy.x_set[i]
+            data.y_set[i, j] = data_copy.y_set[i, j]
+            data.z[i, j] = data_copy.z[i, j]
+            self.formatter.write(data)
+            if dset is None:
+                dset = data._h5_base_group['Data Arrays']['z']
+                self.assertEqual(dset.shape, (6, 4))
+            self.assertIsNone(data.z.modified_range)
+            self.assertEqual(data.z.last_saved_index, i * 4 + j)
+            # points we skipped stay NaN
+            np.testing.assert_array_equal(dset[...], data.z.ndarray)
+
+        # and point (1, 0), which we never stored, reads back as NaN
+        data2 = DataSet(location=data.location, formatter=self.formatter)
+        data2.read()
+        self.assertTrue(np.isnan(data2.z[1, 0]))
+        self.assertEqual(data2.z[5, 3], data_copy.z[5, 3])
+        self.formatter.close_file(data)
+        self.formatter.close_file(data2)
+
+    def test_read_old_format(self):
+        # older versions stored every array as an (N, 1) column that
+        # grew with the data, so partial files are shorter than the array
+        data = DataSet2D(location=self.loc_provider, name='test_old')
+        filepath = self.formatter._filepath_from_location(data.location,
+                                                          data.io)
+        os.makedirs(os.path.dirname(filepath))
+        with h5py.File(filepath, 'w') as f:
+            arr_group = f.create_group('Data Arrays')
+            for array in data.arrays.values():
+                n = 4 if array.array_id == 'z' else array.size
+                dset = arr_group.create_dataset(
+                    array.array_id, data=array.ndarray.reshape(-1, 1)[:n],
+                    maxshape=(None, 1))
+                dset.attrs['shape'] = array.shape
+                dset.attrs['label'] = array.label.encode('utf-8')
+                dset.attrs['name'] = array.name.encode('utf-8')
+                dset.attrs['unit'] = b''
+                dset.attrs['is_setpoint'] = str(array.is_setpoint).encode()
+                set_arrays = [sa.array_id.encode('utf-8')
+                              for sa in array.set_arrays]
+                dset.attrs['set_arrays'] = set_arrays
+
+        data2 = DataSet(location=data.location, formatter=self.formatter)
+        data2.read()
+        self.checkArraysEqual(data2.x_set, data.x_set)
+        self.checkArraysEqual(data2.y_set, data.y_set)
+        self.assertEqual(data2.z.shape, (6, 4))
+        np.testing.assert_array_equal(data2.z.ndarray.ravel()[:4],
+                                      data.z.ndarray.ravel()[:4])
+        self.assertTrue(np.isnan(data2.z.ndarray.ravel()[4:]).all())
+        self.formatter.close_file(data2)
+
+    def test_lazy_read(self):
+        data = DataSet2D(location=self.loc_provider, name='test_lazy')
+        self.formatter.write(data)
+        self.formatter.close_file(data)
+
+        data2 = load_data(location=data.location, formatter=self.formatter,
+                          lazy=True)
+        for array_id, array in data.arrays.items():
+            array2 = data2.arrays[array_id]
+            self.assertIsInstance(array2.ndarray, LazyHDF5Array)
+            self.assertEqual(array2.shape, array.shape)
+            self.assertIsNone(array2.modified_range)
+            self.assertEqual(array2.last_saved_index, array.size - 1)
+            np.testing.assert_array_equal(np.asarray(array2), array)
+        self.assertEqual(data2.z.set_arrays, (data2.x_set, data2.y_set))
+        self.assertEqual(data2.z.label, 'Z')
+
+        # basic indexing only reads what it needs
+        z = data.z.ndarray
+        for key in (2, -1, (3, 1), (slice(1, 4), 2), slice(None, None, -2),
+                    (Ellipsis, 0), (slice(4, 2),), ([1, 3], slice(0, 2))):
+            np.testing.assert_array_equal(data2.z[key], z[key])
+        self.assertEqual(len(data2.z), 6)
+        self.assertEqual(data2.z.max(), z.max())
+        self.assertEqual(data2.z.tolist(), z.tolist())
+
+        # and it's read-only until loaded
+        with self.assertRaises(TypeError):
+            data2.z.ndarray[0, 0] = 5
+        data2.z.load()
+        self.assertIsInstance(data2.z.ndarray, np.ndarray)
+        data2.z[0, 0] = 5
+        self.assertEqual(data2.z[0, 0], 5)
+        self.formatter.close_file(data2)
+
+    def test_lazy_cache(self):
+        data = DataSet2D(location=self.loc_provider, name='test_lazy_cache')
+        self.formatter.write(data)
+        self.formatter.close_file(data)
+
+        # room for two rows of z
+        formatter = HDF5Format(cache_size=64)
+        data2 = load_data(location=data.location, formatter=formatter,
+                          lazy=True)
+        z = data2.z.ndarray
+        z.block_rows = 1
+
+        reads = []
+        z.dset = _CountReads(z.dset, reads)
+
+        self.assertEqual(z[1, 2], data.z[1, 2])
+        self.assertEqual(z[1, 3], data.z[1, 3])
+        self.assertEqual(len(reads), 1)
+        self.assertEqual(formatter.cache.nbytes, 32)
+
+        np.testing.assert_array_equal(z[2:4], data.z[2:4])
+        self.assertEqual(len(reads), 3)
+        self.assertEqual(formatter.cache.nbytes, 64)
+
+        # row 1 got pushed out, row 3 is still there
+        z[3]
+        self.assertEqual(len(reads), 3)
+        z[1]
+        self.assertEqual(len(reads), 4)
+        self.assertEqual(formatter.cache.nbytes, 64)
+        formatter.close_file(data2)
+
+    def test_chunk_cache(self):
+        cache = ChunkCache(100)
+        big = cache.get('big', lambda: np.zeros(20))
+        self.assertEqual(big.size, 20)
+        # too big to keep
+        self.assertEqual(cache.nbytes, 0)
+
+        a = cache.get('a', lambda: np.zeros(5))
+        self.assertIs(cache.get('a', lambda: None), a)
+        cache.clear()
+        self.assertEqual(cache.nbytes, 0)
+        self.assertIsNot(cache.get('a', lambda: np.zeros(5)), a)
+
     def test_read_writing_dicts_withlists_to_hdf5(self):
         some_dict = {}
         some_dict['list_of_ints'] = list(np.arange(5))
@@ -337,3 +503,14 @@ class TestHDF5_Format(TestCase):
         data = DataSet2D(location=self.loc_provider, name='MetaDataTest')
         data.metadata = {'a': ['hi', 'there']}
         self.formatter.write(data, write_metadata=True)
+
+
+class _CountReads:
+    """Wrap an h5py dataset to record reads from it."""
+    def __init__(self, dset, reads):
+        self._dset = dset
+        self._reads = reads
+
+    def __getitem__(self, key):
+        self._reads.append(key)
+        return self._dset[key]
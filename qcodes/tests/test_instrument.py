@@ -9,6 +9,7 @@ from qcodes.instrument.base import Instrument
 from qcodes.instrument.mock import MockInstrument
 from qcodes.instrument.parameter import ManualParameter
 from qcodes.instrument.server import get_instrument_server_manager
+from qcodes.loops import Loop
 
 from qcodes.utils.validators import Numbers, Ints, Strings, MultiType, Enum
 from qcodes.utils.command import NoCommandError
@@ -871,6 +872,148 @@ class TestInstrument(TestCase):
         gates.reset2()
         self.assertEqual(gates.chan1(), 0)
 
+    def test_ask_many(self):
+        gates = self.gates
+        gates.chan0(1)
+        gates.chan1(2)
+        self.assertEqual(gates._ask_server_many([('get', ('chan0',)),
+                                                 ('get', ('chan1',)),
+                                                 ('set', ('chan2', 3))]),
+                         [1, 2, None])
+        self.assertEqual(gates.chan2(), 3)
+
+        # every query runs, then the first error is raised
+        with self.assertRaises(KeyError):
+            gates._ask_server_many([('set', ('chan0', 4)),
+                                    ('get', ('Carmen Sandiego',)),
+                                    ('set', ('chan1', 5))])
+        self.assertEqual((gates.chan0(), gates.chan1()), (4, 5))
+
+    def test_requests(self):
+        gates = self.gates
+        gates.chan0(1)
+        requests = [gates._request_server('get', 'chan0'),
+                    gates._request_server('set', 'chan1', 5),
+                    gates._request_server('get', 'chan1')]
+
+        # other queries still work while these are outstanding
+        self.assertEqual(gates.chan0(), 1)
+
+        # and the responses can be collected in any order
+        self.assertEqual(requests[2].result(), 5)
+        self.assertEqual(requests[0].result(), 1)
+        self.assertIsNone(requests[1].result())
+        self.assertEqual(requests[2].result(), 5)
+
+        bad = gates._request_server('get', 'Carmen Sandiego')
+        for i in range(2):
+            with self.assertRaises(KeyError):
+                bad.result()
+        self.assertEqual(gates._manager._requests, {})
+
+    def test_latest_cache(self):
+        gates = self.gates
+        manager = gates._manager
+        asks = []
+        ask = manager.ask
+
+        def record_ask(*args, **kwargs):
+            asks.append(args)
+            return ask(*args, **kwargs)
+
+        def set_elsewhere(name, value):
+            # as another process using the same instrument would
+            ask('cmd', gates._id, 'set', name, value)
+
+        manager.ask = record_ask
+        try:
+            # by default we always ask the server, as others may change it
+            gates.chan0(1)
+            set_elsewhere('chan0', 5)
+            self.assertEqual(gates.chan0.get_latest(), 5)
+            self.assertEqual(gates.chan0.snapshot()['value'], 5)
+
+            gates.chan0.max_val_age = 10
+            gates.chan0(2)
+            self.assertEqual(gates.chan0.snapshot()['value'], 2)
+            n = len(asks)
+
+            # after a get or set, the latest value and snapshot are local
+            gates.chan0(3)
+            self.assertEqual(gates.chan0.get_latest(), 3)
+            snap = gates.chan0.snapshot()
+            self.assertEqual(snap['value'], 3)
+            self.assertEqual(snap['instrument_name'], 'gates')
+            self.assertEqual(len(asks), n + 1)
+
+            # but not if they're older than max_val_age
+            gates.chan0.max_val_age = 0
+            self.assertEqual(gates.chan0.get_latest(), 3)
+            self.assertEqual(len(asks), n + 2)
+            gates.chan0.max_val_age = 10
+
+            # or after calling a function, it could change anything
+            gates.chan0.get_latest()
+            gates.reset()
+            n = len(asks)
+            gates.chan0.get_latest()
+            self.assertEqual(len(asks), n + 1)
+
+        finally:
+            del manager.ask
+            del gates.chan0.max_val_age
+
+        # an instrument snapshot gets them all at once
+        source = self.source
+        source.amplitude(0.5)
+        snap = source.snapshot(update=True)
+        source._manager.ask = None
+        try:
+            with self.assertRaises(TypeError):
+                # but by default, isn't used for the next snapshot
+                source.snapshot()
+            source.amplitude.max_val_age = 10
+            self.assertEqual(source.amplitude.snapshot(),
+                             snap['parameters']['amplitude'])
+            self.assertEqual(source.amplitude.get_latest(), 0.5)
+
+            # if every parameter allows it, the instrument snapshot is local
+            for parameter in source.parameters.values():
+                parameter.max_val_age = 10
+            self.assertEqual(source.snapshot(), snap)
+        finally:
+            del source._manager.ask
+            for parameter in source.parameters.values():
+                del parameter.max_val_age
+
+        # with the default max_val_age, changes elsewhere are seen
+        source._manager.ask('cmd', source._id, 'set', 'amplitude', 0.3)
+        self.assertEqual(source.snapshot()['parameters']['amplitude']['value'],
+                         0.3)
+
+    def test_loop_batches_gets(self):
+        gates = self.gates
+        batches = []
+        ask_many = gates._ask_server_many
+
+        def record_batch(queries):
+            if queries[0][0] == 'get':
+                batches.append(len(queries))
+            return ask_many(queries)
+
+        gates._ask_server_many = record_batch
+        try:
+            gates.chan1(5)
+            data = Loop(gates.chan0[1:4:1]).each(
+                gates.chan0, gates.chan1, self.meter.amplitude).run_temp()
+        finally:
+            del gates._ask_server_many
+
+        self.assertEqual(data.gates_chan0.tolist(), [1, 2, 3])
+        self.assertEqual(data.gates_chan1.tolist(), [5, 5, 5])
+        # chan0 and chan1 in one round trip at each point
+        self.assertEqual(batches, [2, 2, 2])
+
 
 class TestLocalMock(TestCase):
 
@@ -991,3 +1134,119 @@ class TestInstrument2(TestCase):
 
         # make sure the gate is removed
         self.assertEqual(hasattr(instrument, 'dac1'), False)
+
+
+class Recorder(Instrument):
+    """An instrument that records what it's sent and answers from a list."""
+    def __init__(self, name, responses=(), **kwargs):
+        super().__init__(name, **kwargs)
+        self.sent = []
+        self.responses = list(responses)
+
+        self.add_parameter('volt', get_cmd='VOLT?', get_parser=float,
+                           set_cmd='VOLT {}')
+        self.add_parameter('output', get_cmd='OUTP?', set_cmd='OUTP {}',
+                           val_mapping={'off': 0, 'on': 1})
+        self.add_parameter('count', get_cmd=self._count)
+
+    def write_raw(self, cmd):
+        self.sent.append(cmd)
+
+    def ask_raw(self, cmd):
+        self.sent.append(cmd)
+        return self.responses.pop(0)
+
+    def _count(self):
+        return len(self.sent)
+
+
+class SCPIRecorder(Recorder):
+    command_separator = ';'
+
+
+class TestBatch(TestCase):
+    def make(self, instrument_class, responses=()):
+        instrument = instrument_class('batch_recorder', responses=responses,
+                                      server_name=None)
+        self.addCleanup(instrument.close)
+        return instrument
+
+    def test_batch(self):
+        inst = self.make(SCPIRecorder, ['1.5;1;2'])
+        with inst.batch() as batch:
+            inst.volt.set(1)
+            inst.output.set('on')
+            volt = batch.get(inst.volt)
+            output = batch.get(inst.output)
+            # nested blocks join the outer batch
+            with inst.batch() as inner:
+                self.assertIs(inner, batch)
+                raw = batch.ask('IDN?', parser=int)
+            self.assertEqual(inst.sent, [])
+            with self.assertRaises(RuntimeError):
+                volt.get()
+
+        self.assertEqual(inst.sent, ['VOLT 1;OUTP 1;VOLT?;OUTP?;IDN?'])
+        self.assertEqual(volt.get(), 1.5)
+        self.assertEqual(output.get(), 'on')
+        self.assertEqual(raw.get(), 2)
+        # the values are saved like any get
+        self.assertEqual(inst.volt.get_latest(), 1.5)
+        self.assertEqual(inst.output.get_latest(), 'on')
+
+        # with no queries it's just one write
+        with inst.batch():
+            inst.volt.set(2)
+            inst.volt.set(3)
+        self.assertEqual(inst.sent[-1], 'VOLT 2;VOLT 3')
+
+        # and outside a batch nothing changes
+        inst.volt.set(4)
+        self.assertEqual(inst.sent[-1], 'VOLT 4')
+
+    def test_order_kept(self):
+        inst = self.make(SCPIRecorder, ['1.5', '7'])
+        with inst.batch() as batch:
+            inst.volt.set(1)
+            volt = batch.get(inst.volt)
+            # a getter that isn't a query string sends the batch first
+            count = batch.get(inst.count)
+            self.assertEqual(volt.get(), 1.5)
+            self.assertEqual(count.get(), 1)
+            # as does a plain ask
+            self.assertEqual(inst.ask('IDN?'), '7')
+        self.assertEqual(inst.sent, ['VOLT 1;VOLT?', 'IDN?'])
+
+    def test_errors(self):
+        inst = self.make(SCPIRecorder, ['1.5'])
+        with self.assertRaises(ValueError):
+            with inst.batch() as batch:
+                batch.get(inst.volt)
+                batch.get(inst.output)
+
+        # a bad response still leaves the good ones
+        inst.responses = ['2.5;9']
+        with self.assertRaises(KeyError):
+            with inst.batch() as batch:
+                volt = batch.get(inst.volt)
+                batch.get(inst.output)
+        self.assertEqual(volt.get(), 2.5)
+
+        # an error in the block drops what's left
+        sent = len(inst.sent)
+        with self.assertRaises(ZeroDivisionError):
+            with inst.batch():
+                inst.volt.set(1)
+                1 / 0
+        self.assertEqual(len(inst.sent), sent)
+
+    def test_no_separator(self):
+        inst = self.make(Recorder, ['1.5', '0'])
+        with inst.batch() as batch:
+            inst.volt.set(1)
+            self.assertEqual(inst.sent, ['VOLT 1'])
+            volt = batch.get(inst.volt)
+            output = batch.get(inst.output)
+            self.assertEqual(volt.get(), 1.5)
+        self.assertEqual(output.get(), 'off')
+        self.assertEqual(inst.sent, ['VOLT 1', 'VOLT?', 'OUTP?'])
@@ -2,10 +2,11 @@ from unittest import TestCase
 import time
 import multiprocessing as mp
 
-from qcodes.instrument.server import InstrumentServer
+from qcodes.instrument.server import (InstrumentServer, InstrumentServerManager,
+                                     get_instrument_server_manager)
 from qcodes.instrument.base import Instrument
-from qcodes.process.server import (QUERY_WRITE, QUERY_ASK, RESPONSE_OK,
-                                   RESPONSE_ERROR)
+from qcodes.process.server import (QUERY_WRITE, QUERY_ASK, QUERY_REQUEST,
+                                   RESPONSE_OK, RESPONSE_ERROR)
 from qcodes.utils.helpers import LogCapture
 
 
@@ -55,6 +56,10 @@ class Holder:
     def get_extras(self):
         return self.kwargs
 
+    def wait(self, delay):
+        time.sleep(delay)
+        return delay
+
     def _get_method_attrs(self):
         return {}
 
@@ -155,3 +160,125 @@ class TestInstrumentServer(TestCase):
                 self.assertEqual(response[0], expected[0])
                 for item in expected[1]:
                     self.assertIn(item, response[1])
+
+    def test_many_and_tagged(self):
+        queries = (
+            (0.5, (QUERY_ASK, 'new_id',)),
+            (0.01, (QUERY_ASK, 'new', (Holder, 0))),
+
+            # several commands in one query
+            (0.01, (QUERY_ASK, 'many', ([
+                ('cmd', (0, 'set', 'happiness', 'a warm gun')),
+                ('cmd', (0, 'get', 'Carmen Sandiego')),
+                ('cmd', (0, 'get'), {'key': 'happiness'})],))),
+
+            # tagged requests get tagged responses
+            (0.01, (QUERY_REQUEST, 'cmd', 'tag1', (0, 'get', 'happiness'))),
+            (0.01, (QUERY_REQUEST, 'cmd', 'tag2', (0, 'get', 'nothing'))),
+            (0.01, (QUERY_REQUEST, 'no_such_handler', 'tag3')),
+
+            (0.01, (QUERY_ASK, 'delete', (0,)))
+        )
+        run_schedule(queries, self.query_queue)
+        TimedInstrumentServer(self.query_queue, self.response_queue,
+                              {'where': 'here'})
+
+        responses = get_results(self.response_queue)
+        self.assertEqual(responses[2][0], RESPONSE_OK)
+        many = responses[2][1]
+        self.assertEqual(many[0], (RESPONSE_OK, None))
+        self.assertEqual(many[1][0], RESPONSE_ERROR)
+        self.assertIn('Carmen Sandiego', many[1][1])
+        self.assertEqual(many[2], (RESPONSE_OK, 'a warm gun'))
+
+        self.assertEqual(responses[3], (RESPONSE_OK, 'a warm gun', 'tag1'))
+        self.assertEqual(responses[4][::2], (RESPONSE_ERROR, 'tag2'))
+        self.assertIn('KeyError', responses[4][1])
+        self.assertEqual(responses[5][::2], (RESPONSE_ERROR, 'tag3'))
+        self.assertIn('no_such_handler', responses[5][1])
+
+    def run_two_instruments(self, workers=1):
+        queries = (
+            (0.5, (QUERY_ASK, 'new_id',)),
+            (0.01, (QUERY_ASK, 'new', (Holder, 0))),
+            (0.01, (QUERY_ASK, 'new_id',)),
+            (0.01, (QUERY_ASK, 'new', (Holder, 1))),
+
+            # with workers, a slow command doesn't hold up another
+            # instrument...
+            (0.01, (QUERY_REQUEST, 'cmd', 'slow', (0, 'wait', 0.3))),
+            (0.01, (QUERY_REQUEST, 'cmd', 'other', (1, 'set', 'a', 1))),
+            # ...but the next one for the same instrument waits for it
+            (0.01, (QUERY_REQUEST, 'cmd', 'same', (0, 'set', 'a', 2))),
+            (0.01, (QUERY_REQUEST, 'many', 'many', ([
+                ('cmd', (1, 'get', 'a')), ('cmd', (1, 'set', 'a', 3))],))),
+
+            # and deleting waits for everything
+            (0.01, (QUERY_ASK, 'delete', (0,))),
+            (0.01, (QUERY_ASK, 'delete', (1,)))
+        )
+        run_schedule(queries, self.query_queue)
+        TimedInstrumentServer(self.query_queue, self.response_queue,
+                              {'where': 'here'}, workers=workers)
+
+        responses = get_results(self.response_queue)
+        tagged = [response for response in responses if len(response) == 3]
+        return responses, tagged
+
+    def test_parallel_instruments(self):
+        responses, tagged = self.run_two_instruments(workers=4)
+        self.assertEqual([response[2] for response in tagged],
+                         ['other', 'many', 'slow', 'same'])
+        self.assertEqual(tagged[1][1], [(RESPONSE_OK, 1), (RESPONSE_OK, None)])
+        self.assertEqual(tagged[2][:2], (RESPONSE_OK, 0.3))
+        # the deletes come last
+        self.assertEqual(responses[-2:], [(RESPONSE_OK, None)] * 2)
+
+    def test_serial_by_default(self):
+        # unless we ask for workers, everything runs in order
+        responses, tagged = self.run_two_instruments()
+        self.assertEqual([response[2] for response in tagged],
+                         ['slow', 'other', 'same', 'many'])
+        self.assertEqual(tagged[3][1], [(RESPONSE_OK, 1), (RESPONSE_OK, None)])
+        self.assertEqual(responses[-2:], [(RESPONSE_OK, None)] * 2)
+
+
+class TestServerManager(TestCase):
+    def check_workers(self, workers, slow):
+        manager = get_instrument_server_manager('WorkersTest', workers=workers)
+        try:
+            for i in range(2):
+                manager.ask('new', Holder, manager.ask('new_id'))
+
+            req = manager.request('cmd', 0, 'wait', 0.5)
+            t0 = time.perf_counter()
+            manager.ask('cmd', 1, 'set', 'a', 1)
+            dt = time.perf_counter() - t0
+            self.assertEqual(req.result(), 0.5)
+        finally:
+            manager.close()
+            InstrumentServerManager.instances.pop('WorkersTest', None)
+
+        # workers reaches the server process whatever the start method
+        if slow:
+            self.assertGreater(dt, 0.3)
+        else:
+            self.assertLess(dt, 0.3)
+
+    def test_parallel_server(self):
+        self.check_workers(4, slow=False)
+
+    def test_serial_server(self):
+        self.check_workers(None, slow=True)
+
+    def test_workers_mismatch(self):
+        manager = get_instrument_server_manager('WorkersTest', workers=2)
+        try:
+            manager.ask('new', Holder, manager.ask('new_id'))
+            self.assertIs(get_instrument_server_manager('WorkersTest'),
+                          manager)
+            with self.assertRaises(ValueError):
+                get_instrument_server_manager('WorkersTest', workers=3)
+        finally:
+            manager.close()
+            InstrumentServerManager.instances.pop('WorkersTest', None)
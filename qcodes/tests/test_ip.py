@@ -0,0 +1,181 @@
+from unittest import TestCase
+import socket
+import threading
+import time
+
+from qcodes.instrument import ip
+from qcodes.instrument.ip import IPInstrument
+
+
+class StandIn:
+    """
+    A local TCP server answering one line at a time, like an instrument.
+
+    - ``IDN?`` gets ``stand-in``
+    - ``TWO?`` gets two responses in one packet
+    - ``SLOW?`` gets its response in two pieces
+    - ``DROP`` closes the connection without a response
+    - anything else gets ``OK``
+    """
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.accepts = 0
+        self.commands = []
+        self.connections = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.accepts += 1
+            self.connections.append(conn)
+            threading.Thread(target=self._serve, args=(conn,),
+                             daemon=True).start()
+
+    def _serve(self, conn):
+        data = b''
+        while True:
+            try:
+                chunk = conn.recv(1024)
+            except OSError:
+                return
+            if not chunk:
+                return
+            data += chunk
+            while b'\n' in data:
+                line, data = data.split(b'\n', 1)
+                cmd = line.decode()
+                self.commands.append(cmd)
+                if cmd == 'DROP':
+                    conn.close()
+                    return
+                elif cmd == 'IDN?':
+                    conn.sendall(b'stand-in\n')
+                elif cmd == 'TWO?':
+                    conn.sendall(b'one\ntwo\n')
+                elif cmd == 'SLOW?':
+                    conn.sendall(b'sl')
+                    time.sleep(0.05)
+                    conn.sendall(b'ow\n')
+                else:
+                    conn.sendall(b'OK\n')
+
+    def drop_all(self):
+        for conn in self.connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+        self.connections = []
+
+    def close(self):
+        self.listener.close()
+        self.drop_all()
+
+
+class QuickRetry(IPInstrument):
+    reconnect_delay = 0.01
+
+
+class TestIPInstrument(TestCase):
+    def setUp(self):
+        self.server = StandIn()
+        self.instruments = []
+
+    def tearDown(self):
+        for instrument in self.instruments:
+            instrument.close()
+        self.server.close()
+
+    def make(self, name, instrument_class=IPInstrument, **kwargs):
+        instrument = instrument_class(name, address='127.0.0.1',
+                                      port=self.server.port, timeout=1,
+                                      server_name=None, **kwargs)
+        self.instruments.append(instrument)
+        return instrument
+
+    def test_ask_write(self):
+        instrument = self.make('ip_ask')
+        self.assertEqual(instrument.ask('IDN?'), 'stand-in\n')
+        instrument.write('SET 1')
+        self.assertEqual(self.server.commands, ['IDN?', 'SET 1'])
+        # and the write confirmation was read
+        self.assertEqual(instrument.ask('IDN?'), 'stand-in\n')
+
+    def test_buffered_recv(self):
+        instrument = self.make('ip_buffered')
+        # responses arriving together are read one at a time
+        self.assertEqual(instrument.ask('TWO?'), 'one\n')
+        self.assertEqual(instrument._recv(), 'two\n')
+        # and one arriving in pieces is read whole
+        self.assertEqual(instrument.ask('SLOW?'), 'slow\n')
+
+        # with an empty terminator, we get whatever is there
+        instrument.set_terminator('\n', read_terminator='')
+        self.assertEqual(instrument.ask('TWO?'), 'one\ntwo\n')
+
+    def test_reconnect(self):
+        instrument = self.make('ip_reconnect')
+        self.assertEqual(instrument.ask('IDN?'), 'stand-in\n')
+
+        # closed by the instrument while we wait for a response
+        with self.assertRaises(ConnectionError):
+            instrument.ask('DROP')
+        self.assertEqual(instrument.ask('IDN?'), 'stand-in\n')
+        self.assertEqual(self.server.accepts, 2)
+
+        # or while we weren't looking
+        self.server.drop_all()
+        time.sleep(0.05)
+        self.assertEqual(instrument.ask('IDN?'), 'stand-in\n')
+        self.assertEqual(self.server.accepts, 3)
+
+    def test_backoff(self):
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(('127.0.0.1', 0))
+        port = closed.getsockname()[1]
+        closed.close()
+
+        t0 = time.perf_counter()
+        with self.assertRaises(ConnectionRefusedError):
+            QuickRetry('ip_nothing', address='127.0.0.1', port=port,
+                       server_name=None)
+        # 3 tries, waiting 0.01 and 0.02 s between them
+        self.assertGreater(time.perf_counter() - t0, 0.03)
+        self.assertNotIn(('127.0.0.1', port), ip._connections)
+
+    def test_shared_connection(self):
+        first = self.make('ip_first')
+        second = self.make('ip_second')
+        self.assertEqual(first.ask('IDN?'), 'stand-in\n')
+        self.assertEqual(second.ask('IDN?'), 'stand-in\n')
+        self.assertEqual(self.server.accepts, 1)
+
+        key = ('127.0.0.1', self.server.port)
+        first.close()
+        self.assertEqual(second.ask('IDN?'), 'stand-in\n')
+        second.close()
+        self.assertNotIn(key, ip._connections)
+
+    def test_not_persistent(self):
+        instrument = self.make('ip_not_persistent', persistent=False)
+        instrument.linger = 0.1
+        for i in range(3):
+            self.assertEqual(instrument.ask('IDN?'), 'stand-in\n')
+        # calls in quick succession share a connection
+        self.assertEqual(self.server.accepts, 1)
+
+        key = ('127.0.0.1', self.server.port)
+        self.assertIn(key, ip._connections)
+        time.sleep(0.3)
+        self.assertNotIn(key, ip._connections)
+
+        self.assertEqual(instrument.ask('IDN?'), 'stand-in\n')
+        self.assertEqual(self.server.accepts, 2)
@@ -2,23 +2,28 @@ from datetime import datetime
 import logging
 import multiprocessing as mp
 import numpy as np
+import threading
 import time
 from unittest import TestCase
 from unittest.mock import patch
 
 from qcodes.loops import (Loop, MP_NAME, get_bg, halt_bg, ActiveLoop,
-                          _DebugInterrupt)
+                          _DebugInterrupt, hilbert_order)
 from qcodes.actions import Task, Wait, BreakIf
 from qcodes.station import Station
 from qcodes.data.io import DiskIO
 from qcodes.data.data_array import DataArray
 from qcodes.data.manager import get_data_manager
 from qcodes.instrument.mock import ArrayGetter
-from qcodes.instrument.parameter import Parameter, ManualParameter
+from qcodes.instrument.parameter import (Parameter, ManualParameter,
+                                         combine)
+from qcodes.instrument.sweep_values import AdaptiveSweep
 from qcodes.process.helpers import kill_processes
 from qcodes.process.qcodes_process import QcodesProcess
 from qcodes.utils.validators import Numbers
 from qcodes.utils.helpers import LogCapture
+from qcodes.utils.profiling import LoopProfiler
+from qcodes.utils.threading import instrument_lock
 
 from .instrument_mocks import (AMockModel, MockGates, MockSource, MockMeter,
                                MultiGetter)
@@ -401,13 +406,13 @@ class TestLoop(TestCase):
             Task(self.p2.set, 1),
             self.p2)
         delay_array = []
-        loop._monitor = FakeMonitor(delay_array)
+        station = Station(monitor=FakeMonitor(delay_array), default=False)
 
         # give it a "process" as if it was run in the bg before,
         # check that this gets cleared
         loop.process = 'TDD'
 
-        data = loop.run_temp()
+        data = loop.run_temp(station=station)
 
         self.assertFalse(hasattr(loop, 'process'))
 
@@ -454,6 +459,120 @@ class TestLoop(TestCase):
         self.assertGreaterEqual(delay, 0.04)
         self.assertLessEqual(delay, 0.06)
 
+    def test_combined_sweep(self):
+        sweep = combine(self.p1, self.p2, name='p1p2').sweep(
+            np.array([1, 2, 3]), np.array([4, 5, 6]))
+        data = Loop(sweep).each(self.p3, self.p2).run_temp()
+
+        self.assertEqual(data.p1p2_set.tolist(), [0, 1, 2])
+        # with two actions, the set values still go in the right arrays
+        self.assertEqual(data.p1.tolist(), [1, 2, 3])
+        self.assertEqual(data.p2_3.tolist(), [4, 5, 6])
+        self.assertEqual(data.p2_1.tolist(), [4, 5, 6])
+
+    def test_plan(self):
+        # the same inner loop in two places, entered at every outer point
+        inner = Loop(self.p2[1:3:1]).each(self.p3)
+        loop = Loop(self.p1[1:4:1]).each(inner, inner)
+
+        with patch.object(ActiveLoop, '_make_plan', autospec=True,
+                          side_effect=ActiveLoop._make_plan) as make_plan:
+            data = loop.run_temp()
+
+        # one plan for the outer loop, and one for each place of the inner
+        self.assertEqual(make_plan.call_count, 3)
+        self.assertEqual(sorted(inner._plans), [(0,), (1,)])
+
+        self.assertEqual(data.p2_set_0.tolist(), [[1, 2]] * 3)
+        self.assertEqual(data.p2_set_1.tolist(), [[1, 2]] * 3)
+        self.assertEqual(data.p3_0_0.shape, (3, 2))
+        self.assertEqual(data.p3_1_0.shape, (3, 2))
+
+        # and a new run starts over
+        loop.run_temp()
+        self.assertEqual(sorted(inner._plans), [(0,), (1,)])
+
+    @patch('qcodes.loops.ActiveLoop._check_signal')
+    def test_signal_check_period(self, check_signal):
+        loop = Loop(self.p1[-10:10:0.1]).each(self.p1)
+        loop.signal_check_period = 1000
+        loop.run_temp()
+        # with no delay, the queue isn't checked at every point
+        self.assertEqual(check_signal.call_count, 1)
+
+    def test_profile(self):
+        loop = Loop(self.p1[1:3:1], 0.001).loop(self.p2[1:4:1]).each(
+            self.p3, Wait(0.002))
+        data = loop.run_temp(profile=True)
+
+        profile = data.metadata['loop']['profile']
+        self.assertEqual(profile['points'], 2 + 6)
+        phases = profile['phases']
+        self.assertEqual(phases['set p1']['count'], 2)
+        self.assertEqual(phases['set p2']['count'], 6)
+        self.assertEqual(phases['get p3']['count'], 6)
+        # set values and measurements are stored separately
+        self.assertEqual(phases['store']['count'], 2 + 6 + 6)
+        # the outer delay goes to the first inner point, which is waited
+        # for at every point (even with no delay), as is the Wait
+        self.assertEqual(phases['delay']['count'], 6 + 6)
+        self.assertGreater(phases['delay']['total'], 0.013)
+        self.assertEqual(sorted(phases['delay']['percentiles']),
+                         ['50', '90', '99'])
+        self.assertLessEqual(profile['profiled_time'], profile['run_time'])
+        self.assertNotIn('profile_duration', data.arrays)
+
+        self.assertIn('get p3', loop.profiler.report())
+
+        # without profile, nothing is timed
+        data = loop.run_temp()
+        self.assertIsNone(loop.profiler)
+        self.assertNotIn('profile', data.metadata['loop'])
+        self.assertIsNone(data.profiler)
+
+    def test_profile_arrays(self):
+        profiler = LoopProfiler(save_arrays=True)
+        profiler.initial_size = 4
+        data = Loop(self.p1[1:6:1]).each(self.p2).run_temp(profile=profiler)
+
+        # 5 sets, 5 delays, 5 gets, 10 stores, and the first store writes
+        self.assertEqual(profiler.count, 26)
+        self.assertEqual(data.profile_event.tolist(), list(range(26)))
+        phases = [profiler.phase_names[int(code)]
+                  for code in data.profile_phase]
+        self.assertEqual(phases[:6], ['set p1', 'write', 'store', 'delay',
+                                      'get p2', 'store'])
+        self.assertEqual(phases.count('store'), 10)
+        self.assertEqual(data.profile_point.tolist()[:7],
+                         [1, 1, 1, 1, 1, 1, 2])
+        self.assertTrue((data.profile_start.ndarray >= 0).all())
+        self.assertTrue((data.profile_duration.ndarray >= 0).all())
+
+    def test_profile_exclusive(self):
+        profiler = LoopProfiler()
+        inner = profiler.timed('inner', lambda: time.sleep(0.01))
+
+        def outer():
+            inner()
+            return 'done'
+
+        self.assertEqual(profiler.timed('outer', outer)(), 'done')
+        summary = profiler.summary()['phases']
+        # time in the inner call isn't counted again in the outer one
+        self.assertGreater(summary['inner']['total'], 0.009)
+        self.assertLess(summary['outer']['total'], 0.005)
+
+    def test_profile_report(self):
+        # percentiles are reported in the order asked for
+        profiler = LoopProfiler(percentiles=(100, 0))
+        code = profiler.phase_code('get p1')
+        for duration in (0.001, 0.002, 0.004):
+            profiler.record(code, profiler.t0, duration)
+
+        header, line = profiler.report().split('\n')[:2]
+        self.assertEqual(header.split()[-2:], ['p100', 'p0'])
+        self.assertEqual(line.split()[-2:], ['4.0000', '1.0000'])
+
     def test_composite_params(self):
         # this one has names and shapes
         mg = MultiGetter(one=1, onetwo=(1, 2))
@@ -692,6 +811,7 @@ class TestLoop(TestCase):
             'loop': {
                 'background': False,
                 'use_threads': False,
+                'pipelined': False,
                 'use_data_manager': False,
                 '__class__': 'qcodes.loops.ActiveLoop',
                 'sweep_values': {
@@ -740,6 +860,324 @@ class TestLoop(TestCase):
         self.assertEqual(len(f_calls), 1)
 
 
+class SetRecorder(ManualParameter):
+    """A ManualParameter that records every value it's set to."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, vals=Numbers(), **kwargs)
+        self.sets = []
+
+    def set(self, value):
+        self.sets.append(value)
+        super().set(value)
+
+
+class TestLoopOrder(TestCase):
+    def setUp(self):
+        self.p1 = SetRecorder('p1')
+        self.p2 = SetRecorder('p2')
+        self.p3 = SetRecorder('p3')
+
+    def check_data(self, data):
+        # every point is stored in its usual place
+        self.assertEqual(data.p1_set.tolist(), [1, 2, 3])
+        self.assertEqual(data.p2_set.tolist(), [[10, 20]] * 3)
+        self.assertEqual(data.p1.tolist(), [[1, 1], [2, 2], [3, 3]])
+        self.assertEqual(data.p2.tolist(), [[10, 20]] * 3)
+
+    def test_snake(self):
+        loop = Loop(self.p1[1:4:1]).loop(self.p2[10:30:10], order='snake')
+        data = loop.each(self.p1, self.p2).run_temp()
+        self.check_data(data)
+        self.assertEqual(self.p2.sets, [10, 20, 20, 10, 10, 20])
+        self.assertEqual(data.metadata['loop']['actions'][0]['order'],
+                         'snake')
+
+        # every run starts from the beginning again
+        self.p2.sets[:] = []
+        data = loop.each(self.p1, self.p2).run_temp(pipelined=True)
+        self.check_data(data)
+        self.assertEqual(self.p2.sets, [10, 20, 20, 10, 10, 20])
+
+    def test_skip_unchanged(self):
+        loop = Loop(self.p1[1:4:1]).loop(self.p2[10:30:10], order='snake')
+        data = loop.each(self.p1, self.p2).run_temp(skip_unchanged=True)
+        self.check_data(data)
+        # no set at the turnarounds, p2 is there already
+        self.assertEqual(self.p2.sets, [10, 20, 10, 20])
+
+        # a value that's too old is set again
+        self.p2.sets[:] = []
+        self.p2.set(10)
+        time.sleep(0.02)
+        loop.each(self.p2).run_temp(skip_unchanged=0.01)
+        self.assertEqual(self.p2.sets[:3], [10, 10, 20])
+
+    def test_snake_3d(self):
+        loop = Loop(self.p1[1:3:1]).loop(
+            self.p2[1:3:1], order='snake').loop(self.p3[1:3:1], order='snake')
+        data = loop.each(self.p3).run_temp()
+        self.assertEqual(data.p3.tolist(), [[[1, 2]] * 2] * 2)
+        self.assertEqual(self.p2.sets, [1, 2, 2, 1])
+        self.assertEqual(self.p3.sets, [1, 2, 2, 1, 1, 2, 2, 1])
+
+    def test_index_order(self):
+        data = Loop(self.p1[1:4:1], order=[2, 0, 1]).each(
+            self.p1).run_temp()
+        self.assertEqual(data.p1.tolist(), [1, 2, 3])
+        self.assertEqual(self.p1.sets, [3, 1, 2])
+
+    def test_grid_order(self):
+        order = [(0, 0), (1, 0), (1, 1), (0, 1), (2, 1), (2, 0)]
+        loop = Loop(self.p1[1:4:1], order=order).loop(self.p2[10:30:10])
+        data = loop.each(self.p1, self.p2).run_temp()
+        self.check_data(data)
+        self.assertEqual(self.p1.sets, [1, 2, 1, 3])
+        self.assertEqual(self.p2.sets, [10, 10, 20, 20, 20, 10])
+
+    def test_hilbert(self):
+        for shape in [(1, 1), (2, 2), (4, 4), (3, 5), (8, 3), (7, 7)]:
+            order = hilbert_order(*shape)
+            self.assertEqual(order[0], (0, 0))
+            self.assertEqual(sorted(order), [(i, j) for i in range(shape[0])
+                                             for j in range(shape[1])])
+            steps = np.abs(np.diff(np.array(order), axis=0)).sum(axis=1)
+            self.assertLessEqual(steps.max() if len(steps) else 0, 1)
+
+        # one even and one odd size can need a single diagonal step
+        for shape in [(4, 5), (5, 4), (6, 7), (3, 8)]:
+            order = np.array(hilbert_order(*shape))
+            self.assertEqual(len(order), shape[0] * shape[1])
+            steps = np.abs(np.diff(order, axis=0))
+            self.assertEqual(steps.max(), 1)
+            self.assertLessEqual((steps.sum(axis=1) == 2).sum(), 1)
+        self.assertEqual((np.abs(np.diff(np.array(hilbert_order(4, 5)),
+                                         axis=0)).sum(axis=1) == 2).sum(), 1)
+
+        # powers of two are a true Hilbert curve
+        self.assertEqual(hilbert_order(2, 2), [(0, 0), (0, 1), (1, 1), (1, 0)])
+        self.assertTrue((np.abs(np.diff(np.array(hilbert_order(8, 8)),
+                                        axis=0)).sum(axis=1) == 1).all())
+
+        data = Loop(self.p1[1:4:1], order=hilbert_order(3, 2)).loop(
+            self.p2[10:30:10]).each(self.p1, self.p2).run_temp()
+        self.check_data(data)
+        self.assertEqual(len(self.p2.sets), 6)
+
+        with self.assertRaises(ValueError):
+            hilbert_order(3)
+
+    def test_bad_order(self):
+        with self.assertRaises(ValueError):
+            Loop(self.p1[1:3:1], order='spiral')
+        with self.assertRaises(ValueError):
+            Loop(self.p1[1:3:1], order=[])
+        with self.assertRaises(TypeError):
+            Loop(self.p1[1:3:1], order=[0, (1, 0)])
+        with self.assertRaises(IndexError):
+            Loop(self.p1[1:3:1], order=[0, 2]).each(self.p1).run_temp()
+        sweep = AdaptiveSweep((self.p1, 0, 1), max_points=5)
+        with self.assertRaises(ValueError):
+            Loop(sweep, order=[0, 1]).each(self.p2).run_temp()
+
+
+class BufferedSource(ManualParameter):
+    """A ManualParameter that can also run a hardware sweep."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sweeps = []
+        self.armed = None
+
+    def arm_sweep(self, values, delay):
+        self.armed = (list(values), delay)
+
+    def trigger_sweep(self):
+        self.sweeps.append(self.armed)
+        self.set(self.armed[0][-1])
+
+
+class BufferedMeter(Parameter):
+    """Measures twice its source, one point or one buffer at a time."""
+    def __init__(self, name, source):
+        super().__init__(name)
+        self.source = source
+        self.gets = 0
+        self.npts = None
+
+    def get(self):
+        self.gets += 1
+        return 2 * self.source.get()
+
+    def arm_buffer(self, npts):
+        self.npts = npts
+
+    def get_buffer(self):
+        values = self.source.sweeps[-1][0]
+        assert len(values) == self.npts
+        return 2 * np.array(values)
+
+
+class TestBufferedLoop(TestCase):
+    def setUp(self):
+        self.p1 = ManualParameter('p1', vals=Numbers(-10, 10))
+        self.src = BufferedSource('src', vals=Numbers(-10, 10))
+        self.meter = BufferedMeter('meter', self.src)
+
+    def test_buffered(self):
+        data = Loop(self.src[1:4:1], 0.01).each(self.meter).run_temp()
+
+        self.assertEqual(data.src_set.tolist(), [1, 2, 3])
+        self.assertEqual(data.meter.tolist(), [2, 4, 6])
+        self.assertEqual(self.src.sweeps, [([1, 2, 3], 0.01)])
+        self.assertEqual(self.meter.gets, 0)
+
+    def test_nested(self):
+        # only the inner loop is buffered
+        loop = Loop(self.p1[1:3:1]).loop(self.src[3:5:1])
+        data = loop.each(self.meter).run_temp()
+
+        self.assertEqual(data.p1_set.tolist(), [1, 2])
+        self.assertEqual(data.src_set.tolist(), [[3, 4]] * 2)
+        self.assertEqual(data.meter.tolist(), [[6, 8]] * 2)
+        self.assertEqual(len(self.src.sweeps), 2)
+        self.assertEqual(self.meter.gets, 0)
+
+    def test_nested_delay(self):
+        # the outer delay is only for the first point of each sweep
+        loop = Loop(self.p1[1:3:1], 0.05).loop(self.src[3:5:1], 0.01)
+        t0 = time.perf_counter()
+        loop.each(self.meter).run_temp()
+        self.assertEqual(self.src.sweeps, [([3, 4], 0.01)] * 2)
+        # and we wait the rest of it before each sweep starts
+        self.assertGreaterEqual(time.perf_counter() - t0, 0.08)
+
+    def test_fallback(self):
+        # p1 has no buffer, so this runs point by point
+        data = Loop(self.src[1:4:1]).each(self.meter, self.p1).run_temp()
+
+        self.assertEqual(data.meter.tolist(), [2, 4, 6])
+        self.assertEqual(self.src.sweeps, [])
+        self.assertEqual(self.meter.gets, 3)
+
+        # and so does a sweep parameter with no hardware sweep
+        data = Loop(self.p1[1:3:1]).each(self.meter).run_temp()
+        self.assertEqual(self.src.sweeps, [])
+        self.assertEqual(self.meter.gets, 5)
+
+
+class FakeInstrument:
+    name = 'fake'
+
+
+class ThreadRecorder(ManualParameter):
+    """Records which thread each set and get happens in, and any overlap."""
+    def __init__(self, name, log, instrument=None, delay=0, **kwargs):
+        super().__init__(name, **kwargs)
+        self._instrument = instrument
+        self.log = log
+        self.delay = delay
+
+    def _record(self, action):
+        busy = self.log['busy']
+        owner = id(self._instrument or self)
+        if owner in busy:
+            self.log['overlaps'] += 1
+        busy.add(owner)
+        self.log['calls'].append(
+            (action, self.name, threading.current_thread().name))
+        time.sleep(self.delay)
+        busy.discard(owner)
+
+    def set(self, value):
+        self._record('set')
+        super().set(value)
+
+    def get(self):
+        self._record('get')
+        return super().get()
+
+
+class TestPipelinedLoop(TestCase):
+    def setUp(self):
+        self.log = {'busy': set(), 'overlaps': 0, 'calls': []}
+        inst1, inst2 = FakeInstrument(), FakeInstrument()
+        self.sweep = ThreadRecorder('sweep', self.log, vals=Numbers())
+        self.a1 = ThreadRecorder('a1', self.log, inst1, 0.005,
+                                 initial_value=1)
+        self.a2 = ThreadRecorder('a2', self.log, inst1, 0.005,
+                                 initial_value=2)
+        self.b = ThreadRecorder('b', self.log, inst2, 0.005,
+                                initial_value=3)
+
+    def test_same_data(self):
+        p1 = ManualParameter('p1', vals=Numbers())
+        loop = Loop(p1[1:3:1]).loop(self.sweep[1:4:1]).each(
+            self.sweep, self.a1, BreakIf(self.sweep >= 2), self.b)
+
+        plain = loop.run_temp()
+        pipelined = loop.run_temp(pipelined=True)
+        self.assertTrue(pipelined.metadata['loop']['pipelined'])
+        for array_id in ('p1_set', 'sweep_set', 'sweep', 'fake_a1',
+                         'fake_b'):
+            self.assertEqual(repr(plain.arrays[array_id].tolist()),
+                             repr(pipelined.arrays[array_id].tolist()))
+
+    def test_threads(self):
+        main = threading.current_thread().name
+        Loop(self.sweep[1:4:1]).each(self.a1, self.a2, self.b).run_temp(
+            pipelined=True)
+
+        calls = self.log['calls']
+        # the first setpoint is set in the loop, the rest in the background
+        sets = [c for c in calls if c[0] == 'set']
+        self.assertEqual(sets[0][2], main)
+        self.assertEqual(len(sets), 3)
+        for s in sets[1:]:
+            self.assertNotEqual(s[2], main)
+
+        # one thread per instrument, and one instrument is never used by
+        # two threads at once
+        gets = [c for c in calls if c[0] == 'get']
+        self.assertEqual(len(gets), 9)
+        for i in range(0, 9, 3):
+            threads = {name: thread for _, name, thread in gets[i:i + 3]}
+            self.assertEqual(threads['a1'], threads['a2'])
+            self.assertNotEqual(threads['a1'], threads['b'])
+        self.assertEqual(self.log['overlaps'], 0)
+
+        self.assertIs(instrument_lock(self.a1), instrument_lock(self.a2))
+        self.assertIsNot(instrument_lock(self.a1), instrument_lock(self.b))
+
+    def test_thread_pool(self):
+        main = threading.current_thread().name
+        loop = Loop(self.sweep[1:11:1]).each(self.a1, self.a2, self.b)
+        loop.run_temp(use_threads=True)
+
+        # the same few threads measure every point
+        gets = [c for c in self.log['calls'] if c[0] == 'get']
+        self.assertEqual(len(gets), 30)
+        threads = {thread for _, _, thread in gets}
+        self.assertLessEqual(len(threads), 3)
+        for thread in threads:
+            self.assertNotEqual(thread, main)
+        self.assertEqual(self.log['overlaps'], 0)
+        self.assertIsNone(loop.executor)
+
+    def test_thread_pool_error(self):
+        def fail():
+            raise RuntimeError('oops')
+
+        loop = Loop(self.sweep[1:3:1]).each(
+            self.a1, self.b, Task(fail), Loop(self.sweep[1:3:1]).each(self.b))
+        with self.assertRaises(RuntimeError):
+            loop.run_temp(use_threads=True)
+
+        # the threads are shut down, and the inner loop lets go of them too
+        self.assertIsNone(loop.executor)
+        self.assertIsNone(loop.actions[3].executor)
+        self.assertEqual(len([c for c in self.log['calls'] if c[0] == 'get']),
+                         2)
+
+
 class AbortingGetter(ManualParameter):
     '''
     A manual parameter that can only be measured a couple of times
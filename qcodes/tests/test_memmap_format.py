@@ -0,0 +1,165 @@
+from unittest import TestCase
+import numpy as np
+
+from qcodes.loops import Loop
+from qcodes.data.memmap_format import MemmapFormat
+from qcodes.data.data_array import DataArray
+from qcodes.data.data_set import DataSet, new_data, load_data
+from qcodes.instrument.parameter import ManualParameter
+from .data_mocks import DataSet1D, DataSet2D
+
+
+class TestMemmapFormat(TestCase):
+    def setUp(self):
+        self.io = DataSet.default_io
+        self.formatter = MemmapFormat()
+        self.locations = ('_memmap1d_', '_memmap2d_', '_memmap_copy_')
+
+        for location in self.locations:
+            self.assertFalse(self.io.list(location))
+
+    def tearDown(self):
+        for location in self.locations:
+            self.io.remove_all(location)
+
+    def checkArraysEqual(self, a, b):
+        self.checkArrayAttrs(a, b)
+
+        self.assertEqual(len(a.set_arrays), len(b.set_arrays))
+        for sa, sb in zip(a.set_arrays, b.set_arrays):
+            self.checkArrayAttrs(sa, sb)
+
+    def checkArrayAttrs(self, a, b):
+        self.assertEqual(repr(a.tolist()), repr(b.tolist()))
+        self.assertEqual(a.label, b.label)
+        self.assertEqual(a.array_id, b.array_id)
+
+    def test_full_write_read(self):
+        for location, make_data in zip(self.locations,
+                                       (DataSet1D, DataSet2D)):
+            data = make_data(location)
+            self.formatter.write(data, data.io, data.location)
+
+            # writing to its own location puts the data in the files
+            for array in data.arrays.values():
+                self.assertIsInstance(array.ndarray, np.memmap)
+                self.assertEqual(array.last_saved_index,
+                                 array.ndarray.size - 1)
+                self.assertIsNone(array.modified_range)
+
+            data2 = DataSet(location=location, formatter=self.formatter)
+            data2.read()
+            self.assertEqual(set(data2.arrays), set(data.arrays))
+            for array_id, array in data.arrays.items():
+                array2 = data2.arrays[array_id]
+                self.checkArraysEqual(array2, array)
+                # loaded lazily, not copied into memory
+                self.assertIsInstance(array2.ndarray, np.memmap)
+                self.assertEqual(array2.last_saved_index,
+                                 array.last_saved_index)
+
+            # the files are plain npy files
+            for array_id, array in data.arrays.items():
+                saved = np.load(location + '/' + array_id + '.npy')
+                self.assertEqual(saved.tolist(), array.tolist())
+
+    def test_backed_by_files(self):
+        location = self.locations[0]
+        x = DataArray(name='x', label='X', preset_data=(1., 2., 3.),
+                      is_setpoint=True)
+        y = DataArray(name='y', label='Y', set_arrays=(x,), shape=(3,))
+        data = new_data(arrays=(x, y), location=location,
+                        formatter=self.formatter)
+
+        # arrays are created in the files from the start
+        self.assertIsInstance(x.ndarray, np.memmap)
+        self.assertIsInstance(y.ndarray, np.memmap)
+        self.assertEqual(x.tolist(), [1, 2, 3])
+        self.assertEqual(repr(y.tolist()), repr([float('nan')] * 3))
+        y_file = y.ndarray
+
+        data.store((0,), {'y': 5})
+        data.write()
+        # no copies made, the same map keeps being used
+        self.assertIs(y.ndarray, y_file)
+        self.assertEqual(y.last_saved_index, 0)
+        self.assertIsNone(y.modified_range)
+
+        data.store((1,), {'y': 6})
+        data.write()
+
+        # partially written data reads back up to where it's been saved
+        data2 = load_data(location, data_manager=False,
+                          formatter=self.formatter)
+        self.assertEqual(repr(data2.y.tolist()),
+                         repr([5., 6., float('nan')]))
+        self.assertEqual(data2.y.last_saved_index, 1)
+        self.assertEqual(data2.x_set.last_saved_index, 2)
+        self.assertEqual(data2.y.set_arrays, (data2.x_set,))
+
+        data.store((2,), {'y': 7})
+        data.finalize()
+        self.assertEqual(np.load(location + '/y.npy').tolist(), [5, 6, 7])
+
+    def test_incremental_write_loaded(self):
+        location = self.locations[0]
+        data = DataSet1D(location)
+        self.formatter.write(data, data.io, data.location)
+
+        data2 = load_data(location, data_manager=False,
+                          formatter=self.formatter)
+        data2.y[2] = 99
+
+        # in-memory changes don't reach the file until we write
+        self.assertEqual(np.load(location + '/y.npy')[2], 5)
+        self.assertEqual(data2.y.modified_range, (2, 2))
+
+        self.formatter.write(data2, data2.io, data2.location)
+        self.assertEqual(np.load(location + '/y.npy').tolist(),
+                         [3, 4, 99, 6, 7])
+        self.assertIsNone(data2.y.modified_range)
+
+    def test_write_copy(self):
+        location, copy_location = self.locations[0], self.locations[2]
+        x = DataArray(name='x', label='X', preset_data=(1., 2., 3.),
+                      is_setpoint=True)
+        y = DataArray(name='y', label='Y', set_arrays=(x,),
+                      preset_data=(4., 5., 6.))
+        data = new_data(arrays=(x, y), location=location,
+                        formatter=self.formatter)
+        files = {array_id: array.ndarray
+                 for array_id, array in data.arrays.items()}
+
+        data.write_copy(location=copy_location)
+
+        # the copy doesn't change where the data lives
+        for array_id, array in data.arrays.items():
+            self.assertIs(array.ndarray, files[array_id])
+
+        data2 = load_data(copy_location, data_manager=False,
+                          formatter=self.formatter)
+        for array_id, array in data.arrays.items():
+            self.checkArraysEqual(data2.arrays[array_id], array)
+
+    def test_loop(self):
+        location = self.locations[1]
+        x = ManualParameter('x', initial_value=0)
+        y = ManualParameter('y', initial_value=0)
+        z = ManualParameter('z', initial_value=1)
+        data = Loop(x[1:3:1]).loop(y[0:4:1]).each(z).run(
+            location=location, formatter=self.formatter,
+            background=False, data_manager=False, quiet=True)
+
+        self.assertIsInstance(data.z.ndarray, np.memmap)
+
+        data2 = load_data(location, data_manager=False,
+                          formatter=self.formatter)
+        for array_id, array in data.arrays.items():
+            self.checkArraysEqual(data2.arrays[array_id], array)
+        self.assertEqual(data2.metadata['arrays'].keys(),
+                         data.metadata['arrays'].keys())
+
+    def test_no_data(self):
+        data = DataSet(location=self.locations[0], formatter=self.formatter)
+        with self.assertRaises(IOError):
+            data.read()
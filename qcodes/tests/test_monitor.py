@@ -0,0 +1,142 @@
+import time
+from unittest import TestCase
+
+from qcodes.instrument.parameter import ManualParameter
+from qcodes.loops import Loop
+from qcodes.monitor import Monitor
+from qcodes.station import Station
+from qcodes.utils.helpers import LogCapture
+from qcodes.utils.validators import Numbers
+
+
+class SlowReader:
+    def __init__(self, duration, value=1):
+        self.duration = duration
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.duration)
+        return self.value
+
+
+class TestMonitor(TestCase):
+    def test_add(self):
+        monitor = Monitor()
+        p = ManualParameter('temperature', initial_value=4)
+        self.assertEqual(monitor.add(p), 'temperature')
+        self.assertEqual(monitor.add(lambda: 1, name='one'), 'one')
+
+        with self.assertRaises(ValueError):
+            monitor.add(p)
+        with self.assertRaises(TypeError):
+            monitor.add(5, name='five')
+
+        self.assertEqual(monitor.call(), 2)
+        self.assertEqual(monitor.latest('temperature'), 4)
+        self.assertEqual(monitor.latest('one'), 1)
+
+        monitor.remove('one')
+        self.assertEqual(monitor.call(), 1)
+        # a new task of the same name is only queued once
+        monitor.add(lambda: 2, name='one')
+        self.assertEqual(monitor.call(), 2)
+        monitor.remove('one')
+        self.assertEqual(sorted(monitor.snapshot()['tasks']),
+                         ['temperature'])
+
+    def test_period_and_priority(self):
+        monitor = Monitor()
+        order = []
+        monitor.add(lambda: order.append('low'), name='low', priority=-1)
+        monitor.add(lambda: order.append('high'), name='high', priority=1)
+        monitor.add(lambda: order.append('slow'), name='slow', period=1000)
+
+        monitor.call()
+        self.assertEqual(order, ['high', 'slow', 'low'])
+        monitor.call()
+        # slow isn't due again yet
+        self.assertEqual(order[3:], ['high', 'low'])
+
+    def test_deadline(self):
+        monitor = Monitor(margin=1)
+        fast = SlowReader(0.001)
+        slow = SlowReader(0.05)
+        monitor.add(slow, name='slow', duration=0.05, priority=1)
+        monitor.add(fast, name='fast', duration=0.001)
+
+        # the slow one doesn't fit, but the fast one does
+        t0 = time.perf_counter()
+        self.assertEqual(monitor.call(finish_by=t0 + 0.02), 1)
+        self.assertLess(time.perf_counter(), t0 + 0.02)
+        self.assertEqual((slow.calls, fast.calls), (0, 1))
+
+        # given enough time, the slow one is still waiting to run
+        monitor.call(finish_by=time.perf_counter() + 1)
+        self.assertEqual((slow.calls, fast.calls), (1, 2))
+
+        # its duration estimate comes from its runs
+        self.assertGreater(monitor.tasks['fast'].duration, 0.0009)
+        self.assertLess(monitor.tasks['fast'].duration, 0.02)
+
+    def test_history(self):
+        monitor = Monitor(history=3)
+        values = iter(range(5))
+        monitor.add(lambda: next(values), name='count')
+        times, vals = monitor.history('count')
+        self.assertEqual(len(times), 0)
+        self.assertIsNone(monitor.latest('count'))
+
+        for i in range(5):
+            monitor.call()
+        times, vals = monitor.history('count')
+        # only the last 3, oldest first
+        self.assertEqual(vals.tolist(), [2, 3, 4])
+        self.assertTrue((times[1:] >= times[:-1]).all())
+
+        # values that aren't numbers are kept too
+        monitor.add(lambda: 'persistent', name='status')
+        monitor.call()
+        self.assertEqual(monitor.latest('status'), 'persistent')
+        self.assertEqual(monitor.history('status')[1].dtype, object)
+
+        monitor.clear()
+        self.assertEqual(len(monitor.history('count')[0]), 0)
+
+    def test_failing_task(self):
+        monitor = Monitor()
+
+        def fail():
+            raise RuntimeError('no fridge')
+
+        monitor.add(fail, name='fail')
+        with LogCapture() as logs:
+            monitor.call()
+            self.assertIn('fail', monitor.tasks)
+            monitor.call()
+        # after two failures in a row it's gone
+        self.assertNotIn('fail', monitor.tasks)
+        self.assertIn('failed twice', logs.value)
+        self.assertEqual(monitor.call(), 0)
+
+    def test_loop(self):
+        monitor = Monitor()
+        reader = SlowReader(0.001, 7)
+        monitor.add(reader, name='fridge', duration=0.001)
+        p1 = ManualParameter('p1', vals=Numbers())
+        p2 = ManualParameter('p2', vals=Numbers(), initial_value=1)
+        station = Station(monitor=monitor, default=False)
+
+        loop = Loop(p1[1:4:1], 0.02).loop(p2[1:3:1], 0.01).each(p2)
+        data = loop.run_temp(station=station)
+        self.assertEqual(data.p2.tolist(), [[1, 2]] * 3)
+
+        # read during every delay, without making the loop slower
+        self.assertEqual(reader.calls, 6)
+        times, values = monitor.history('fridge')
+        self.assertEqual(values.tolist(), [7] * 6)
+
+        # without the monitor's station, it isn't called
+        loop.run_temp()
+        self.assertEqual(reader.calls, 6)
@@ -2,12 +2,13 @@
 Test suite for parameter
 """
 from collections import namedtuple
+import time
 from unittest import TestCase
 
 from qcodes import Function
 from qcodes.instrument.parameter import (
     Parameter, ArrayParameter, MultiParameter,
-    ManualParameter, StandardParameter)
+    ManualParameter, StandardParameter, combine, set_together)
 from qcodes.utils.helpers import LogCapture
 from qcodes.utils.validators import Numbers
 
@@ -633,3 +634,71 @@ class TestStandardParam(TestCase):
 
         self._p = 'PVAL: 1'
         self.assertEqual(p(), 'on')
+
+
+class TestRamps(TestCase):
+    def setUp(self):
+        self.writes = []
+
+    def ramped(self, name, step, delay):
+        def write(value):
+            self.writes.append((name, value))
+
+        p = StandardParameter(name, set_cmd=write, get_cmd=lambda: 0,
+                              vals=Numbers(), step=step, delay=delay,
+                              max_val_age=0)
+        p._save_val(0)
+        return p
+
+    def test_ramp_time(self):
+        a = self.ramped('a', 0.5, 0.01)
+        self.assertAlmostEqual(a.ramp_time(2), 4 * 0.01)
+        self.assertAlmostEqual(a.ramp_time(0.2), 0.01)
+
+        # without a step, it's just one delay
+        a.set_step(0)
+        self.assertAlmostEqual(a.ramp_time(2), 0.01)
+        b = StandardParameter('b', set_cmd=lambda v: None)
+        self.assertEqual(b.ramp_time(2), 0)
+
+    def test_set_together(self):
+        a = self.ramped('a', 1, 0.02)
+        b = self.ramped('b', 1, 0.01)
+        c = ManualParameter('c')
+
+        t0 = time.perf_counter()
+        set_together([a, b, c], [3, 4, 5])
+        # the slower ramp takes 3 steps of 0.02 s
+        self.assertGreaterEqual(time.perf_counter() - t0, 0.06)
+        self.assertEqual((a.get_latest(), b.get_latest(), c.get()),
+                         (3, 4, 5))
+
+        # together, not one after the other: the steps are interleaved in
+        # the order of their times (a at 0, 0.02, 0.04 s and b every 0.01 s)
+        self.assertEqual(self.writes, [('a', 1), ('b', 1), ('b', 2),
+                                       ('a', 2), ('b', 3), ('b', 4),
+                                       ('a', 3)])
+
+        # every value is checked before anything is set
+        self.writes[:] = []
+        with self.assertRaises(TypeError):
+            set_together([a, self.ramped('d', 1, 0)], [1, 'x'])
+        self.assertEqual(self.writes, [])
+
+        e = ManualParameter('e', vals=Numbers(), initial_value=0)
+        with self.assertRaises(TypeError):
+            set_together([e, a, b], [1, 2, 'x'])
+        with self.assertRaises(TypeError):
+            set_together([a, e], [2, 'x'])
+        self.assertEqual(e.get(), 0)
+        self.assertEqual(self.writes, [])
+
+    def test_combined(self):
+        a = self.ramped('a', 1, 0.01)
+        b = self.ramped('b', 1, 0.01)
+        sweep = combine(a, b, name='ab').sweep([2, 0], [2, 0])
+
+        # both ramp at once, so their steps alternate
+        sweep.set(0)
+        self.assertEqual(self.writes, [('a', 1), ('b', 1), ('a', 2),
+                                       ('b', 2)])
@@ -0,0 +1,157 @@
+from unittest import TestCase
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+
+from qcodes.data.data_array import DataArray
+from qcodes.data.data_set import new_data
+from qcodes.data.io import DiskIO
+from qcodes.data.shared_memory import SharedArrays
+from qcodes.loops import hilbert_order
+
+
+def make_data():
+    x = DataArray(name='x', preset_data=(1., 2., 3.), is_setpoint=True)
+    y = DataArray(name='y', set_arrays=(x,), shape=(3,))
+    return new_data(arrays=(x, y), location=False)
+
+
+def make_2d(**kwargs):
+    x = DataArray(name='x', is_setpoint=True, shape=(3,))
+    y = DataArray(name='y', is_setpoint=True, set_arrays=(x,), shape=(3, 4))
+    z = DataArray(name='z', set_arrays=(x, y), shape=(3, 4))
+    return new_data(arrays=(x, y, z), **kwargs)
+
+
+class TestSharedArrays(TestCase):
+    def setUp(self):
+        # the DataServer copy, and one each for the loop and a live plot
+        self.server = make_data()
+        self.shared = SharedArrays.create(self.server)
+
+        self.loop = make_data()
+        self.loop_shared = pickle.loads(pickle.dumps(self.shared))
+        self.loop_shared.attach(self.loop)
+
+        self.live = make_data()
+        self.live_shared = pickle.loads(pickle.dumps(self.shared))
+        self.live_shared.attach(self.live, mode='r')
+
+    def tearDown(self):
+        self.shared.remove()
+
+    def test_create(self):
+        self.assertTrue(os.path.isdir(self.shared.path))
+        self.assertEqual(self.shared.array_ids, ('x_set', 'y'))
+        for data in (self.server, self.loop, self.live):
+            self.assertIsInstance(data.y.ndarray, np.memmap)
+            self.assertEqual(data.x_set.tolist(), [1, 2, 3])
+
+        # the server copy keeps its state
+        self.assertEqual(self.server.x_set.modified_range, (0, 2))
+        self.assertEqual(self.server.y.modified_range, None)
+
+    def test_store(self):
+        self.loop_shared.store(self.loop, (0,), {'y': 5})
+        self.loop_shared.store(self.loop, (1,), {'y': 6})
+
+        # the data is everywhere already
+        for data in (self.server, self.live):
+            self.assertEqual(data.y[:2].tolist(), [5, 6])
+            self.assertEqual(data.y.modified_range, None)
+
+        self.shared.mark_modified(self.server)
+        self.assertEqual(self.server.y.modified_range, (0, 1))
+        self.server.y.mark_saved(1)
+
+        self.live_shared.mark_synced(self.live)
+        self.assertEqual(self.live.y.synced_index, 1)
+        with self.assertRaises(ValueError):
+            self.live.y[2] = 7
+
+        # only new data is marked
+        self.loop_shared.store(self.loop, (2,), {'y': 7})
+        self.shared.mark_modified(self.server)
+        self.assertEqual(self.server.y.modified_range, (2, 2))
+        self.live_shared.mark_synced(self.live)
+        self.assertEqual(self.live.y.synced_index, 2)
+
+    def test_detach(self):
+        self.loop_shared.store(self.loop, (0,), {'y': 5})
+        self.shared.detach(self.server)
+        self.shared.remove()
+        self.assertFalse(os.path.exists(self.shared.path))
+
+        self.assertNotIsInstance(self.server.y.ndarray, np.memmap)
+        self.assertEqual(self.server.y[0], 5)
+        self.server.y[1] = 6
+
+
+class TestOutOfOrder(TestCase):
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.base, ignore_errors=True)
+
+    def check_order(self, order, location):
+        # what the DataServer and a Loop (in its own process) do
+        server = make_2d(location=location, io=DiskIO(self.base))
+        server.init_on_server()
+        shared = SharedArrays.create(server)
+        loop = make_2d(location=False)
+        loop_shared = pickle.loads(pickle.dumps(shared))
+        loop_shared.attach(loop)
+
+        try:
+            for k, (i, j) in enumerate(order):
+                loop_shared.store(loop, (i,), {'x_set': i})
+                loop_shared.store(loop, (i, j), {'y_set': j, 'z': 4 * i + j})
+                # the DataServer writes now and then
+                if k % 3 == 2:
+                    shared.mark_modified(server)
+                    server.write()
+            shared.mark_modified(server)
+            server.write()
+        finally:
+            shared.detach(server)
+            shared.remove()
+
+        path = os.path.join(self.base, location, 'x_set_y_set.dat')
+        saved = np.loadtxt(path)
+        self.assertEqual(saved[:, 2].tolist(), list(range(12)))
+
+    def test_snake(self):
+        order = [(i, j if i % 2 == 0 else 3 - j)
+                 for i in range(3) for j in range(4)]
+        self.check_order(order, 'snake')
+
+    def test_hilbert(self):
+        self.check_order(hilbert_order(3, 4), 'hilbert')
+
+    def test_pending_range(self):
+        server = make_2d(location=False)
+        shared = SharedArrays.create(server)
+        self.addCleanup(shared.remove)
+        loop = make_2d(location=False)
+        loop_shared = pickle.loads(pickle.dumps(shared))
+        loop_shared.attach(loop)
+
+        loop_shared.store(loop, (1, 3), {'z': 7})
+        shared.mark_modified(server)
+        self.assertEqual(server.z.modified_range, (7, 7))
+        server.z.mark_saved(7)
+
+        # below what's saved already, and in two stores before a look
+        loop_shared.store(loop, (1, 2), {'z': 6})
+        loop_shared.store(loop, (0, 1), {'z': 1})
+        shared.mark_modified(server)
+        self.assertEqual(server.z.modified_range, (1, 6))
+
+        # nothing new, nothing marked
+        server.z.modified_range = None
+        shared.mark_modified(server)
+        self.assertIsNone(server.z.modified_range)
@@ -1,6 +1,9 @@
+import math
 from unittest import TestCase
-from qcodes.instrument.parameter import StandardParameter, ManualParameter
-from qcodes.instrument.sweep_values import SweepValues
+from qcodes.instrument.parameter import (Parameter, StandardParameter,
+                                         ManualParameter)
+from qcodes.instrument.sweep_values import SweepValues, AdaptiveSweep
+from qcodes.loops import Loop
 
 from qcodes.utils.validators import Numbers
 
@@ -157,3 +160,78 @@ class TestSweepValues(TestCase):
         self.assertEqual(repr(sv),
                          '<qcodes.instrument.sweep_values.SweepFixedValues: '
                          'c0 at {}>'.format(id(sv)))
+
+
+class Step(Parameter):
+    """A sharp step at x = 0.3, plus y if there is a y."""
+    def __init__(self, x, y=None):
+        super().__init__('step')
+        self.x, self.y = x, y
+
+    def get(self):
+        y = 0 if self.y is None else self.y.get()
+        return math.tanh((self.x.get() - 0.3) * 1000) + y
+
+
+class TestAdaptiveSweep(TestCase):
+    def setUp(self):
+        self.x = ManualParameter('x', vals=Numbers(-10, 10))
+        self.y = ManualParameter('y', vals=Numbers(-10, 10))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            AdaptiveSweep()
+        with self.assertRaises(ValueError):
+            AdaptiveSweep((self.x, 0, 1), initial_points=1)
+        with self.assertRaises(ValueError):
+            AdaptiveSweep((self.x, 0, 20))
+
+    def test_refine_step(self):
+        sweep = AdaptiveSweep((self.x, 0, 1), max_points=30)
+        data = Loop(sweep).each(Step(self.x)).run_temp()
+
+        self.assertEqual(len(data.sample_set), 30)
+        self.assertEqual(data.sample_set.tolist(), list(range(30)))
+        self.assertEqual(data.x.tolist()[:5], [0, 0.25, 0.5, 0.75, 1])
+
+        # the points crowd around the step: a grid of 30 points would be
+        # 1/29 apart
+        x = sorted(data.x.tolist())
+        closest = min(b - a for a, b in zip(x, x[1:]))
+        self.assertLess(closest, 1e-3)
+        for a, b in zip(x, x[1:]):
+            if b - a < 0.01:
+                self.assertTrue(0.25 < a < 0.35, a)
+
+    def test_tolerance(self):
+        # a flat function only needs the starting grid
+        flat = ManualParameter('flat', initial_value=1)
+        sweep = AdaptiveSweep((self.x, 0, 1), (self.y, 0, 1),
+                              max_points=100, tolerance=0.01,
+                              initial_points=3)
+        data = Loop(sweep).each(flat).run_temp()
+        self.assertEqual(len(sweep.points), 9)
+        self.assertTrue(math.isnan(data.x[9]))
+
+    def test_2d(self):
+        # measurement_index picks which measurement to follow
+        sweep = AdaptiveSweep((self.x, 0, 1), (self.y, 0, 1),
+                              max_points=60, initial_points=3,
+                              measurement_index=1)
+        step = Step(self.x, self.y)
+        data = Loop(sweep).each(self.y, step).run_temp()
+
+        points = sweep.points
+        self.assertEqual(len(points), 60)
+        self.assertEqual(data.x.tolist(), [p[0] for p in points])
+        # the measured y, then the swept y
+        self.assertEqual(data.y_0.tolist(), [p[1] for p in points])
+        self.assertEqual(data.y_3.tolist(), [p[1] for p in points])
+        # most new points are near the step, though it's only a fifth of
+        # the area
+        near = [x for x, _ in points[9:] if 0.2 < x < 0.4]
+        self.assertGreater(len(near), 0.6 * 51)
+
+        snap = sweep.snapshot()
+        self.assertEqual(snap['ranges'], [[0, 1], [0, 1]])
+        self.assertEqual(snap['max_points'], 60)
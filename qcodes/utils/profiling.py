@@ -0,0 +1,227 @@
+"""Timing of the steps of a measurement Loop, see ``ActiveLoop.run``."""
+import threading
+import time
+
+import numpy as np
+
+from qcodes.data.data_array import DataArray
+
+
+class LoopProfiler:
+    """
+    Records how long each step of a Loop takes, at every point.
+
+    Give one to ``ActiveLoop.run(profile=...)``, or use ``profile=True`` to
+    make a default one. The loop then times every set of a sweep parameter,
+    every delay, every ``get`` and every ``DataSet.store`` and ``write``.
+    Each of these is one event, kept in flat numpy arrays that grow as
+    needed:
+
+    - ``phase``: which step this was, an index into ``phase_names``. These
+      are ``'set <name>'``, ``'delay'``, ``'get <name>'``, ``'store'`` and
+      ``'write'``.
+    - ``start``: ``time.perf_counter()`` at the start of the step, in
+      seconds since the run started.
+    - ``duration``: how long the step took, in seconds. This does not
+      include the time of steps inside it, so a ``write`` triggered by
+      ``store`` is not counted twice.
+    - ``point``: the number of setpoints set so far in the run, in any
+      loop, so events with the same ``point`` belong together.
+
+    When the loop finishes, ``summary()`` goes into the DataSet metadata,
+    at ``metadata['loop']['profile']``.
+
+    Args:
+        save_arrays (bool): also add the raw events to the DataSet as
+            DataArrays ``profile_phase``, ``profile_start``,
+            ``profile_duration`` and ``profile_point``, against a setpoint
+            array ``profile_event``. Only for local DataSets, not those on
+            a DataServer. Default False.
+
+        percentiles (Sequence[float]): the percentiles of each phase's
+            durations to give in the summary. Default (50, 90, 99).
+    """
+    # events to make room for at the start, doubled whenever we run out
+    initial_size = 1024
+
+    def __init__(self, save_arrays=False, percentiles=(50, 90, 99)):
+        self.save_arrays = save_arrays
+        self.percentiles = tuple(percentiles)
+        self.phase_names = []
+        self._phase_codes = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Forget all events, to start a new run."""
+        self.phase = np.zeros(self.initial_size, dtype=np.int16)
+        self.start = np.zeros(self.initial_size)
+        self.duration = np.zeros(self.initial_size)
+        self.point = np.zeros(self.initial_size, dtype=np.int64)
+        self.count = 0
+        self.points = 0
+        self.t0 = time.perf_counter()
+        self.t_end = None
+
+    def stop(self):
+        """Mark the end of the run."""
+        self.t_end = time.perf_counter()
+
+    def phase_code(self, name):
+        """The index of phase ``name`` in ``phase_names``."""
+        code = self._phase_codes.get(name)
+        if code is None:
+            code = self._phase_codes[name] = len(self.phase_names)
+            self.phase_names.append(name)
+        return code
+
+    def timed(self, phase, func, new_point=False):
+        """
+        Wrap ``func`` so every call is recorded as an event of ``phase``.
+
+        Args:
+            phase (str): the name of this step.
+            func (callable): what to time.
+            new_point (bool): each call starts a new ``point``, as it sets
+                a new setpoint. Default False.
+
+        Returns:
+            callable: takes the same arguments, and returns the same, as
+                ``func``.
+        """
+        code = self.phase_code(phase)
+        local = self._local
+        record = self.record
+        perf_counter = time.perf_counter
+
+        def timed_func(*args, **kwargs):
+            if new_point:
+                self.points += 1
+            # time spent in timed calls inside this one
+            outer = getattr(local, 'inner', 0.0)
+            local.inner = 0.0
+            t_start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                dt = perf_counter() - t_start
+                inner = local.inner
+                local.inner = outer + dt
+                record(code, t_start, dt - inner)
+
+        return timed_func
+
+    def record(self, code, t_start, duration):
+        """Add one event, of phase ``code``, to the arrays."""
+        with self._lock:
+            i = self.count
+            if i == len(self.phase):
+                self._grow()
+            self.phase[i] = code
+            self.start[i] = t_start - self.t0
+            self.duration[i] = duration
+            self.point[i] = self.points
+            self.count = i + 1
+
+    def _grow(self):
+        size = 2 * len(self.phase)
+        for attr in ('phase', 'start', 'duration', 'point'):
+            old = getattr(self, attr)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def summary(self):
+        """
+        Statistics of each phase, for the DataSet metadata.
+
+        Returns:
+            dict: the number of ``points`` and ``events``, the ``run_time``
+                from start to stop, the ``profiled_time`` inside timed steps,
+                and under ``phases``, for each phase name: its ``count``,
+                ``total``, ``mean``, ``min`` and ``max`` duration and
+                ``percentiles``. All times are in seconds.
+        """
+        n = self.count
+        phase = self.phase[:n]
+        duration = self.duration[:n]
+        end = self.t_end if self.t_end is not None else time.perf_counter()
+
+        phases = {}
+        for code, name in enumerate(self.phase_names):
+            durations = duration[phase == code]
+            if not len(durations):
+                continue
+            phases[name] = {
+                'count': len(durations),
+                'total': float(durations.sum()),
+                'mean': float(durations.mean()),
+                'min': float(durations.min()),
+                'max': float(durations.max()),
+                'percentiles': {
+                    str(p): float(v) for p, v in zip(
+                        self.percentiles,
+                        np.percentile(durations, self.percentiles))}
+            }
+
+        return {
+            'points': self.points,
+            'events': n,
+            'run_time': end - self.t0,
+            'profiled_time': float(duration.sum()),
+            'phase_names': list(self.phase_names),
+            'phases': phases
+        }
+
+    def report(self):
+        """
+        A table of the time spent in each phase, longest total first.
+
+        Returns:
+            str: one line per phase, with its count, total, mean and
+                percentiles in ms.
+        """
+        summary = self.summary()
+        pct_names = ['p' + str(p) for p in self.percentiles]
+        lines = ['{:<30} {:>8} {:>10} {:>9} '.format(
+            'phase', 'count', 'total ms', 'mean ms') +
+            ' '.join('{:>9}'.format(p) for p in pct_names)]
+        phases = sorted(summary['phases'].items(),
+                        key=lambda item: -item[1]['total'])
+        for name, stats in phases:
+            lines.append('{:<30} {:>8} {:>10.3f} {:>9.4f} '.format(
+                name, stats['count'], 1e3 * stats['total'],
+                1e3 * stats['mean']) + ' '.join(
+                '{:>9.4f}'.format(1e3 * stats['percentiles'][str(p)])
+                for p in self.percentiles))
+        lines.append('{} points, {:.3f} s run, {:.3f} s profiled'.format(
+            summary['points'], summary['run_time'],
+            summary['profiled_time']))
+        return '\n'.join(lines)
+
+    def arrays(self):
+        """
+        The raw events as DataArrays.
+
+        Returns:
+            List[DataArray]: the setpoint array ``profile_event`` followed
+                by ``profile_phase``, ``profile_start``,
+                ``profile_duration`` and ``profile_point``.
+        """
+        n = self.count
+        event = DataArray(name='profile_event', array_id='profile_event',
+                          label='Event', is_setpoint=True,
+                          preset_data=np.arange(n))
+        event.set_arrays = (event,)
+        out = [event]
+        for attr, label, unit in (('phase', 'Phase', ''),
+                                  ('start', 'Start', 's'),
+                                  ('duration', 'Duration', 's'),
+                                  ('point', 'Point', '')):
+            name = 'profile_' + attr
+            out.append(DataArray(
+                name=name, array_id=name, label=label, unit=unit,
+                set_arrays=(event,),
+                preset_data=getattr(self, attr)[:n].astype(float)))
+        return out
@@ -4,6 +4,7 @@
 # That way the things we call need not be rewritten explicitly async.
 
 import threading
+import weakref
 
 
 class RespondingThread(threading.Thread):
@@ -48,7 +49,7 @@ class RespondingThread(threading.Thread):
         return self._output
 
 
-def thread_map(callables, args=None, kwargs=None):
+def thread_map(callables, args=None, kwargs=None, executor=None):
     '''
     Evaluate a sequence of callables in separate threads, returning
     a list of their return values.
@@ -59,12 +60,21 @@ def thread_map(callables, args=None, kwargs=None):
             arguments for each callable
         kwargs (optional): a sequence of dicts containing the keyword arguments
             for each callable
+        executor (optional): a `concurrent.futures.Executor` whose (already
+            running) threads to use, rather than starting a new thread for
+            each callable
 
     '''
     if args is None:
         args = ((),) * len(callables)
     if kwargs is None:
         kwargs = ({},) * len(callables)
+
+    if executor is not None:
+        futures = [executor.submit(c, *a, **k)
+                   for c, a, k in zip(callables, args, kwargs)]
+        return [f.result() for f in futures]
+
     threads = [RespondingThread(target=c, args=a, kwargs=k)
                for c, a, k in zip(callables, args, kwargs)]
 
@@ -72,3 +82,38 @@ def thread_map(callables, args=None, kwargs=None):
         t.start()
 
     return [t.output() for t in threads]
+
+
+# one lock per instrument (or per parameter with no instrument), so threads
+# never interleave commands on one connection. Keyed by id, as parameters
+# are not hashable, and removed when their owner is deleted.
+_instrument_locks = {}
+_instrument_locks_lock = threading.Lock()
+
+
+def instrument_lock(parameter):
+    '''
+    Get the lock to hold while a parameter talks to its instrument.
+
+    All parameters of one instrument share a lock. A parameter with no
+    instrument gets a lock of its own. The locks are reentrant, so a
+    parameter that calls other parameters of its instrument still works.
+
+    Args:
+        parameter: a Parameter, or anything with an optional `_instrument`
+    '''
+    owner = getattr(parameter, '_instrument', None)
+    if owner is None:
+        owner = parameter
+    key = id(owner)
+
+    with _instrument_locks_lock:
+        lock = _instrument_locks.get(key)
+        if lock is None:
+            lock = _instrument_locks[key] = threading.RLock()
+            try:
+                weakref.finalize(owner, _instrument_locks.pop, key, None)
+            except TypeError:
+                # can't be weakly referenced, so keep its lock forever
+                pass
+        return lock